@@ -0,0 +1,145 @@
+"""
+Cache of synthesized speech, so fixed and repeated phrases play from memory.
+
+Clips are WAV bytes rendered by the speech engine, keyed by a hash of
+everything that changes the audio: engine/voice, rate and text. The memory
+cache is an LRU bounded by total bytes; with a path, clips are also stored
+as <key>.wav files in that directory and survive restarts. The directory is
+bounded too (max_disk_bytes): the least recently used files are deleted
+first, going by their modification time, which a hit refreshes.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+
+def clip_key(text, rate=None, voice=""):
+    """Content hash identifying the rendered audio for text."""
+    return hashlib.sha1(f"{voice}\n{rate}\n{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Size-bounded LRU of rendered clips, with an optional on-disk store."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, path=None, max_disk_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clips = OrderedDict()
+        self._size = 0
+        # Files on disk, oldest first, with their sizes; scanned on the first save
+        self._files = None
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the clip's WAV bytes, or None."""
+        with self._lock:
+            data = self._clips.get(key)
+            if data is not None:
+                self._clips.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._load(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, data)
+        return data
+
+    def put(self, key, data, persist=True):
+        with self._lock:
+            self._insert(key, data)
+        if persist and self.path:
+            self._save(key, data)
+
+    def __len__(self):
+        return len(self._clips)
+
+    @property
+    def size(self):
+        """Bytes held in memory."""
+        return self._size
+
+    def _insert(self, key, data):
+        old = self._clips.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        if len(data) > self.max_bytes:
+            return
+        self._clips[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._clips.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.wav")
+
+    def _load(self, key):
+        if not self.path:
+            return None
+        try:
+            with open(self._file(key), "rb") as f:
+                data = f.read()
+            # Keeps often used clips from being evicted from the disk store
+            os.utime(self._file(key))
+            with self._lock:
+                if self._files is not None and key in self._files:
+                    self._files.move_to_end(key)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logging.warning(f"Could not read cached clip {key}: {e}")
+            return None
+
+    def _save(self, key, data):
+        tmp_path = self._file(key) + ".tmp"
+        try:
+            # Created with the first clip, so an unused cache leaves no directory behind
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._file(key))
+        except OSError as e:
+            logging.warning(f"Could not save cached clip: {e}")
+            return
+        with self._lock:
+            if self._files is None:
+                self._scan()
+            self._disk_size += len(data) - self._files.pop(key, 0)
+            self._files[key] = len(data)
+            evicted = []
+            while self._disk_size > self.max_disk_bytes and len(self._files) > 1:
+                old_key, size = self._files.popitem(last=False)
+                self._disk_size -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._file(old_key))
+            except OSError:
+                pass
+        if evicted:
+            logging.debug(f"Removed {len(evicted)} old clip(s) from {self.path}")
+
+    def _scan(self):
+        """Indexes the clips already on disk, oldest first."""
+        entries = []
+        try:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    if entry.name.endswith(".wav"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        except OSError:
+            pass
+        entries.sort()
+        self._files = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_size = sum(self._files.values())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the capture encoder: encode time and payload size per setting.
+
+Usage:
+    python bench_capture.py                       # synthetic 1080p/1440p/4K frames
+    python bench_capture.py shot1.png shot2.png   # your own screenshots
+    python bench_capture.py --live                # grab the current screen
+    python bench_capture.py --save-dir out/       # also write each encoded image for an accuracy check
+"""
+import argparse
+import base64
+import os
+import random
+import statistics
+import time
+
+from PIL import Image, ImageDraw
+
+from capture import CaptureSettings, prepare_image, encode_image, grab_screenshot
+
+SYNTHETIC_SIZES = {"1080p": (1920, 1080), "1440p": (2560, 1440), "4K": (3840, 2160)}
+
+# Text drawn in the synthetic dialogue box (ground truth for OCR benchmarks)
+SYNTHETIC_DIALOGUE = [f"Hero: This is dialogue line {line + 1}, press A to continue!" for line in range(4)]
+
+DEFAULT_MATRIX = [
+    CaptureSettings(max_dimension=None, format="PNG"),
+    CaptureSettings(max_dimension=1600, format="PNG"),
+    CaptureSettings(max_dimension=None, format="JPEG", quality=85),
+    CaptureSettings(max_dimension=1600, format="JPEG", quality=85),
+    CaptureSettings(max_dimension=1280, format="JPEG", quality=80),
+    CaptureSettings(max_dimension=1024, format="JPEG", quality=75),
+    CaptureSettings(max_dimension=1600, format="WEBP", quality=80),
+    CaptureSettings(max_dimension=1280, format="WEBP", quality=75),
+]
+
+
+def synthetic_screenshot(size, seed=0):
+    """Builds a game-like frame: noisy gradient background with a dialogue box of text."""
+    rng = random.Random(seed)
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    image = Image.merge("RGB", (gradient, gradient.rotate(90).resize(size), Image.new("L", size, 90)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(4, width // 40)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + r, y + r), fill=color)
+    # Rendered game art is noisy, which is what makes lossless PNG expensive
+    noise = Image.effect_noise(size, 40).convert("RGB")
+    image = Image.blend(image, noise, 0.2)
+    draw = ImageDraw.Draw(image)
+    box = (width // 10, height * 2 // 3, width * 9 // 10, height * 9 // 10)
+    draw.rectangle(box, fill=(250, 250, 240), outline=(40, 40, 40), width=4)
+    for line, text in enumerate(SYNTHETIC_DIALOGUE):
+        draw.text((box[0] + 30, box[1] + 30 + line * 30), text, fill=(0, 0, 0))
+    return image
+
+def bench_setting(image, settings, runs):
+    timings = []
+    payload = b""
+    for _ in range(runs):
+        start = time.perf_counter()
+        prepared = prepare_image(image, settings)
+        payload = base64.b64encode(encode_image(prepared, settings))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(payload), prepared.size, payload
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="Screenshot files to benchmark (default: synthetic frames)")
+    parser.add_argument("--live", action="store_true", help="Benchmark a live screen capture")
+    parser.add_argument("--runs", type=int, default=5, help="Encodes per setting (median is reported)")
+    parser.add_argument("--save-dir", help="Write each encoded image here for checking model accuracy")
+    args = parser.parse_args()
+
+    frames = {}
+    if args.live:
+        frames["live"] = grab_screenshot()
+    for path in args.images:
+        frames[os.path.basename(path)] = Image.open(path).convert("RGB")
+    if not frames:
+        frames = {name: synthetic_screenshot(size) for name, size in SYNTHETIC_SIZES.items()}
+
+    if args.save_dir:
+        os.makedirs(args.save_dir, exist_ok=True)
+
+    for name, image in frames.items():
+        print(f"\n{name} ({image.width}x{image.height})")
+        print(f"{'setting':<24}{'output':>12}{'encode ms':>12}{'base64 KiB':>12}")
+        for settings in DEFAULT_MATRIX:
+            elapsed, size, out_size, payload = bench_setting(image, settings, args.runs)
+            print(f"{settings.describe():<24}{out_size[0]:>6}x{out_size[1]:<5}{elapsed * 1000:>12.1f}{size / 1024:>12.0f}")
+            if args.save_dir:
+                filename = f"{name}_{settings.describe().replace(' ', '_')}.{settings.format.lower()}"
+                with open(os.path.join(args.save_dir, filename), "wb") as f:
+                    f.write(base64.b64decode(payload))
+
+if __name__ == "__main__":
+    main()
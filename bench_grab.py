@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark screen capture latency per backend and target.
+
+For every available capture backend (mss, Pillow's ImageGrab, pyautogui)
+and target it times two things over a number of frames:
+
+  * grab: the backend call alone, returning the raw frame buffer,
+  * image: grab plus the conversion to the RGB PIL image the pipelines use,
+    which is what a hotkey press pays in its "capture" stage.
+
+It runs headless under Xvfb, either inside xvfb-run or with --xvfb, which
+starts a private Xvfb server of the given size (the Xvfb binary must be on
+PATH). Without a window manager there is no focused window, so "window"
+measures the primary-monitor fallback there.
+
+Usage:
+    python bench_grab.py
+    python bench_grab.py --xvfb 3840x2160 --frames 50
+    xvfb-run -s "-screen 0 2560x1440x24" python bench_grab.py --target 1 --target 0,0,1280,720
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import statistics
+import subprocess
+import time
+
+from capture import CAPTURE_BACKENDS, target_box
+
+DEFAULT_TARGETS = ("window", "1", "0,0,1280,720")
+
+
+def parse_target(text):
+    """"window", a monitor number or left,top,right,bottom."""
+    if text == "window":
+        return text
+    if text.isdigit():
+        return int(text)
+    return tuple(int(value) for value in text.split(","))
+
+@contextlib.contextmanager
+def xvfb(size):
+    """Runs a private Xvfb server of size (WIDTHxHEIGHT) and points DISPLAY at it."""
+    if not shutil.which("Xvfb"):
+        raise SystemExit("--xvfb needs the Xvfb binary on PATH")
+    # -displayfd makes Xvfb pick a free display number and report it
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(["Xvfb", "-displayfd", str(write_fd), "-screen", "0", f"{size}x24", "-nolisten", "tcp"],
+                               pass_fds=(write_fd,), stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        display = f.readline().strip()
+    if not display:
+        process.kill()
+        raise SystemExit("Xvfb did not start")
+    previous = os.environ.get("DISPLAY")
+    os.environ["DISPLAY"] = f":{display}"
+    try:
+        yield os.environ["DISPLAY"]
+    finally:
+        process.terminate()
+        process.wait()
+        if previous is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = previous
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return statistics.median(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+def bench_backend(backend, target, frames, warmups=2):
+    """Returns the frame size and the grab and grab + image samples in seconds."""
+    box = target_box(target, backend)
+    grabs, images = [], []
+    for i in range(frames + warmups):
+        start = time.perf_counter()
+        frame = backend.grab(box)
+        grabbed = time.perf_counter()
+        assert frame.image.size == frame.size
+        done = time.perf_counter()
+        if i >= warmups:
+            grabs.append(grabbed - start)
+            images.append(done - start)
+    return frame.size, grabs, images
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", action="append", choices=sorted(CAPTURE_BACKENDS),
+                        help="Backends to measure (repeatable; default: every available one)")
+    parser.add_argument("--target", action="append", type=parse_target,
+                        help=f"window, a monitor number or left,top,right,bottom (default: {' '.join(DEFAULT_TARGETS)})")
+    parser.add_argument("--frames", type=int, default=30, help="Measured grabs per backend and target")
+    parser.add_argument("--xvfb", metavar="WIDTHxHEIGHT", help="Start a private Xvfb server of this size")
+    args = parser.parse_args()
+
+    targets = args.target or [parse_target(target) for target in DEFAULT_TARGETS]
+    with xvfb(args.xvfb) if args.xvfb else contextlib.nullcontext():
+        backends = [CAPTURE_BACKENDS[name]() for name in args.backend or CAPTURE_BACKENDS]
+        print(f"{'backend':<11}{'target':<16}{'size':>11}{'grab p50':>10}{'p95':>8}{'image p50':>11}{'p95':>8}{'fps':>7}")
+        for backend in backends:
+            if not backend.available():
+                print(f"{backend.name:<11}not available")
+                continue
+            for target in targets:
+                label = ",".join(map(str, target)) if isinstance(target, tuple) else str(target)
+                try:
+                    size, grabs, images = bench_backend(backend, target, args.frames)
+                except Exception as e:
+                    print(f"{backend.name:<11}{label:<16}failed: {e}")
+                    continue
+                grab_p50, grab_p95 = percentiles(grabs)
+                image_p50, image_p95 = percentiles(images)
+                print(f"{backend.name:<11}{label:<16}{f'{size[0]}x{size[1]}':>11}{grab_p50 * 1000:>8.1f}ms"
+                      f"{grab_p95 * 1000:>6.1f}ms{image_p50 * 1000:>9.1f}ms{image_p95 * 1000:>6.1f}ms"
+                      f"{1 / image_p50:>7.0f}")
+            backend.close()
+
+if __name__ == "__main__":
+    main()
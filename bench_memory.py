@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory per hotkey at 1080p, 1440p and 4K.
+
+Every hotkey pipeline runs end to end against a fake Ollama server, once
+with streamed request bodies (images base64-encoded chunk by chunk as the
+upload goes out, see ollama_client.JsonBody) and once with buffered ones
+(base64 str, then the whole JSON body built in memory, as before). The
+figure is the tracemalloc peak over a press, above what was already
+allocated before it: Python-allocated memory such
+as encoded image bytes, base64 and JSON copies and NumPy arrays, but not
+PIL's pixel buffers, which are the same in both modes.
+
+The fake server runs in its own process so its copies of the request
+don't count. The default capture is full-resolution PNG, the setting where
+the copies are largest; --format and --max-dimension measure others.
+
+Usage:
+    python bench_memory.py
+    python bench_memory.py --format JPEG --max-dimension 1600 --runs 5
+    python bench_memory.py --only f9 --only f12 --size 4K
+"""
+import argparse
+import logging
+import os
+import socket
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import replace
+
+import game_helper_buddy as app
+from bench_capture import synthetic_screenshot, SYNTHETIC_SIZES
+from bench_pipelines import configure_app, run_once
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HOTKEYS = {
+    "f9": app.pipeline,
+    "f12": app.pipeline_simple,
+    "f10-two-step": app.pipeline_simple_with_rephrase,
+    "f10-combined": app.pipeline_combined,
+    "explain": app.pipeline_explain_words,
+}
+MODES = ("buffered", "streamed")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port, timeout=10):
+    """Starts fake_ollama.py in a child process and waits until it answers."""
+    import requests
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fake_ollama.py"), "--port", str(port), "--ttft", "0.02",
+         "--tokens-per-sec", "2000"],
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url + "/api/version", timeout=1)
+            return process, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("Fake Ollama server did not start")
+
+def measure(hotkey, pipeline, runs):
+    """Highest peak (bytes above what was allocated before the press) over the runs, and the payload size."""
+    peaks = []
+    # The first press warms up connections and the speech thread
+    for i in range(runs + 1):
+        app.RESPONSE_CACHE.clear()
+        app.dialogue_history.clear()
+        trace, peak = run_once(pipeline, hotkey)
+        if i:
+            peaks.append(peak)
+    return max(peaks), trace.values.get("payload_bytes", 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Measured presses per hotkey, mode and size")
+    parser.add_argument("--format", default="PNG", help="Capture format (PNG, JPEG, WEBP)")
+    parser.add_argument("--max-dimension", type=int, help="Downscale to this longest side (default: full resolution)")
+    parser.add_argument("--size", action="append", choices=sorted(SYNTHETIC_SIZES), help="Only these sizes")
+    parser.add_argument("--only", action="append", choices=sorted(HOTKEYS), help="Only these hotkeys")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='[%(asctime)s] %(levelname)s: %(message)s')
+    app.CAPTURE_SETTINGS = replace(app.CAPTURE_SETTINGS, format=args.format.upper(), max_dimension=args.max_dimension)
+    # F12 and F10 would skip the model whenever Tesseract is installed
+    app.OCR_FAST_PATH = False
+    sizes = args.size or list(SYNTHETIC_SIZES)
+    hotkeys = {name: HOTKEYS[name] for name in args.only} if args.only else HOTKEYS
+
+    process, url = start_server(free_port())
+    results = {}
+    tracemalloc.start()
+    try:
+        for size in sizes:
+            # PIL fixtures: their pixel buffers aren't traced, so only the request copies are compared
+            configure_app([url], [synthetic_screenshot(SYNTHETIC_SIZES[size])], tts_seconds_per_char=0.0,
+                          raw_frames=False)
+            for mode in MODES:
+                app.ollama_client.stream_body = mode == "streamed"
+                for name, pipeline in hotkeys.items():
+                    results[size, name, mode] = measure(name, pipeline, args.runs)
+    finally:
+        tracemalloc.stop()
+        process.kill()
+        process.wait()
+
+    print(f"Peak Python memory per press ({app.CAPTURE_SETTINGS.describe()}, max of {args.runs} runs):")
+    print(f"  {'size':<7}{'hotkey':<15}{'payload':>10}{'buffered':>11}{'streamed':>11}{'saved':>9}")
+    for size in sizes:
+        for name in hotkeys:
+            buffered, payload = results[size, name, "buffered"]
+            streamed, _ = results[size, name, "streamed"]
+            saved = 1 - streamed / buffered if buffered else 0.0
+            print(f"  {size:<7}{name:<15}{payload / 1e6:>8.2f}MB{buffered / 1e6:>9.1f}MB{streamed / 1e6:>9.1f}MB"
+                  f"{saved:>9.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Compare the local OCR fast path with the vision model for plain text extraction.
+
+Each fixture screenshot is read by Tesseract (whole frame, and the dialogue
+box when its region is known) and by the vision model with the F12 prompt.
+The benchmark reports median time and text accuracy (character similarity
+to the ground truth, ignoring case and whitespace) for each path, plus the
+OCR confidence, which is what decides between the paths at runtime.
+
+Fixtures are .png files with the expected text in a .txt file of the same
+name. Without --fixtures, synthetic frames with known dialogue are used.
+Without --url the vision path runs against the local fake Ollama server, so
+its time is simulated and its accuracy is not reported.
+
+Usage:
+    python bench_ocr.py
+    python bench_ocr.py --fixtures screenshots/ --url http://192.168.50.250:11434
+"""
+import argparse
+import difflib
+import glob
+import logging
+import os
+import re
+import statistics
+import time
+
+from PIL import Image
+
+import game_helper_buddy as app
+from bench_capture import synthetic_screenshot, SYNTHETIC_SIZES, SYNTHETIC_DIALOGUE
+from capture import encode_for_upload
+from fake_ollama import FakeOllamaServer
+from model_residency import ResidencyManager
+from ocr import ocr_available, read_text
+from ollama_client import OllamaClient
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def accuracy(text, expected):
+    """Character-level similarity (0-1) between recognized and expected text."""
+    return difflib.SequenceMatcher(None, normalize(text), normalize(expected)).ratio()
+
+def load_fixtures(directory):
+    """Returns (name, image, expected_text, region) tuples."""
+    if not directory:
+        fixtures = []
+        for i, (name, (width, height)) in enumerate(SYNTHETIC_SIZES.items()):
+            region = (width // 10, height * 2 // 3, width * 9 // 10, height * 9 // 10)
+            fixtures.append((name, synthetic_screenshot((width, height), seed=i), "\n".join(SYNTHETIC_DIALOGUE), region))
+        return fixtures
+    fixtures = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.png"))):
+        text_path = os.path.splitext(path)[0] + ".txt"
+        if not os.path.exists(text_path):
+            logging.warning(f"Skipping {path}: no {os.path.basename(text_path)}")
+            continue
+        with open(text_path, "r", encoding="utf-8") as f:
+            expected = f.read()
+        fixtures.append((os.path.basename(path), Image.open(path).convert("RGB"), expected, None))
+    if not fixtures:
+        raise SystemExit(f"No .png/.txt fixture pairs in {directory}")
+    return fixtures
+
+def bench_ocr(image, expected, regions, runs):
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = read_text(image, regions=regions)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), accuracy(result.text, expected), result.confidence
+
+def bench_vision(image, expected, client, model, runs):
+    timings, text = [], ""
+    for _ in range(runs):
+        start = time.perf_counter()
+        image_base64 = encode_for_upload(image, app.CAPTURE_SETTINGS)
+        text = app.analyze_image_with_llm(image_base64, prompt=app.SIMPLE_SYSTEM_PROMPT, model=model, client=client)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), accuracy(text, expected)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", help="Directory of .png screenshots with matching .txt ground truth")
+    parser.add_argument("--url", help="Ollama server for the vision path (default: local fake server)")
+    parser.add_argument("--model", default=app.MODEL)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per fixture and path (median is reported)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='[%(asctime)s] %(levelname)s: %(message)s')
+    if not ocr_available():
+        raise SystemExit("Tesseract is not available (pip install pytesseract and install the tesseract binary)")
+
+    fixtures = load_fixtures(args.fixtures)
+    server = None if args.url else FakeOllamaServer().start()
+    client = OllamaClient(args.url or server.url, retries=0)
+    app.model_residency = ResidencyManager(client, [args.model])
+
+    print(f"{'fixture':<20}{'path':<16}{'ms':>10}{'accuracy':>10}{'confidence':>12}")
+    totals = {}
+    try:
+        for name, image, expected, region in fixtures:
+            rows = [("ocr frame",) + bench_ocr(image, expected, None, args.runs)]
+            if region:
+                rows.append(("ocr dialogue",) + bench_ocr(image, expected, [region], args.runs))
+            rows.append(("vision",) + bench_vision(image, expected, client, args.model, args.runs) + (None,))
+            for path, elapsed, score, confidence in rows:
+                if path == "vision" and not args.url:
+                    score = None
+                totals.setdefault(path, []).append((elapsed, score))
+                score_text = f"{score:.1%}" if score is not None else "n/a"
+                confidence_text = f"{confidence:.0f}" if confidence is not None else ""
+                print(f"{name:<20}{path:<16}{elapsed * 1000:>10.0f}{score_text:>10}{confidence_text:>12}")
+    finally:
+        if server:
+            server.stop()
+
+    print("\nMedian over fixtures:")
+    for path, values in totals.items():
+        elapsed = statistics.median(v[0] for v in values)
+        scores = [v[1] for v in values if v[1] is not None]
+        score_text = f"{statistics.median(scores):.1%}" if scores else "n/a"
+        print(f"  {path:<16}{elapsed * 1000:>10.0f}ms  accuracy {score_text}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Offline pipeline benchmark against a local fake Ollama server.
+
+Each hotkey pipeline is driven through the real scheduler with fixture
+screenshots, the fake Ollama server (fake_ollama.py) and the recording fake
+TTS engine. The benchmark reports end-to-end and per-stage latency (from the
+tracing spans), peak Python-allocated memory per press (tracemalloc; the
+captured BGRA frame is included, PIL pixel buffers are not) and upload
+payload size. Fixtures are captured as raw Frames like an mss grab, are
+seeded, and the server timing is fixed, so numbers are comparable run to run.
+
+Usage:
+    python bench_pipelines.py --runs 5
+    python bench_pipelines.py --fixtures screenshots/ --save bench.json
+    python bench_pipelines.py --baseline bench.json      # flag regressions against a saved run
+    python bench_pipelines.py --backend-ttft 0.3 --backend-ttft 5 --hedge-after 1   # routed over two servers
+    python bench_pipelines.py --reply "No text detected. $(cat long.txt)"   # a rambling model vs. output caps
+"""
+import argparse
+import contextlib
+import glob
+import itertools
+import json
+import logging
+import os
+import statistics
+import threading
+import tracemalloc
+
+from PIL import Image
+
+import tracing
+import game_helper_buddy as app
+from audio_cache import AudioCache
+from bench_capture import synthetic_screenshot, SYNTHETIC_SIZES
+from capture import Frame
+from dialogue_history import DialogueHistory
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_client import OllamaClient
+from model_residency import ResidencyManager
+from ollama_router import OllamaRouter
+from response_cache import ResponseCache
+from roi import RegionMemory
+from speech import FakeEngine, SpeechService
+from tracing import Tracer
+
+STAGES = ("total", "hotkey_wait", "capture", "roi", "encode", "upload", "ttft", "generation",
+          "tts_first_audio", "playback", "ready_sound")
+
+
+class RecordingTracer(Tracer):
+    """Tracer that hands each finished trace back to the benchmark."""
+
+    def __init__(self):
+        super().__init__(path=None)
+        self.finished = []
+        self._event = threading.Event()
+
+    def export(self, trace, cancelled=False):
+        self.finished.append((trace, cancelled))
+        self._event.set()
+
+    def wait(self, timeout):
+        if not self._event.wait(timeout):
+            raise TimeoutError("pipeline did not finish")
+        self._event.clear()
+        return self.finished[-1]
+
+
+def load_fixtures(pattern):
+    if not pattern:
+        return [synthetic_screenshot(size, seed=i) for i, size in enumerate(SYNTHETIC_SIZES.values())]
+    paths = sorted(glob.glob(os.path.join(pattern, "*.png")) if os.path.isdir(pattern) else glob.glob(pattern))
+    if not paths:
+        raise SystemExit(f"No fixture screenshots match {pattern}")
+    return [Image.open(path).convert("RGB") for path in paths]
+
+def configure_app(server_urls, fixtures, tts_seconds_per_char, hedge_after=None, tts_latency=0.0, raw_frames=True):
+    """
+    Points the app's globals at the fake server(s), fixture frames and the fake TTS engine.
+    With raw_frames the fixtures are captured as BGRA Frames like an mss grab, otherwise as PIL images.
+    """
+    if raw_frames:
+        raw = itertools.cycle([(image.size, image.convert("RGBA").tobytes("raw", "BGRA")) for image in fixtures])
+
+        def grab_fixture():
+            with tracing.span("capture"):
+                size, pixels = next(raw)
+                return Frame(bytearray(pixels), size, "BGRA")
+    else:
+        frames = itertools.cycle(fixtures)
+
+        def grab_fixture():
+            with tracing.span("capture"):
+                return next(frames).copy()
+
+    if len(server_urls) == 1:
+        app.ollama_client = OllamaClient(server_urls[0], retries=0)
+    else:
+        app.ollama_client = OllamaRouter(server_urls, hedge_after=hedge_after)
+    app.model_residency = ResidencyManager(app.ollama_client, [app.MODEL])
+    app.grab_screenshot = grab_fixture
+    app.RESPONSE_CACHE = ResponseCache(path=None)
+    app.dialogue_regions = RegionMemory(path=None)
+    # No replays: every repeated press in the repeat benchmark is skipped
+    app.dialogue_history = DialogueHistory(replay_window=0)
+    app.speech_service = SpeechService(lambda: FakeEngine(seconds_per_char=tts_seconds_per_char, latency=tts_latency),
+                                       audio_cache=AudioCache()).start()
+    app.speech_service.prerender([app.READY_SOUND], rate=app.READY_SOUND_RATE)
+    app.pipeline_scheduler.repeat_window = 0
+    app.tracer = RecordingTracer()
+
+def run_once(pipeline, hotkey, timeout=120):
+    """Runs one pipeline press end to end. Returns (trace, peak bytes above what was allocated before it)."""
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    app.pipeline_wrapper(pipeline, hotkey)
+    trace, cancelled = app.tracer.wait(timeout)
+    peak = tracemalloc.get_traced_memory()[1]
+    if cancelled:
+        raise RuntimeError(f"{hotkey} run was cancelled")
+    return trace, peak - before
+
+def bench_pipeline(name, pipeline, runs, cached, fixture_count, repeat=False):
+    samples = {stage: [] for stage in STAGES}
+    peaks, payloads = [], []
+    # Discarded warm-up runs prime connections, the TTS thread and allocator caches;
+    # the cached variant warms up once per fixture so every measured run is a cache hit
+    warmups = fixture_count if cached else 1
+    if cached:
+        app.RESPONSE_CACHE.clear()
+    app.dialogue_history.clear()
+    for i in range(runs + warmups):
+        if not cached:
+            app.RESPONSE_CACHE.clear()
+        # Each run reads the dialogue for the first time, unless measuring repeated presses
+        if not repeat:
+            app.dialogue_history.clear()
+        trace, peak = run_once(pipeline, name)
+        if i < warmups:
+            continue
+        for stage in STAGES:
+            if stage in trace.spans:
+                samples[stage].append(trace.spans[stage])
+        peaks.append(peak)
+        payloads.append(trace.values.get("payload_bytes", 0))
+
+    result = {}
+    for stage, values in samples.items():
+        if values:
+            ordered = sorted(values)
+            result[stage] = {"p50": statistics.median(ordered),
+                             "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]}
+    result["peak_memory_mb"] = max(peaks) / 1e6
+    result["payload_kib"] = max(payloads) / 1024
+    result["runs"] = len(peaks)
+    return result
+
+def print_results(results):
+    for name, result in results.items():
+        print(f"\n{name}  (peak memory {result['peak_memory_mb']:.1f} MB, payload {result['payload_kib']:.0f} KiB)")
+        for stage in STAGES:
+            if stage in result:
+                print(f"  {stage:<16} p50 {result[stage]['p50'] * 1000:8.1f}ms   p95 {result[stage]['p95'] * 1000:8.1f}ms")
+
+def compare(results, baseline, tolerance):
+    """Prints stage p50 deltas against a saved run and returns the number of regressions."""
+    regressions = 0
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        for stage in STAGES + ("peak_memory_mb", "payload_kib"):
+            if stage not in result or stage not in baseline.get(name, {}):
+                continue
+            new, old = result[stage], baseline[name][stage]
+            if isinstance(new, dict):
+                new, old = new["p50"], old["p50"]
+                # Ignore sub-5ms jitter on tiny stages
+                significant = abs(new - old) > 0.005
+            else:
+                significant = True
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if significant and change > tolerance:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {name:<16} {stage:<16} {old:10.4f} -> {new:10.4f}  {change:+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per pipeline")
+    parser.add_argument("--fixtures", help="Directory of .png screenshots or a glob (default: synthetic frames)")
+    parser.add_argument("--ttft", type=float, default=0.3, help="Fake server time to first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=60.0, help="Fake server token rate")
+    parser.add_argument("--reply", help="Fake server reply text, e.g. a long one to exercise the output caps")
+    parser.add_argument("--backend-ttft", type=float, action="append",
+                        help="Start one fake server per value with this time to first token and route over them")
+    parser.add_argument("--hedge-after", type=float, help="Router hedging delay (s) with --backend-ttft")
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.0, help="Simulated speech duration")
+    parser.add_argument("--tts-latency", type=float, default=0.0,
+                        help="Simulated synthesis delay per utterance (s); cached clips skip it")
+    parser.add_argument("--only", action="append", help="Only run these pipelines (repeatable)")
+    parser.add_argument("--save", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed p50 slowdown before flagging")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='[%(asctime)s] %(levelname)s: %(message)s')
+
+    reply = {"reply": args.reply} if args.reply else {}
+    configs = [FakeOllamaConfig(ttft=ttft, tokens_per_sec=args.tokens_per_sec, **reply)
+               for ttft in args.backend_ttft or [args.ttft]]
+    pipelines = {
+        "f9": (app.pipeline, False, False),
+        "f12": (app.pipeline_simple, False, False),
+        "f12-cached": (app.pipeline_simple, True, False),
+        "f12-repeat": (app.pipeline_simple, True, True),
+        "f10-two-step": (app.pipeline_simple_with_rephrase, False, False),
+        "f10-repeat": (app.pipeline_simple_with_rephrase, True, True),
+        "f10-combined": (app.pipeline_combined, False, False),
+        "explain": (app.pipeline_explain_words, False, False),
+    }
+    if args.only:
+        pipelines = {name: pipelines[name] for name in args.only}
+
+    tracemalloc.start()
+    results = {}
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(FakeOllamaServer(config)) for config in configs]
+        fixtures = load_fixtures(args.fixtures)
+        configure_app([server.url for server in servers], fixtures, args.tts_seconds_per_char, args.hedge_after,
+                      args.tts_latency)
+        for name, (pipeline, cached, repeat) in pipelines.items():
+            results[name] = bench_pipeline(name, pipeline, args.runs, cached, len(fixtures), repeat)
+    tracemalloc.stop()
+
+    print_results(results)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark app startup: import time and time until hotkeys are registered.
+
+Each run starts a fresh interpreter, like a launch or a restart_program
+re-exec. Two things are measured:
+
+  * import: `python -X importtime -c "import game_helper_buddy"`, with the
+    slowest modules by cumulative import time (median over runs),
+  * ready: wall time from spawning the process until register_hotkeys()
+    has returned, i.e. until F9/F10/F12 would respond. Heavy subsystems
+    (TTS engine, Ollama probes, OBS, Pillow/NumPy) load after this point.
+
+The script exits with status 1 when a median exceeds its budget (in
+milliseconds), so it guards against startup regressions. The default
+budgets are the medians measured when the lazy startup landed (about 103ms
+and 176ms) plus headroom for slower machines; 0 turns a budget off.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --runs 10 --top 20
+    python bench_startup.py --import-budget 200 --ready-budget 400
+    python bench_startup.py --import-budget 0 --ready-budget 0   # report only
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Default budgets (ms) for the import and time-to-hotkeys-ready medians
+IMPORT_BUDGET_MS = 150
+READY_BUDGET_MS = 250
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# Registers the hotkeys the way main() does; keyboard hooks need root on Linux,
+# so fall back to a no-op add_hotkey to still time everything around them
+READY_SCRIPT = """
+import keyboard
+import game_helper_buddy as app
+try:
+    app.register_hotkeys()
+except Exception:
+    keyboard.add_hotkey = lambda *args, **kwargs: object()
+    keyboard.remove_hotkey = lambda handle: None
+    app.registered_hotkeys = []
+    app.register_hotkeys()
+print("READY", flush=True)
+"""
+
+
+def child_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = HERE + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+def measure_imports():
+    """Returns (total_ms, {module: cumulative_ms}) for one import of the app."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import game_helper_buddy"],
+        cwd=HERE, env=child_env(), capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing the app failed:\n{result.stderr}")
+    modules, total = {}, 0.0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        name = match.group(4)
+        if name == "site":
+            # Everything so far was interpreter startup, not the app
+            modules = {}
+            continue
+        modules[name] = cumulative_ms
+        if name == "game_helper_buddy":
+            total = cumulative_ms
+    return total, modules
+
+def measure_ready(timeout=60):
+    """Milliseconds from spawning the interpreter until the hotkeys are registered."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", READY_SCRIPT], cwd=HERE, env=child_env(),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        for line in process.stdout:
+            if line.strip() == "READY":
+                return (time.perf_counter() - start) * 1000
+        raise SystemExit(f"App never became ready:\n{process.stderr.read()}")
+    finally:
+        process.kill()
+        process.wait(timeout)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS,
+                        help="Fail if the app import median exceeds this many ms (0: no budget)")
+    parser.add_argument("--ready-budget", type=float, default=READY_BUDGET_MS,
+                        help="Fail if time-to-hotkeys-ready exceeds this many ms (0: no budget)")
+    args = parser.parse_args()
+
+    # One throwaway run so .pyc compilation doesn't count
+    measure_imports()
+
+    totals, per_module = [], {}
+    for _ in range(args.runs):
+        total, modules = measure_imports()
+        totals.append(total)
+        for name, ms in modules.items():
+            per_module.setdefault(name, []).append(ms)
+    ready = [measure_ready() for _ in range(args.runs)]
+
+    import_ms = statistics.median(totals)
+    ready_ms = statistics.median(ready)
+    medians = {name: statistics.median(values) for name, values in per_module.items()}
+    print(f"Slowest imports (cumulative ms, median of {args.runs}):")
+    for name, ms in sorted(medians.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {name:<40}{ms:>8.1f}")
+
+    print(f"\n{'import game_helper_buddy':<28}{import_ms:>8.0f}ms  (min {min(totals):.0f}, max {max(totals):.0f})")
+    print(f"{'time to hotkeys ready':<28}{ready_ms:>8.0f}ms  (min {min(ready):.0f}, max {max(ready):.0f})")
+
+    failed = False
+    for label, value, budget in (("import", import_ms, args.import_budget), ("ready", ready_ms, args.ready_budget)):
+        if budget and value > budget:
+            print(f"FAIL: {label} {value:.0f}ms is over the {budget:.0f}ms budget")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
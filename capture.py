@@ -0,0 +1,419 @@
+"""
+Shared capture-and-encode stage for the hotkey pipelines.
+
+Frames come from a pluggable CaptureBackend (mss, Pillow's ImageGrab or
+pyautogui) and cover only the target: the focused game window, a monitor or
+a fixed rectangle. Backends hand back the raw pixel buffer as a Frame.
+The pipelines take the Frame in place of a PIL image:
+a crop converts only the cropped pixels, so a cache lookup on the dialogue
+box doesn't pay for converting the whole screen, and anything else converts
+the frame once on first use.
+
+Screenshots are optionally cropped, downscaled to a maximum size and encoded
+as PNG, JPEG or WebP. The result is an EncodedImage: only the encoded bytes
+are kept, and the base64 text Ollama expects is produced chunk by chunk while
+the request body is sent (see ollama_client.JsonBody).
+"""
+import base64
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+
+import tracing
+
+FORMATS = ("PNG", "JPEG", "WEBP")
+
+# Encoded bytes per base64 chunk when streaming an image into a request body
+BASE64_CHUNK_BYTES = 48 * 1024
+
+
+@dataclass
+class CaptureSettings:
+    """How a screenshot is shrunk and encoded before upload."""
+    # Longest side in pixels after downscaling; None keeps full resolution
+    max_dimension: int = 1600
+    # "PNG", "JPEG" or "WEBP"
+    format: str = "JPEG"
+    # Lossy quality for JPEG/WebP (ignored for PNG)
+    quality: int = 85
+    # Optional (left, top, right, bottom) box cropped before downscaling
+    crop: tuple = None
+
+    def __post_init__(self):
+        self.format = self.format.upper()
+        if self.format not in FORMATS:
+            raise ValueError(f"Unsupported capture format: {self.format!r}")
+
+    def describe(self):
+        size = f"max{self.max_dimension}" if self.max_dimension else "full"
+        quality = "" if self.format == "PNG" else f" q{self.quality}"
+        crop = " crop" if self.crop else ""
+        return f"{self.format} {size}{quality}{crop}"
+
+
+class EncodedImage:
+    """
+    An encoded screenshot that is base64-encoded lazily.
+
+    Holding base64 bytes, a decoded str and a serialized JSON body would make
+    several full copies of a multi-MB image; iter_base64() instead encodes it
+    a chunk at a time as the upload goes out. str() still returns the whole
+    base64 string for callers that need one.
+    """
+
+    def __init__(self, data, format="JPEG"):
+        self.data = data
+        self.format = format
+
+    def __len__(self):
+        """Length of the base64 text."""
+        return (len(self.data) + 2) // 3 * 4
+
+    def __str__(self):
+        return base64.b64encode(self.data).decode("ascii")
+
+    def __repr__(self):
+        return f"EncodedImage({self.format}, {len(self.data)} bytes)"
+
+    def iter_base64(self, chunk_size=BASE64_CHUNK_BYTES):
+        """Yields the base64 text as ASCII bytes, chunk_size encoded bytes at a time."""
+        # Whole 3-byte groups per chunk, so the pieces concatenate without padding in between
+        chunk_size = max(3, chunk_size - chunk_size % 3)
+        view = memoryview(self.data)
+        for start in range(0, len(view), chunk_size):
+            yield base64.b64encode(view[start:start + chunk_size])
+
+
+class Frame:
+    """
+    A captured frame: the backend's raw pixel buffer and where it was on screen.
+
+    .image is the RGB PIL image the encode, hash and OCR stages work on; it is
+    converted straight from the buffer on first use and then kept (the raw
+    buffer is dropped).
+
+    A Frame can be passed where a PIL image is expected: crop() converts only
+    the cropped box, and other image attributes are taken from .image. Like a
+    PIL image, np.asarray(frame) is always height x width x 3 RGB, whatever the
+    backend's layout and whether or not .image has been used yet.
+    """
+
+    def __init__(self, pixels, size, layout="RGB", left=0, top=0, image=None):
+        self.pixels = pixels
+        self.size = size
+        self.layout = layout
+        self.left = left
+        self.top = top
+        self._image = image
+
+    @classmethod
+    def from_image(cls, image, left=0, top=0):
+        """Wraps a PIL image from a backend that returns those."""
+        return cls(None, image.size, "RGB", left, top, image=image.convert("RGB"))
+
+    def __repr__(self):
+        return f"Frame({self.size[0]}x{self.size[1]} {self.layout} at {self.left},{self.top})"
+
+    @property
+    def box(self):
+        return (self.left, self.top, self.left + self.size[0], self.top + self.size[1])
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @property
+    def mode(self):
+        return "RGB"
+
+    def __getattr__(self, name):
+        # Only called for attributes a Frame doesn't have: resize, convert, save, ...
+        if name.startswith("_") or name == "pixels":
+            raise AttributeError(name)
+        return getattr(self.image, name)
+
+    def crop(self, box):
+        """The box (frame coordinates) as an RGB PIL image, converting only those pixels."""
+        width, height = self.size
+        left, top, right, bottom = box
+        if self._image is not None or self.pixels is None or self.layout not in ("BGRA", "RGB") \
+                or left < 0 or top < 0 or right > width or bottom > height or right <= left or bottom <= top:
+            return self.image.crop(box)
+        from PIL import Image
+        channels = len(self.layout)
+        stride = width * channels
+        start = (top * width + left) * channels
+        data = memoryview(self.pixels)[start:start + stride * (bottom - top - 1) + (right - left) * channels]
+        rawmode = "BGRX" if self.layout == "BGRA" else self.layout
+        return Image.frombuffer("RGB", (right - left, bottom - top), data, "raw", rawmode, stride, 1)
+
+    @property
+    def __array_interface__(self):
+        return self.image.__array_interface__
+
+    @property
+    def image(self):
+        if self._image is None:
+            from PIL import Image
+            # BGRX drops the (unused) alpha while swapping channels, in one pass
+            rawmode = "BGRX" if self.layout == "BGRA" else self.layout
+            self._image = Image.frombuffer("RGB", self.size, self.pixels, "raw", rawmode, 0, 1)
+            if rawmode != "RGB":
+                # The image is a converted copy; the raw buffer isn't needed any more
+                self.pixels = None
+                self.layout = "RGB"
+        return self._image
+
+
+class CaptureBackend:
+    """Grabs screen boxes as Frames; subclasses wrap one capture library."""
+
+    name = None
+
+    def available(self):
+        return True
+
+    def grab(self, box=None):
+        """Captures (left, top, right, bottom) in desktop coordinates; None is the primary monitor."""
+        raise NotImplementedError
+
+    def monitor_box(self, number):
+        """Box of a monitor (1 = primary); None when the backend grabs it by default."""
+        if number == 1:
+            return None
+        raise ValueError(f"The {self.name} capture backend can only capture the primary monitor")
+
+    def clip(self, box):
+        """The part of box that is on screen, or None when nothing is."""
+        return box
+
+    def close(self):
+        pass
+
+
+class MssBackend(CaptureBackend):
+    """
+    mss: raw BGRA grabs through XShm on Linux, BitBlt on Windows and
+    CoreGraphics on macOS, several times faster than a pyautogui screenshot.
+    """
+
+    name = "mss"
+
+    def __init__(self):
+        # Older mss versions tie their handles to the creating thread, so each thread gets its own
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+
+    def available(self):
+        if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+            # X11 only (XShm/XGetImage)
+            return False
+        try:
+            import mss  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @property
+    def sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+            # mss.MSS replaces the mss.mss() factory in newer versions
+            sct = (getattr(mss, "MSS", None) or mss.mss)()
+            self._local.sct = sct
+            with self._lock:
+                self._instances.append(sct)
+        return sct
+
+    def grab(self, box=None):
+        if box is None:
+            box = self.monitor_box(1)
+        shot = self.sct.grab(box)
+        return Frame(shot.raw, tuple(shot.size), "BGRA", shot.left, shot.top)
+
+    def monitor_box(self, number):
+        """Box of a monitor; 0 is the whole desktop across all monitors."""
+        monitors = self.sct.monitors
+        if not 0 <= number < len(monitors):
+            raise ValueError(f"No monitor {number} (found {len(monitors) - 1})")
+        monitor = monitors[number]
+        return (monitor["left"], monitor["top"], monitor["left"] + monitor["width"],
+                monitor["top"] + monitor["height"])
+
+    def clip(self, box):
+        desktop = self.monitor_box(0)
+        left, top = max(box[0], desktop[0]), max(box[1], desktop[1])
+        right, bottom = min(box[2], desktop[2]), min(box[3], desktop[3])
+        if right <= left or bottom <= top:
+            return None
+        return (left, top, right, bottom)
+
+    def close(self):
+        with self._lock:
+            instances, self._instances = self._instances, []
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+class PilBackend(CaptureBackend):
+    """Pillow's ImageGrab (GDI on Windows, screencapture on macOS, XCB on Linux)."""
+
+    name = "pil"
+
+    def available(self):
+        return sys.platform in ("win32", "darwin") or bool(os.environ.get("DISPLAY"))
+
+    def grab(self, box=None):
+        from PIL import ImageGrab
+        # all_screens lets boxes on other monitors work on Windows
+        image = ImageGrab.grab(bbox=box, all_screens=box is not None)
+        left, top = box[:2] if box else (0, 0)
+        return Frame.from_image(image, left, top)
+
+
+class PyAutoGuiBackend(CaptureBackend):
+    """pyautogui.screenshot(), the original capture path."""
+
+    name = "pyautogui"
+
+    def available(self):
+        try:
+            import pyautogui  # noqa: F401
+            return True
+        except Exception:
+            # pyautogui raises more than ImportError without a display
+            return False
+
+    def grab(self, box=None):
+        import pyautogui
+        if box is None:
+            return Frame.from_image(pyautogui.screenshot())
+        left, top, right, bottom = box
+        return Frame.from_image(pyautogui.screenshot(region=(left, top, right - left, bottom - top)), left, top)
+
+
+CAPTURE_BACKENDS = {"mss": MssBackend, "pil": PilBackend, "pyautogui": PyAutoGuiBackend}
+# Tried in this order by get_capture_backend("auto")
+AUTO_BACKENDS = ("mss", "pil", "pyautogui")
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_capture_backend(name="auto"):
+    """The shared backend instance for name; "auto" is the first available one."""
+    with _backends_lock:
+        if name not in _backends:
+            if name == "auto":
+                candidates = [CAPTURE_BACKENDS[candidate]() for candidate in AUTO_BACKENDS]
+                backend = next((candidate for candidate in candidates if candidate.available()), candidates[-1])
+                logging.info(f"Capture backend: {backend.name}")
+            elif name in CAPTURE_BACKENDS:
+                backend = CAPTURE_BACKENDS[name]()
+            else:
+                raise ValueError(f"Unknown capture backend: {name!r}")
+            _backends[name] = backend
+        return _backends[name]
+
+def _active_window():
+    try:
+        import pygetwindow
+        return pygetwindow.getActiveWindow()
+    except Exception:
+        return None
+
+def active_window_box():
+    """(left, top, right, bottom) of the focused window, or None when unknown or minimized."""
+    window = _active_window()
+    if window is None or getattr(window, "isMinimized", False) or window.width <= 0 or window.height <= 0:
+        return None
+    return (window.left, window.top, window.left + window.width, window.top + window.height)
+
+def target_box(target, backend):
+    """
+    Resolves a capture target to a box for backend.grab(): "window" (the focused
+    window, or the primary monitor when there is none), a monitor number or a
+    (left, top, right, bottom) rectangle.
+    """
+    if target == "window":
+        box = active_window_box()
+        box = backend.clip(box) if box else None
+        if box:
+            return box
+        target = 1
+    if isinstance(target, int):
+        return backend.monitor_box(target)
+    return tuple(target)
+
+def grab_frame(target="window", backend="auto"):
+    """Captures the target with the named backend and returns a Frame."""
+    backend = get_capture_backend(backend)
+    return backend.grab(target_box(target, backend))
+
+def grab_screenshot(target="window", backend="auto"):
+    """Captures the target (see target_box) as a Frame, converted to a PIL image on demand."""
+    with tracing.span("capture"):
+        return grab_frame(target, backend)
+
+def active_window_title():
+    """Title of the focused window, used to remember settings per game; "default" when unknown."""
+    window = _active_window()
+    if window is not None and window.title:
+        return window.title
+    return "default"
+
+def prepare_image(image, settings):
+    """Crops and downscales an image according to the settings."""
+    from PIL import Image
+    if settings.crop:
+        image = image.crop(settings.crop)
+    if settings.max_dimension and max(image.size) > settings.max_dimension:
+        scale = settings.max_dimension / max(image.size)
+        new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        # reducing_gap does a cheap integer reduce first, then a bilinear pass
+        image = image.resize(new_size, Image.BILINEAR, reducing_gap=2.0)
+    if settings.format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+def encode_image(image, settings):
+    """Encodes a prepared image to bytes in the configured format."""
+    with BytesIO() as buf:
+        if settings.format == "PNG":
+            image.save(buf, format="PNG")
+        elif settings.format == "JPEG":
+            image.save(buf, format="JPEG", quality=settings.quality)
+        else:
+            image.save(buf, format="WEBP", quality=settings.quality, method=0)
+        return buf.getvalue()
+
+def encode_for_upload(image, settings):
+    """Runs prepare + encode on an already captured image and returns an EncodedImage."""
+    start = time.perf_counter()
+    with tracing.span("encode"):
+        prepared = prepare_image(image, settings)
+        encoded = EncodedImage(encode_image(prepared, settings), settings.format)
+    tracing.set_value("payload_bytes", len(encoded))
+    elapsed = time.perf_counter() - start
+    logging.info(
+        f"Encoded {image.size[0]}x{image.size[1]} -> {prepared.size[0]}x{prepared.size[1]} "
+        f"{settings.format} ({len(encoded) / 1024:.0f} KiB) in {elapsed * 1000:.0f}ms"
+    )
+    return encoded
+
+def capture_and_encode(settings):
+    """Captures the screen and returns it as an EncodedImage ready for the LLM."""
+    return encode_for_upload(grab_screenshot(), settings)
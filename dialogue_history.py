@@ -0,0 +1,203 @@
+"""
+Per-session dialogue history, so repeated presses only read out what's new.
+
+In visual novels and RPGs the dialogue box often still shows the previous
+lines when the next one appears. DialogueHistory remembers the segments
+(lines and sentences) read recently in each session and fuzzy-matches every
+new extraction against them: case, punctuation and spacing are ignored, and
+small OCR/model differences ("I'm" vs "Im", a misread letter) still match.
+A sentence is also recognized when the new extraction splits or joins it
+differently from last time.
+
+A read works per sentence, so it can filter a streamed reply as it arrives:
+
+    read = history.start_read(session, frame_hash)
+    speak_streaming(chunks, keep=read.keep)   # only unseen sentences are spoken
+    read.commit(full_text)                    # once the reply was heard
+
+Sessions are keyed by the caller, e.g. (game window, hotkey), so one hotkey
+reading a box doesn't silence another. Pressing again on the same screen
+(frame hash) within replay_window seconds reads it out in full; only a
+changed screen is filtered down to its new lines. A session ends after
+session_gap seconds without a read, and its history starts over.
+
+The history also keeps follow-up results (rephrasing, word explanations)
+keyed on the normalized text they were made for, so a text that was already
+rephrased isn't sent to the model again.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from difflib import SequenceMatcher
+
+import tracing
+from response_cache import MAX_DISTANCE, hamming_distance
+
+# Segment boundaries: sentence ends (optionally closed by a quote/bracket) and newlines
+SEGMENT_END_RE = re.compile(r'(?<=[.!?…])["\')\]]*\s+|\n+')
+# Segments shorter than this (normalized) only match exactly; fuzzy matching is noise at that length
+MIN_FUZZY_CHARS = 12
+# Matching blocks shorter than this are coincidences, not shared text
+MIN_BLOCK_CHARS = 3
+
+
+def normalize(text):
+    """Lowercase letters and digits with single spaces, for comparing extractions."""
+    return " ".join(re.sub(r"[^\w]+", " ", text.lower()).split())
+
+def split_segments(text):
+    """Splits dialogue text into normalized, non-empty lines/sentences."""
+    return [segment for segment in (normalize(part) for part in SEGMENT_END_RE.split(text)) if segment]
+
+def coverage(candidate, reference):
+    """Share (0-1) of candidate's characters found, in order, in reference."""
+    if not candidate:
+        return 1.0
+    matcher = SequenceMatcher(None, candidate, reference, autojunk=False)
+    matched = sum(block.size for block in matcher.get_matching_blocks() if block.size >= MIN_BLOCK_CHARS)
+    return matched / len(candidate)
+
+
+class DialogueRead:
+    """One extraction being checked against the history; see DialogueHistory.start_read()."""
+
+    def __init__(self, history, session, frame, seen, replay):
+        self.history = history
+        self.session = session
+        self.frame = frame
+        self.replay = replay
+        self.new = []
+        self.skipped = []
+        self._seen = seen
+
+    def keep(self, sentence):
+        """True if the sentence should be spoken (it hasn't been read this session)."""
+        if self.replay or not self.history.is_seen(sentence, self._seen):
+            self.new.append(sentence)
+            return True
+        self.skipped.append(sentence)
+        return False
+
+    @property
+    def new_text(self):
+        return " ".join(self.new)
+
+    @property
+    def repeat(self):
+        """True when nothing in the extraction was new."""
+        return bool(self.skipped) and not self.new
+
+    def commit(self, text):
+        """Adds the extraction to the session history once it has been read out."""
+        self.history.remember(self.session, text, frame=self.frame)
+        tracing.set_value("new_lines", len(self.new))
+        if self.skipped:
+            logging.info(f"Skipped {len(self.skipped)} already read line(s), {len(self.new)} new")
+
+
+class DialogueHistory:
+    """Recently read dialogue segments per session, plus text-keyed follow-up results."""
+
+    def __init__(self, max_segments=200, threshold=0.85, session_gap=900, replay_window=300, max_distance=MAX_DISTANCE,
+                 max_results=256):
+        self.max_segments = max_segments
+        self.threshold = threshold
+        self.session_gap = session_gap
+        self.replay_window = replay_window
+        self.max_distance = max_distance
+        self.max_results = max_results
+        self._sessions = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Segment history
+    # ------------------------------------------------------------
+    def _session(self, key, now):
+        session = self._sessions.get(key)
+        if session is None or now - session["last_read"] > self.session_gap:
+            session = {"segments": deque(maxlen=self.max_segments), "last_read": now, "last_frame": None}
+            self._sessions[key] = session
+        return session
+
+    def start_read(self, key="default", frame=None):
+        """Snapshots the session history for one extraction of the frame (a dhash, if known)."""
+        now = time.time()
+        with self._lock:
+            session = self._session(key, now)
+            # Pressing again on the screen that was just read asks to hear it again
+            last = session["last_frame"]
+            replay = (last is not None and frame is not None and now - session["last_read"] <= self.replay_window
+                      and hamming_distance(last, frame) <= self.max_distance)
+            seen = list(session["segments"])
+        if replay:
+            logging.info("Same screen again: reading it out in full")
+        return DialogueRead(self, key, frame, seen, replay)
+
+    def remember(self, key, text, frame=None):
+        now = time.time()
+        with self._lock:
+            session = self._session(key, now)
+            session["last_read"] = now
+            session["last_frame"] = frame
+            segments = session["segments"]
+            for segment in split_segments(text):
+                if segment in segments:
+                    # Keep the deque in reading order without duplicates
+                    segments.remove(segment)
+                segments.append(segment)
+
+    def is_seen(self, sentence, seen):
+        """True if every segment of the sentence matches something in seen (a list of normalized segments)."""
+        segments = split_segments(sentence)
+        return bool(segments) and all(self._matches(segment, seen) for segment in segments)
+
+    def _matches(self, segment, seen):
+        if segment in seen:
+            return True
+        if len(segment) < MIN_FUZZY_CHARS:
+            return False
+        words = set(segment.split())
+        # Each seen segment, and each pair of neighbours in case the new extraction joined two lines
+        candidates = seen + [f"{a} {b}" for a, b in zip(seen, seen[1:])]
+        for reference in candidates:
+            if len(reference) < self.threshold * len(segment):
+                continue
+            if len(words & set(reference.split())) < self.threshold * len(words) / 2:
+                continue
+            if coverage(segment, reference) >= self.threshold:
+                return True
+        return False
+
+    def clear(self, key=None):
+        """Forgets one session, or every session and follow-up result."""
+        with self._lock:
+            if key is None:
+                self._sessions.clear()
+                self._results.clear()
+            else:
+                self._sessions.pop(key, None)
+
+    # ------------------------------------------------------------
+    # Follow-up results
+    # ------------------------------------------------------------
+    def result(self, kind, text):
+        """Cached follow-up result (e.g. a rephrasing) for this text, or None."""
+        key = (kind, normalize(text))
+        with self._lock:
+            response = self._results.get(key)
+            if response is not None:
+                self._results.move_to_end(key)
+        if response is not None:
+            logging.info("Reusing follow-up result for already seen text")
+        return response
+
+    def store_result(self, kind, text, response):
+        key = (kind, normalize(text))
+        with self._lock:
+            self._results[key] = response
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
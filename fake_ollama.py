@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for an Ollama server, for benchmarks and offline runs.
+
+Serves /api/chat, /api/generate and /api/ps with NDJSON streams whose timing
+is configurable: time to first token, token rate, a mid-stream stall and a
+random error rate. Requests that pass a JSON `format` get a JSON object
+matching the schema's properties back, so the structured mode works too.
+
+Usage:
+    python fake_ollama.py --port 11434 --ttft 0.8 --tokens-per-sec 30
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "Mario in his red hat says (boing!): 'Let's jump over the turtle!' "
+    "The green button says START, that's how we begin the adventure! "
+    "A little star is blinking in the corner, it means you can save your game."
+)
+
+
+class FakeOllamaConfig:
+    """Behaviour of the stand-in server; may be changed while it is running."""
+
+    def __init__(self, ttft=0.5, tokens_per_sec=40.0, reply=DEFAULT_REPLY, error_rate=0.0, stall_after=None,
+                 stall_seconds=0.0, loaded_models=("gemma3_27b_40k:latest",), load_seconds=0.0, seed=0):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.reply = reply
+        self.error_rate = error_rate
+        self.stall_after = stall_after
+        self.stall_seconds = stall_seconds
+        self.loaded_models = list(loaded_models)
+        # Extra delay before the first token when the requested model isn't loaded yet
+        self.load_seconds = load_seconds
+        self.random = random.Random(seed)
+
+
+def split_tokens(text):
+    """Roughly word-sized tokens that keep their trailing whitespace."""
+    tokens = []
+    current = ""
+    for c in text:
+        current += c
+        if c == " ":
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+def structured_reply(schema, text):
+    """Builds a JSON reply with one value per schema property."""
+    reply = {}
+    for name, spec in schema.get("properties", {}).items():
+        if spec.get("type") == "array":
+            reply[name] = [{"word": "adventure", "meaning": "a fun and exciting trip"}]
+        elif spec.get("type") == "string":
+            reply[name] = text
+        else:
+            reply[name] = None
+    return json.dumps(reply)
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def do_GET(self):
+        if self.path == "/api/ps":
+            models = [{"name": name, "model": name} for name in self.config.loaded_models]
+            self._send_json({"models": models})
+        elif self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = self._read_chunked()
+        else:
+            body = self.rfile.read(length)
+        self.server.record_request(self.path, len(body))
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+        config = self.config
+        if config.error_rate and config.random.random() < config.error_rate:
+            self._send_json({"error": "simulated server error"}, status=500)
+            return
+
+        model = request.get("model", "")
+        is_chat = self.path == "/api/chat"
+        # An empty chat or prompt only loads the model, like the real server
+        if (is_chat and not request.get("messages")) or (not is_chat and not request.get("prompt")):
+            self._load_model(model)
+            self._send_json(self._chunk(model, is_chat, "", done=True))
+            return
+
+        text = config.reply
+        if isinstance(request.get("format"), dict):
+            text = structured_reply(request["format"], config.reply)
+        elif request.get("format") == "json":
+            text = json.dumps({"text": config.reply})
+        options = request.get("options") or {}
+        for stop in options.get("stop") or []:
+            if stop in text:
+                text = text[:text.index(stop)]
+        tokens = split_tokens(text)
+        num_predict = options.get("num_predict")
+        if num_predict:
+            tokens = tokens[:num_predict]
+
+        start = time.perf_counter()
+        self._load_model(model)
+        time.sleep(config.ttft)
+        prompt_eval = time.perf_counter() - start
+
+        if not request.get("stream", True):
+            time.sleep(len(tokens) / config.tokens_per_sec)
+            final = self._chunk(model, is_chat, "".join(tokens), done=True)
+            final.update(self._timings(len(tokens), prompt_eval, time.perf_counter() - start - prompt_eval))
+            self._send_json(final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if config.stall_after is not None and i == config.stall_after:
+                    time.sleep(config.stall_seconds)
+                elif i:
+                    time.sleep(1.0 / config.tokens_per_sec)
+                self._write_chunk(self._chunk(model, is_chat, token, done=False))
+            final = self._chunk(model, is_chat, "", done=True)
+            final.update(self._timings(len(tokens), prompt_eval, time.perf_counter() - start - prompt_eval))
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            self.close_connection = True
+
+    def _load_model(self, model):
+        config = self.config
+        if model and model not in config.loaded_models:
+            time.sleep(config.load_seconds)
+            config.loaded_models.append(model)
+
+    @staticmethod
+    def _chunk(model, is_chat, content, done):
+        chunk = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "done": done}
+        if is_chat:
+            chunk["message"] = {"role": "assistant", "content": content}
+        else:
+            chunk["response"] = content
+        return chunk
+
+    @staticmethod
+    def _timings(count, prompt_eval, generation):
+        return {
+            "eval_count": count,
+            "eval_duration": int(generation * 1e9),
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "load_duration": 0,
+        }
+
+    def _write_chunk(self, payload):
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _read_chunked(self):
+        body = b""
+        while True:
+            size = int(self.rfile.readline().strip(), 16)
+            if size == 0:
+                self.rfile.readline()
+                return body
+            body += self.rfile.read(size)
+            self.rfile.readline()
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Threaded stand-in server; use as a context manager or call start()/stop()."""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), FakeOllamaHandler)
+        self.config = config or FakeOllamaConfig()
+        self.requests = []
+        self._requests_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        # Clients closing cancelled or hedged streams are expected; don't print tracebacks for them
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def record_request(self, path, size):
+        with self._requests_lock:
+            self.requests.append((path, size))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="FakeOllama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--ttft", type=float, default=0.5, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--stall-after", type=int, help="Pause the stream after this many tokens")
+    parser.add_argument("--stall-seconds", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(ttft=args.ttft, tokens_per_sec=args.tokens_per_sec, error_rate=args.error_rate,
+                              stall_after=args.stall_after, stall_seconds=args.stall_seconds)
+    server = FakeOllamaServer(config, host=args.host, port=args.port)
+    print(f"Fake Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Background frame watcher with speculative pre-extraction.
+
+A low-rate capture loop diffs tiny grayscale thumbnails of the screen. When
+the screen changes and then stays still for a few frames (a new dialogue box
+has finished appearing), the watcher runs the extraction callback on that
+frame so the answer is already cached when the hotkey is pressed.
+
+Budgets:
+  * cpu_budget caps the fraction of wall time spent capturing and diffing;
+    the loop sleeps longer when a capture is slow.
+  * min_interval and max_per_minute rate-limit speculative LLM requests.
+  * is_busy pauses speculation while a hotkey pipeline is using the GPU, and
+    cancel_speculation() aborts one that is in flight when a hotkey is pressed.
+
+extract() runs inside a scheduler Job, so the LLM helpers see it as
+cancellable work just like a hotkey pipeline.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from PIL import Image, ImageChops, ImageStat
+
+from response_cache import MAX_DISTANCE, dhash, hamming_distance
+from scheduler import Job, job_context
+
+THUMB_SIZE = (64, 36)
+
+
+def frame_difference(a, b):
+    """Mean absolute difference (0-255) between two thumbnails of the same size."""
+    return sum(ImageStat.Stat(ImageChops.difference(a, b)).mean)
+
+
+class FrameWatcher:
+    """Watches the screen and calls extract(screenshot, frame_hash) when it settles on new content."""
+
+    def __init__(self, grab, extract, fps=2.0, change_threshold=4.0, settle_frames=2, min_interval=4.0,
+                 max_per_minute=6, cpu_budget=0.05, is_busy=None, hash_func=dhash,
+                 match_distance=MAX_DISTANCE):
+        self.grab = grab
+        self.extract = extract
+        self.fps = fps
+        self.change_threshold = change_threshold
+        self.settle_frames = settle_frames
+        self.min_interval = min_interval
+        self.max_per_minute = max_per_minute
+        self.cpu_budget = cpu_budget
+        self.is_busy = is_busy
+        self.hash_func = hash_func
+        self.match_distance = match_distance
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._request_times = deque()
+        self._speculated = {}
+        self._speculation = None
+        self.counts = {"frames": 0, "settled": 0, "speculative_runs": 0, "rate_limited": 0,
+                       "lookups": 0, "hits": 0, "wasted_evicted": 0}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="FrameWatcher", daemon=True)
+        self._thread.start()
+        logging.info(f"Frame watcher started at {self.fps} fps")
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def cancel_speculation(self):
+        """Aborts an in-flight speculative request so a hotkey press doesn't queue behind it on the GPU."""
+        job = self._speculation
+        if job:
+            job.cancel()
+
+    def note_lookup(self, frame_hash):
+        """Records a hotkey lookup so hit rate can be reported. Returns True if a speculative result matched."""
+        with self._lock:
+            self.counts["lookups"] += 1
+            for speculated_hash in self._speculated:
+                if hamming_distance(speculated_hash, frame_hash) <= self.match_distance:
+                    self._speculated[speculated_hash] = True
+                    self.counts["hits"] += 1
+                    return True
+        return False
+
+    def stats(self):
+        """Counters plus hit rate and speculative runs whose result was never used."""
+        with self._lock:
+            summary = dict(self.counts)
+            summary["wasted"] = summary.pop("wasted_evicted") + \
+                sum(1 for used in self._speculated.values() if not used)
+        lookups = summary["lookups"]
+        summary["hit_rate"] = summary["hits"] / lookups if lookups else 0.0
+        return summary
+
+    def _allow_request(self, now):
+        while self._request_times and now - self._request_times[0] > 60:
+            self._request_times.popleft()
+        if self._request_times and now - self._request_times[-1] < self.min_interval:
+            return False
+        return len(self._request_times) < self.max_per_minute
+
+    def _run(self):
+        period = 1.0 / self.fps
+        previous = None
+        still_frames = 0
+        last_speculated_hash = None
+
+        while not self._stop.is_set():
+            tick = time.perf_counter()
+            try:
+                screenshot = self.grab()
+                thumb = screenshot.resize(THUMB_SIZE, Image.BOX).convert("L")
+            except Exception as e:
+                logging.debug(f"Frame watcher capture failed: {e}")
+                self._stop.wait(period * 5)
+                continue
+            self.counts["frames"] += 1
+
+            if previous is not None and frame_difference(previous, thumb) > self.change_threshold:
+                still_frames = 0
+            else:
+                still_frames += 1
+            previous = thumb
+            capture_time = time.perf_counter() - tick
+
+            if still_frames == self.settle_frames:
+                self.counts["settled"] += 1
+                frame_hash = self._maybe_speculate(screenshot, last_speculated_hash)
+                if frame_hash is not None:
+                    last_speculated_hash = frame_hash
+
+            # Stay inside the CPU budget: a slow capture stretches the sleep
+            elapsed = time.perf_counter() - tick
+            self._stop.wait(max(period - elapsed, capture_time / self.cpu_budget - capture_time))
+
+    def _maybe_speculate(self, screenshot, last_speculated_hash):
+        """Runs extract() on a settled frame if it is new and the budget allows. Returns its hash if it ran."""
+        if self.is_busy and self.is_busy():
+            return None
+        frame_hash = self.hash_func(screenshot)
+        if last_speculated_hash is not None and \
+                hamming_distance(frame_hash, last_speculated_hash) <= self.match_distance:
+            return None
+        now = time.time()
+        if not self._allow_request(now):
+            self.counts["rate_limited"] += 1
+            return None
+
+        self._request_times.append(now)
+        self.counts["speculative_runs"] += 1
+        with self._lock:
+            self._speculated[frame_hash] = False
+            # Only recent frames can still be asked about
+            while len(self._speculated) > 50:
+                if not self._speculated.pop(next(iter(self._speculated))):
+                    self.counts["wasted_evicted"] += 1
+        logging.info("Screen settled on new content; running speculative extraction")
+        self._speculation = Job("speculative")
+        try:
+            with job_context(self._speculation):
+                self.extract(screenshot, frame_hash)
+        except Exception as e:
+            logging.warning(f"Speculative extraction failed: {e}")
+        finally:
+            self._speculation = None
+        return frame_hash
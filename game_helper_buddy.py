@@ -1,26 +1,44 @@
+import importlib
 import threading
 import time
 import logging
-import base64
 from datetime import datetime
-import requests
-import json
-import pyttsx3
-import comtypes
 import keyboard
-import pyautogui
-from io import BytesIO
 import sys
 import os
-from obsws_python import ReqClient
-import subprocess
-
-# Global state
-pipeline_in_progress = False
+from dataclasses import replace
+from audio_cache import AudioCache
+from capture import CaptureSettings, active_window_title, encode_for_upload, get_capture_backend
+from capture import grab_screenshot as capture_screenshot
+from dialogue_history import DialogueHistory
+from model_residency import ResidencyManager
+from obs_controller import ObsController
+from ocr import read_text
+from roi import RegionMemory
+from ollama_client import OLLAMA_BASE_URL
+from ollama_router import OllamaRouter
+from profiles import GenerationProfile
+from response_cache import FRAME_MAX_DISTANCE, ResponseCache, dhash
+from scheduler import JobScheduler, current_job
+import tracing
+from tracing import Tracer, trace_context
+from structured_output import DIALOGUE_SCHEMA, iter_json_fields
+from speech import SpeechService, create_engine, iter_sentences, PRIORITY_LOW
 
 # Global list for hotkey handles
 registered_hotkeys = []
 
+# Ollama servers to route between; add more URLs (e.g. a second GPU box) for failover and hedging
+OLLAMA_BACKENDS = [OLLAMA_BASE_URL]
+# Seconds without a first token before the request is also sent to the next backend (None disables hedging)
+HEDGE_AFTER = 3.0
+
+# Pooled connections to the Ollama servers, shared by hotkeys, warmup and keep-alive
+ollama_client = OllamaRouter(OLLAMA_BACKENDS, hedge_after=HEDGE_AFTER)
+
+# Re-exec the whole program on resume instead of recovering in-process (the old behaviour)
+RESTART_ON_RESUME = False
+
 def restart_program():
     logging.info("Detected system resume; restarting program.")
     python = sys.executable
@@ -66,174 +84,611 @@ REPHRASE_FOR_KID_PROMPT = (
     "**Keep it short so the game can keep moving.**"
 )
 
-def analyze_image_with_llm(
-    image_base64,
-    prompt=DEFAULT_SYSTEM_PROMPT,
-    endpoint="http://192.168.50.250:11434/api/chat",
-    model="gemma3_27b_40k:latest",
-    timeout=60
-):
+COMBINED_SYSTEM_PROMPT = (
+    "You help a 5-year-old child read game dialogue. Look at the screenshot and reply in JSON with:\n"
+    "- original_text: the exact text from any speech or text bubbles, including the NPC's name if visible, "
+    "or 'No text detected.' if there is no readable text.\n"
+    "- rephrased: the same text in simpler, playful words a 5-year-old understands. "
+    "If it is already simple, repeat it as-is. Keep it short.\n"
+    "- hard_words: up to three tricky words from the text, each with a short, cheerful meaning "
+    "a kindergartener would understand. Use an empty list if there are none.\n"
+    "Never mention you're an AI or analyzing an image. Do not use sound effects."
+)
+
+# Output caps, sampling, timeout and model per prompt (see profiles.py). The extraction prompts get short,
+# deterministic budgets; F9 keeps room for its narration. num_ctx is left to the model: changing it between
+# requests would make Ollama reload the model
+GENERATION_PROFILES = {
+    DEFAULT_SYSTEM_PROMPT: GenerationProfile("describe", num_predict=320, temperature=0.7, max_chars=1200),
+    SIMPLE_SYSTEM_PROMPT: GenerationProfile("extract", num_predict=160, temperature=0.0,
+                                            end_on=("no text detected",)),
+    EXPLAIN_WORDS_PROMPT: GenerationProfile("explain", num_predict=256, temperature=0.5, max_chars=900),
+    REPHRASE_FOR_KID_PROMPT: GenerationProfile("rephrase", num_predict=160, temperature=0.3, timeout=30),
+    COMBINED_SYSTEM_PROMPT: GenerationProfile("combined", num_predict=480, temperature=0.2, json_object=True),
+}
+DEFAULT_PROFILE = GenerationProfile()
+
+# The question sent with every screenshot; keep it (and the prompts) fixed so requests share a cached prefix
+IMAGE_QUESTION = "What's happening in my game right now? Please tell me!"
+
+def profile_for(prompt):
+    return GENERATION_PROFILES.get(prompt, DEFAULT_PROFILE)
+
+# Screenshot downscale/format used by every hotkey (see bench_capture.py for the trade-offs)
+CAPTURE_SETTINGS = CaptureSettings(max_dimension=1600, format="JPEG", quality=85)
+
+# Screen capture library: "auto" (mss when installed, else Pillow's ImageGrab, else pyautogui), "mss", "pil" or
+# "pyautogui". Compare them with bench_grab.py
+CAPTURE_BACKEND = "auto"
+# What a hotkey captures: "window" (the focused game window, or the primary monitor when there is none), a monitor
+# number (1 = primary) or a (left, top, right, bottom) rectangle. Crop boxes and OCR_REGIONS are relative to it
+CAPTURE_TARGET = "window"
+
+def grab_screenshot():
+    """Captures CAPTURE_TARGET with CAPTURE_BACKEND as a Frame (usable as a PIL image, converted on demand)"""
+    return capture_screenshot(CAPTURE_TARGET, CAPTURE_BACKEND)
+
+# Reuse answers for near-identical screenshots; persisted so they survive restart_program()
+RESPONSE_CACHE = ResponseCache(
+    max_entries=256,
+    ttl=3600,
+    max_distance=12,
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache.json")
+)
+
+# Answers built offline with `python ollama_chat.py screenshots/ --cache prebuilt_cache.json`; they don't expire.
+# Loaded by the background warm-up, after the hotkeys are up
+PREBUILT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prebuilt_cache.json")
+prebuilt_cache = None
+
+def load_prebuilt_cache():
+    """Loads the pre-built answers, if there are any"""
+    global prebuilt_cache
+    if os.path.exists(PREBUILT_CACHE_PATH):
+        prebuilt_cache = ResponseCache(max_entries=100000, ttl=None, max_distance=RESPONSE_CACHE.max_distance,
+                                       path=PREBUILT_CACHE_PATH,
+                                       autosave=False)
+
+def cached_response(frame_hash, prompt, model, max_distance=None):
+    """Answer for a near-identical frame from RESPONSE_CACHE or the pre-built cache, or None"""
+    response = RESPONSE_CACHE.get(frame_hash, prompt, model, max_distance)
+    if response is None and prebuilt_cache is not None:
+        response = prebuilt_cache.get(frame_hash, prompt, model, max_distance)
+    return response
+
+LLM_ERROR_RESPONSE = "Oops! Let's try that again. (error sound)"
+
+# Speak sentences as soon as they stream in instead of waiting for the full reply
+STREAMING_TTS = True
+
+# Per-stage latency of every hotkey run, appended to a rotating JSONL file (summarize with `python tracing.py`)
+tracer = Tracer(path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl"))
+
+# Watch the screen in the background and pre-extract new dialogue before a hotkey is pressed
+FRAME_WATCHER_ENABLED = False
+frame_watcher = None
+
+# F10/` ask for text, rephrase and word explanations in one structured request
+# instead of two sequential calls
+COMBINED_MODE = True
+
+def stream_chat_with_llm(messages, model="gemma3_27b_40k:latest", timeout=None, client=None, profile=None,
+                         background=False, **options):
     """
-    Sends a base64-encoded image to the Ollama LLM with a provided prompt.
+    Streams an Ollama chat reply, yielding text chunks as they arrive.
+    The profile's options and timeout apply unless given explicitly, and the stream
+    is closed as soon as the profile's end condition is met.
+    Background requests (speculation) don't count as use for the model residency.
+    Extra options (format, keep_alive, ...) are passed through to the request.
+    On failure the error line is yielded instead, so callers can always speak the result.
     """
-    logging.info("Starting LLM API request")
+    profile = profile or DEFAULT_PROFILE
+    logging.info(f"Starting streaming LLM API request ({profile.describe()})")
 
+    client = client or ollama_client
     start_time = datetime.now()
-    messages = [
-        {"role": "system", "content": prompt},
-        {
-            "role": "user",
-            "content": "What's happening in my game right now? Please tell me!",
-            "images": [image_base64]
-        }
-    ]
+    timeout = timeout or profile.timeout
+    options.setdefault("keep_alive", MODEL_KEEP_ALIVE)
+    if profile.options():
+        options["options"] = {**profile.options(), **options.get("options", {})}
+    if not background:
+        model_residency.note_use(model)
+    tracing.set_value("profile", profile.name)
+    limit = profile.limit()
 
     try:
-        response = requests.post(
-            endpoint,
-            json={
-                "model": model,
-                "messages": messages,
-                "stream": True
-            },
-            timeout=timeout
-        )
-        response.raise_for_status()
-
-        accumulated_text = ""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    data = json.loads(line.decode("utf-8"))
-                    if "message" in data:
-                        accumulated_text += data["message"]["content"]
-                except json.JSONDecodeError:
-                    continue
+        # The request is sent when the stream is iterated, so a newer hotkey press can abort it
+        # at any point, including while the server is still evaluating the prompt
+        stream = client.chat(model, messages, stream=True, timeout=timeout, **options)
+        job = current_job()
+        if job:
+            job.on_cancel(stream.close)
+
+        first_token = True
+        for content in stream.text():
+            if first_token:
+                first_token = False
+                elapsed = (datetime.now() - start_time).total_seconds()
+                tracing.record("ttft", elapsed, accumulate=False)
+                # Timed where the request is sent; a routed request is sent on a backend attempt's thread
+                if getattr(stream, "upload_seconds", None) is not None:
+                    tracing.record("upload", stream.upload_seconds)
+                logging.info(f"LLM first token after {elapsed:.2f}s")
+            done = False
+            if limit:
+                content, done = limit.feed(content)
+            if content:
+                yield content
+            if done:
+                # The answer is complete; closing the response stops the server generating the rest
+                stream.close()
+                tracing.set_value("stopped_early", limit.reason)
+                logging.info(f"LLM reply complete ({limit.reason}); closed the stream")
+                break
+
+        if pipeline_cancelled():
+            logging.info("LLM request cancelled")
+            return
 
         elapsed = (datetime.now() - start_time).total_seconds()
+        tracing.record("generation", elapsed)
+        record_ollama_timings(stream.final)
         logging.info(f"LLM request completed in {elapsed:.2f}s")
-        logging.debug(f"Accumulated response text: {accumulated_text}")
-        return accumulated_text
 
     except Exception as e:
         logging.error(f"LLM request failed: {str(e)}")
-        return "Oops! Let's try that again. (error sound)"
+        yield LLM_ERROR_RESPONSE
+
+def record_ollama_timings(final_chunk):
+    """Adds the server-side timings from Ollama's final chunk to the current trace"""
+    if not final_chunk:
+        return
+    if final_chunk.get("eval_count"):
+        tracing.set_value("output_tokens", final_chunk["eval_count"])
+    if final_chunk.get("eval_count") and final_chunk.get("eval_duration"):
+        tracing.set_value("tokens_per_sec", final_chunk["eval_count"] / (final_chunk["eval_duration"] / 1e9))
+    if final_chunk.get("prompt_eval_duration"):
+        tracing.record("prompt_eval", final_chunk["prompt_eval_duration"] / 1e9)
+    if final_chunk.get("load_duration"):
+        tracing.record("load", final_chunk["load_duration"] / 1e9)
+
+def build_messages(prompt, content, image=None):
+    """
+    Chat messages in one fixed layout: the system prompt, then the user turn (text, then image).
+
+    Requests with the same prompt start with the same bytes, so the server can reuse
+    the cached prompt prefix; only the user turn differs.
+    """
+    user = {"role": "user", "content": content}
+    if image is not None:
+        user["images"] = [image]
+    return [{"role": "system", "content": prompt}, user]
+
+def stream_image_with_llm(
+    image_base64,
+    prompt=DEFAULT_SYSTEM_PROMPT,
+    model="gemma3_27b_40k:latest",
+    timeout=None,
+    client=None,
+    background=False,
+    **options
+):
+    """
+    Sends an image (an EncodedImage or a base64 string) to the Ollama LLM and yields text chunks as they arrive.
+    The prompt's generation profile sets the output cap and timeout.
+    """
+    messages = build_messages(prompt, IMAGE_QUESTION, image_base64)
+    yield from stream_chat_with_llm(messages, model=model, timeout=timeout, client=client,
+                                    profile=profile_for(prompt), background=background, **options)
+
+def stream_text_with_llm(
+    text,
+    prompt=REPHRASE_FOR_KID_PROMPT,
+    model="gemma3_27b_40k:latest",
+    timeout=None,
+    client=None,
+    **options
+):
+    """
+    Sends plain text (no image) to the Ollama LLM and yields text chunks as they arrive.
+    """
+    messages = build_messages(prompt, text)
+    yield from stream_chat_with_llm(messages, model=model, timeout=timeout, client=client,
+                                    profile=profile_for(prompt), **options)
+
+def analyze_image_with_llm(
+    image_base64,
+    prompt=DEFAULT_SYSTEM_PROMPT,
+    model="gemma3_27b_40k:latest",
+    timeout=None,
+    client=None,
+    background=False
+):
+    """
+    Sends an image (an EncodedImage or a base64 string) to the Ollama LLM with a provided prompt.
+    """
+    accumulated_text = "".join(stream_image_with_llm(
+        image_base64, prompt=prompt, model=model, timeout=timeout, client=client, background=background
+    ))
+    logging.debug(f"Accumulated response text: {accumulated_text}")
+    return accumulated_text
 
 
 # ----------------------------------------------------------------
 # 2) TTS client functionality 
 # ----------------------------------------------------------------
-import threading
-import logging
-import pyttsx3
-import comtypes
-import time
+# Which speech engine backend to use: "pyttsx3", "espeak" or "fake"
+TTS_BACKEND = "pyttsx3"
+
+# Rendered speech for fixed and often repeated phrases, played from memory (and kept in audio_cache/)
+AUDIO_CACHE = AudioCache(
+    max_bytes=32 * 1024 * 1024,
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_cache"),
+    max_disk_bytes=128 * 1024 * 1024
+)
+READY_SOUND = "(ding!)"
+READY_SOUND_RATE = 250
+# Spoken all the time, so rendered as soon as the speech engine is up
+FIXED_PHRASES = ("No text detected.", LLM_ERROR_RESPONSE)
+
+speech_service = None
+speech_service_lock = threading.Lock()
 
-tts_lock = threading.Lock()
+def get_speech_service():
+    """Returns the shared speech service, starting its engine thread on first use."""
+    global speech_service
+    with speech_service_lock:
+        if speech_service is None:
+            speech_service = SpeechService(lambda: create_engine(TTS_BACKEND), audio_cache=AUDIO_CACHE).start()
+            speech_service.prerender([READY_SOUND], rate=READY_SOUND_RATE)
+            # Replies are spoken sentence by sentence, so those are the clips to render
+            speech_service.prerender([sentence for phrase in FIXED_PHRASES for sentence in iter_sentences([phrase])])
+        return speech_service
+
+def reset_speech_service():
+    """Replaces the speech thread and engine; the audio device can change across sleep."""
+    global speech_service
+    with speech_service_lock:
+        old, speech_service = speech_service, None
+    if old:
+        old.shutdown(timeout=1)
+    get_speech_service()
 
 def speak_response(text):
     """
-    Converts the provided text to speech using pyttsx3 with thread-local COM initialization.
+    Speaks the provided text on the shared speech service and waits until it has been played.
     
     Parameters:
         text (str): The text to be spoken.
     """
-    with tts_lock:
-        try:
-            # Initialize COM for the current thread.
-            comtypes.CoInitialize()
-            
-            # Initialize the TTS engine.
-            engine = pyttsx3.init()
-            engine.setProperty('rate', 200)
-            engine.setProperty('volume', 1.0)
-            
-            # Try to find a female voice (commonly Zira on Windows).
-            voices = engine.getProperty('voices')
-            selected_voice = None
-            for v in voices:
-                # Common Windows voice ID substrings: 'Zira', 'Jenny', 'Heera'
-                # Pick whichever "sounds" female or has female in the name.
-                if "zira" in v.name.lower() or "female" in v.name.lower():
-                    selected_voice = v
-                    break
-            
-            if selected_voice:
-                engine.setProperty('voice', selected_voice.id)
-            
-            logging.info(f"Speaking response: {text}")
-            engine.say(text)
-            engine.runAndWait()
-            
-        except Exception as e:
-            logging.error("Error during speech synthesis")
-        finally:
-            # Cleanup COM for this thread.
-            comtypes.CoUninitialize()
-            # Small delay to ensure proper resource cleanup.
-            time.sleep(0.2)
+    utterance = get_speech_service().say(text)
+    utterance.wait()
+    trace_playback(utterance, utterance)
 
 def play_ready_sound():
-    """Play a brief confirmation sound using TTS"""
-    try:
-        # Use minimal TTS setup for the sound cue
-        comtypes.CoInitialize()
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 250)  # Faster speaking rate
-        engine.say("(ding!)")
-        engine.runAndWait()
-    except Exception as e:
-        logging.debug(f"Ready sound error: {str(e)}")
-    finally:
-        try:
-            comtypes.CoUninitialize()
-        except:
-            pass
+    """Queue a brief confirmation sound after any pending speech (a pre-rendered clip)"""
+    return get_speech_service().say(READY_SOUND, priority=PRIORITY_LOW, rate=READY_SOUND_RATE, cache=True)
+
+def trace_playback(first_utterance, last_utterance):
+    """Records time to first audio and playback duration on the current trace"""
+    trace = tracing.current_trace()
+    if trace is None or first_utterance is None or first_utterance.started_at is None:
+        return
+    trace.record("tts_first_audio", first_utterance.started_at - trace.start_time, accumulate=False)
+    trace.record("playback", last_utterance.finished_at - first_utterance.started_at)
+
+def speak_streaming(chunks, keep=None):
+    """
+    Speaks a streamed LLM reply sentence by sentence while generation keeps going.
+    Sentences for which keep(sentence) is False are not spoken.
+
+    Returns the full reply text once playback has finished.
+    """
+    service = get_speech_service()
+    start_time = time.time()
+    sentences, spoken = [], []
+    first_utterance = last_utterance = None
+    for sentence in iter_sentences(chunks):
+        if pipeline_cancelled():
+            break
+        sentences.append(sentence)
+        if keep and not keep(sentence):
+            continue
+        if not spoken:
+            logging.info(f"First sentence ready after {time.time() - start_time:.2f}s")
+        spoken.append(sentence)
+        last_utterance = service.say(sentence)
+        first_utterance = first_utterance or last_utterance
+    if last_utterance:
+        last_utterance.wait()
+        trace_playback(first_utterance, last_utterance)
+    return " ".join(sentences)
+
+def ask_and_speak(image_base64, prompt=DEFAULT_SYSTEM_PROMPT, model="gemma3_27b_40k:latest", keep=None):
+    """
+    Sends the screenshot to the LLM and speaks the reply, streaming it when STREAMING_TTS is on.
+    Sentences for which keep(sentence) is False are not spoken.
+
+    Returns the full reply text.
+    """
+    if STREAMING_TTS:
+        return speak_streaming(stream_image_with_llm(image_base64, prompt=prompt, model=model), keep=keep)
+
+    llm_response = analyze_image_with_llm(image_base64, prompt=prompt, model=model)
+    to_speak = " ".join(s for s in iter_sentences([llm_response]) if keep(s)) if keep else llm_response
+    if to_speak:
+        speak_response(to_speak)
+    return llm_response
+
+def ask_text_and_speak(text, prompt=REPHRASE_FOR_KID_PROMPT, model="gemma3_27b_40k:latest"):
+    """
+    Sends a text-only follow-up to the LLM and speaks the reply.
+
+    Returns the full reply text.
+    """
+    if STREAMING_TTS:
+        return speak_streaming(stream_text_with_llm(text, prompt=prompt, model=model))
+
+    llm_response = "".join(stream_text_with_llm(text, prompt=prompt, model=model))
+    speak_response(llm_response)
+    return llm_response
+
+def structured_field_lines(field, value, fields):
+    """Turns one completed field of the combined JSON reply into the lines to speak."""
+    if field == "original_text":
+        return [value] if value else []
+    if "no text detected" in fields.get("original_text", "").lower():
+        return []
+    if field == "rephrased":
+        # Don't read the same words twice when the text was already simple
+        original = fields.get("original_text", "")
+        if not value or value.strip().lower() == original.strip().lower():
+            return []
+        return [value]
+    if field == "hard_words":
+        return [f"{item['word']}: {item['meaning']}" for item in value
+                if isinstance(item, dict) and item.get("word") and item.get("meaning")]
+    return []
+
+def speak_structured(chunks, read=None):
+    """
+    Speaks each field of a streamed combined JSON reply as soon as that field is complete.
+    With a dialogue read, only new lines of the original text are spoken, and the
+    rephrasing and word meanings only when there were new lines.
+
+    Returns the raw reply text and the parsed fields.
+    """
+    service = get_speech_service()
+    keep = dialogue_keep(read)
+    raw = []
+
+    def tee(chunks):
+        for chunk in chunks:
+            raw.append(chunk)
+            yield chunk
+
+    fields = {}
+    first_utterance = last_utterance = None
+    for field, value in iter_json_fields(tee(chunks)):
+        if pipeline_cancelled():
+            break
+        fields[field] = value
+        if read and field != "original_text" and not read.new:
+            continue
+        for line in structured_field_lines(field, value, fields):
+            for sentence in iter_sentences([line]):
+                if keep and field == "original_text" and not keep(sentence):
+                    continue
+                last_utterance = service.say(sentence)
+                first_utterance = first_utterance or last_utterance
+
+    raw_text = "".join(raw)
+    # Errors (and replies that ignored the format) come back as plain text
+    if not fields and raw_text.strip() and not pipeline_cancelled():
+        last_utterance = service.say(raw_text.strip())
+        first_utterance = first_utterance or last_utterance
+    if last_utterance:
+        last_utterance.wait()
+        trace_playback(first_utterance, last_utterance)
+    return raw_text, fields
+
+def screenshot_hash(screenshot, region=None):
+    """Perceptual hash of region (by default the capture crop, or the whole screenshot)"""
+    region = region or CAPTURE_SETTINGS.crop
+    frame = screenshot.crop(region) if region else screenshot
+    return dhash(frame)
+
+def dialogue_hash(screenshot):
+    """
+    Perceptual hash of the dialogue box remembered for the focused game (the whole frame until one is known).
+    Animations elsewhere on screen then don't make the same dialogue look new.
+    """
+    region = None
+    if ROI_ENABLED and not CAPTURE_SETTINGS.crop:
+        region = dialogue_regions.stored_region(screenshot.size, active_window_title())
+    return screenshot_hash(screenshot, region)
+
+# Read plain dialogue text with local OCR (Tesseract) before asking the vision model
+OCR_FAST_PATH = True
+# Mean OCR word confidence (0-100) needed to trust the result instead of the vision model
+OCR_MIN_CONFIDENCE = 80
+OCR_MIN_WORDS = 2
+# (left, top, right, bottom) boxes to OCR, e.g. the dialogue box; None reads the whole frame
+OCR_REGIONS = None
+
+# Crop text-focused requests (F10, F12, explain) to the detected dialogue box; F9 keeps the whole screen
+ROI_ENABLED = True
+# Detected boxes per game, and boxes pinned with Ctrl+F12
+dialogue_regions = RegionMemory(
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "dialogue_regions.json")
+)
+
+def dialogue_region(screenshot):
+    """Crop box for the dialogue on this screenshot, or None to send the whole frame"""
+    if CAPTURE_SETTINGS.crop or not ROI_ENABLED:
+        return CAPTURE_SETTINGS.crop
+    return dialogue_regions.region_for(screenshot, active_window_title())
+
+def detect_dialogue(screenshot, frame_hash):
+    """
+    Crop box for the dialogue, and the frame's dialogue_hash() for it.
+    The hash is recomputed when detection found a new box (e.g. the first press in a game),
+    so the answer is cached under the hash the next press looks up.
+    """
+    if CAPTURE_SETTINGS.crop or not ROI_ENABLED:
+        return CAPTURE_SETTINGS.crop, frame_hash
+    game = active_window_title()
+    before = dialogue_regions.stored_region(screenshot.size, game)
+    region = dialogue_regions.region_for(screenshot, game)
+    if dialogue_regions.stored_region(screenshot.size, game) != before:
+        frame_hash = dialogue_hash(screenshot)
+    return region, frame_hash
+
+def encode_screenshot(screenshot, region=None):
+    """Encoded image for the LLM (base64-encoded as it is uploaded), cropped to region when given"""
+    settings = replace(CAPTURE_SETTINGS, crop=region) if region else CAPTURE_SETTINGS
+    return encode_for_upload(screenshot, settings)
+
+def pin_dialogue_region():
+    """Keeps using the last detected dialogue box for the focused game (Ctrl+F12)"""
+    dialogue_regions.pin(active_window_title())
+
+def unpin_dialogue_region():
+    """Goes back to detecting the dialogue box for the focused game (Ctrl+Shift+F12)"""
+    dialogue_regions.unpin(active_window_title())
+
+# Only read out dialogue lines that haven't been read yet in this game session (F10, F12, combined)
+DIALOGUE_DIFF = True
+dialogue_history = DialogueHistory(session_gap=15 * 60)
+
+def start_dialogue_read(frame_hash, reader):
+    """History check for an extraction about to be read out by a hotkey, or None when DIALOGUE_DIFF is off"""
+    if not DIALOGUE_DIFF:
+        return None
+    # Each hotkey has its own session per game, so F12 reading a box doesn't silence F10 on it
+    return dialogue_history.start_read((active_window_title(), reader), frame_hash)
+
+def dialogue_keep(read):
+    """Sentence filter for speak_streaming() that drops lines already read this session"""
+    if read is None:
+        return None
+    # "No text detected" is a status, not dialogue: say it every time
+    return lambda sentence: "no text detected" in sentence.lower() or read.keep(sentence)
+
+def finish_read(read, text):
+    """
+    Adds an extraction that was read out to the history.
+
+    Returns the part of it that was new (all of it without a read).
+    """
+    if read is None or not text or LLM_ERROR_RESPONSE in text or "no text detected" in text.lower():
+        return text
+    if not pipeline_cancelled():
+        read.commit(text)
+    return read.new_text
+
+def follow_up_and_speak(text, prompt=REPHRASE_FOR_KID_PROMPT, model="gemma3_27b_40k:latest"):
+    """
+    Speaks a text-only follow-up (rephrasing, word explanations) for the dialogue text,
+    reusing the reply when the same text was followed up before.
+
+    Returns the full reply text.
+    """
+    kind = (prompt, model)
+    cached = dialogue_history.result(kind, text)
+    tracing.set_value("follow_up_cached", cached is not None)
+    if cached is not None:
+        return speak_streaming([cached])
+    reply = ask_text_and_speak(text, prompt=prompt, model=model)
+    if reply and LLM_ERROR_RESPONSE not in reply and not pipeline_cancelled():
+        dialogue_history.store_result(kind, text, reply)
+    return reply
+
+def extract_text_fast(screenshot, region=None):
+    """Dialogue text from local OCR, or None when OCR is off, unavailable or not confident enough"""
+    if not OCR_FAST_PATH:
+        return None
+    regions = OCR_REGIONS or ([region] if region else None)
+    result = read_text(screenshot, regions=regions)
+    if result is None:
+        return None
+    if result.words < OCR_MIN_WORDS or result.confidence < OCR_MIN_CONFIDENCE:
+        logging.info(f"OCR confidence too low ({result.confidence:.0f}); using the vision model")
+        tracing.set_value("extract_path", "vision")
+        return None
+    tracing.set_value("extract_path", "ocr")
+    return result.text
+
+def answer_screenshot(screenshot, prompt=DEFAULT_SYSTEM_PROMPT, model="gemma3_27b_40k:latest", ocr=False,
+                      dialogue=False, new_only=False, reader=None):
+    """
+    Speaks the LLM answer for a captured screenshot, reusing a cached answer for a near-identical frame.
+    With ocr=True (plain text extraction only) a confident local OCR read is spoken instead.
+    With dialogue=True only the detected dialogue box is read or sent.
+    With new_only=True (plain text extraction only) lines already read this session are skipped;
+    reader names the session (the hotkey), by default the prompt.
+
+    Returns the full answer text, or with new_only just the new part of it.
+    """
+    frame_hash = dialogue_hash(screenshot) if dialogue else screenshot_hash(screenshot)
+    read = start_dialogue_read(frame_hash, reader or prompt) if new_only else None
+    keep = dialogue_keep(read)
+    if frame_watcher and prompt == SIMPLE_SYSTEM_PROMPT:
+        frame_watcher.note_lookup(frame_hash)
+    # A new line of dialogue barely changes a full-screen hash, so whole screens must match exactly
+    cached = cached_response(frame_hash, prompt, model, None if dialogue else FRAME_MAX_DISTANCE)
+    tracing.set_value("cache_hit", cached is not None)
+    if cached is not None:
+        return finish_read(read, speak_streaming([cached], keep=keep))
+
+    region = CAPTURE_SETTINGS.crop
+    if dialogue:
+        region, frame_hash = detect_dialogue(screenshot, frame_hash)
+        if read:
+            read.frame = frame_hash
+    text = extract_text_fast(screenshot, region) if ocr else None
+    if text:
+        RESPONSE_CACHE.put(frame_hash, prompt, model, text)
+        return finish_read(read, speak_streaming([text], keep=keep))
+
+    image_base64 = encode_screenshot(screenshot, region)
+    llm_response = ask_and_speak(image_base64, prompt=prompt, model=model, keep=keep)
+    if llm_response and LLM_ERROR_RESPONSE not in llm_response and not pipeline_cancelled():
+        RESPONSE_CACHE.put(frame_hash, prompt, model, llm_response)
+    return finish_read(read, llm_response)
 
 
 
 # ----------------------------------------------------------------
-# 3) Keep-alive functionality
+# 3) Model residency (replaces the one-shot keep-alive)
 # ----------------------------------------------------------------
-def keep_model_alive():
-    """Single keep-alive pulse for all models"""
-    models = ["gemma3_27b_40k:latest"]
-    for model in models:
-        try:
-            logging.debug(f"Sending keep-alive ping for {model}")  # Changed to debug
-            response = requests.post(
-                "http://192.168.50.250:11434/api/chat",
-                json={"model": model, "messages": []},
-                timeout=10
-            )
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            logging.warning(f"Keep-alive HTTP error for {model}: {str(e)}")
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Keep-alive connection issue for {model}: {str(e)}")
-        except Exception as e:
-            logging.warning(f"Keep-alive unexpected error for {model}: {str(e)}")
+MODEL = "gemma3_27b_40k:latest"
+# Smaller models to answer with while MODEL is still loading, e.g. ["gemma3:4b"]
+FALLBACK_MODELS = []
+# How long Ollama keeps a model in memory after each request
+MODEL_KEEP_ALIVE = "30m"
 
-# New helper to actively load the model via /api/generate
-def warmup_model(model="gemma3_27b_40k:latest"):
-    """Trigger the model to load by sending a short generate request."""
-    try:
-        logging.info(f"Warming up model {model}")
-        response = requests.post(
-            "http://192.168.50.250:30068/api/generate",
-            json={"model": model, "prompt": "hi", "stream": False},
-            timeout=60,
-        )
-        response.raise_for_status()
-        logging.debug("Model warmup complete")
-    except Exception as e:
-        logging.warning(f"Model warmup failed for {model}: {e}")
+# Models that generation profiles use instead of MODEL
+PROFILE_MODELS = sorted({profile.model for profile in GENERATION_PROFILES.values() if profile.model} - {MODEL})
 
-# def keep_alive_worker():
-#     """Runs keep-alives every 2 minutes"""
-#     while True:
-#         time.sleep(120)  # 2 minutes
-#         keep_model_alive()
+# Polls /api/ps and re-warms models during and ahead of usual play sessions
+model_residency = ResidencyManager(
+    ollama_client,
+    [MODEL] + PROFILE_MODELS + FALLBACK_MODELS,
+    keep_alive=MODEL_KEEP_ALIVE,
+    usage_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_usage.json")
+)
+
+def choose_model(prompt=None):
+    """
+    The prompt's profile model (MODEL by default) if it is loaded, otherwise a loaded
+    fallback (the preferred model then warms in the background)
+    """
+    return model_residency.pick(profile_for(prompt).model or MODEL, FALLBACK_MODELS)
+
+def warmup_model(model=MODEL):
+    """Loads the model in the background so the first hotkey press doesn't pay for it."""
+    model_residency.warm(model)
 
 def register_hotkeys():
     global registered_hotkeys
@@ -243,41 +698,86 @@ def register_hotkeys():
     registered_hotkeys = []
 
     # Register your analysis and simple pipeline hotkeys and store their handles
-    registered_hotkeys.append(keyboard.add_hotkey('f9', lambda: pipeline_wrapper(pipeline)))
-    registered_hotkeys.append(keyboard.add_hotkey('f10', lambda: pipeline_wrapper(pipeline_simple_with_rephrase)))
-    registered_hotkeys.append(keyboard.add_hotkey('`', lambda: pipeline_wrapper(pipeline_simple_with_rephrase)))  # <-- make sure this is here
-    registered_hotkeys.append(keyboard.add_hotkey('\\', lambda: pipeline_wrapper(pipeline_explain_words)))
-    registered_hotkeys.append(keyboard.add_hotkey('f12', lambda: pipeline_wrapper(pipeline_simple)))
+    registered_hotkeys.append(keyboard.add_hotkey('f9', lambda: pipeline_wrapper(pipeline, 'f9')))
+    rephrase_pipeline = pipeline_combined if COMBINED_MODE else pipeline_simple_with_rephrase
+    registered_hotkeys.append(keyboard.add_hotkey('f10', lambda: pipeline_wrapper(rephrase_pipeline, 'f10')))
+    registered_hotkeys.append(keyboard.add_hotkey('`', lambda: pipeline_wrapper(rephrase_pipeline, '`')))  # <-- make sure this is here
+    registered_hotkeys.append(keyboard.add_hotkey('\\', lambda: pipeline_wrapper(pipeline_explain_words, '\\')))
+    registered_hotkeys.append(keyboard.add_hotkey('f12', lambda: pipeline_wrapper(pipeline_simple, 'f12')))
+    registered_hotkeys.append(keyboard.add_hotkey('ctrl+f12', pin_dialogue_region))
+    registered_hotkeys.append(keyboard.add_hotkey('ctrl+shift+f12', unpin_dialogue_region))
     
-    # Optional: Send keep-alive and warmup without blocking startup
-    threading.Thread(target=keep_model_alive, daemon=True).start()
-    threading.Thread(target=warmup_model, daemon=True).start()
+    # Load the model without blocking startup
+    warmup_model()
 
 # ----------------------------------------------------------------
 # 4) Pipeline management
 # ----------------------------------------------------------------
-pipeline_in_progress = False
+def speculative_extract(screenshot, frame_hash):
+    """Runs the simple text extraction for a settled frame and caches it without speaking"""
+    # The model (and so the cache key) the F12/F10 press would use right now
+    model = choose_model(SIMPLE_SYSTEM_PROMPT)
+    if cached_response(frame_hash, SIMPLE_SYSTEM_PROMPT, model) is not None:
+        return
+    region, frame_hash = detect_dialogue(screenshot, frame_hash)
+    image_base64 = encode_screenshot(screenshot, region)
+    # Not a use of the model: speculation mustn't start play sessions or keep models warm on its own
+    text = analyze_image_with_llm(image_base64, prompt=SIMPLE_SYSTEM_PROMPT, model=model, background=True)
+    if text and LLM_ERROR_RESPONSE not in text and not pipeline_cancelled():
+        RESPONSE_CACHE.put(frame_hash, SIMPLE_SYSTEM_PROMPT, model, text)
 
-def pipeline_wrapper(target_func):
-    """Handles pipeline execution in a thread with state management"""
-    global pipeline_in_progress
-    
-    # Use the lock for both check AND state update
-    with threading.Lock():
-        if pipeline_in_progress:
-            logging.info("Pipeline busy - ignoring request")
-            return
-        pipeline_in_progress = True  # Set flag BEFORE starting thread
+def start_frame_watcher():
+    """Starts the background watcher that pre-extracts dialogue (FRAME_WATCHER_ENABLED)"""
+    from frame_watcher import FrameWatcher
+    global frame_watcher
+    frame_watcher = FrameWatcher(
+        grab_screenshot,
+        speculative_extract,
+        fps=2.0,
+        min_interval=4.0,
+        max_per_minute=6,
+        cpu_budget=0.05,
+        is_busy=pipeline_scheduler.is_busy,
+        hash_func=dialogue_hash,
+        match_distance=RESPONSE_CACHE.max_distance
+    ).start()
+
+# Newest hotkey press wins: it cancels the running pipeline's LLM stream and speech
+pipeline_scheduler = JobScheduler(repeat_window=1.0)
+
+def pipeline_cancelled():
+    """True when the pipeline running on this thread has been superseded by a newer press"""
+    job = current_job()
+    return job is not None and job.cancelled
+
+def finish_trace(trace, ding):
+    trace.record("ready_sound", ding.finished_at - ding.enqueued_at)
+    trace.finish()
+
+def pipeline_wrapper(target_func, hotkey=None):
+    """Schedules a pipeline run for a hotkey press, preempting any run in progress"""
+    if frame_watcher:
+        frame_watcher.cancel_speculation()
+
+    name = hotkey or target_func.__name__
+    trace = tracer.start(name)
 
     def wrapper():
-        global pipeline_in_progress
-        try:
-            target_func()
-        finally:
-            with threading.Lock():
-                pipeline_in_progress = False
-            play_ready_sound()  # Add this line
-    threading.Thread(target=wrapper, daemon=True).start()
+        with trace_context(trace):
+            tracing.record("hotkey_wait", trace.elapsed())
+            try:
+                target_func()
+            finally:
+                # Play the ready cue unless the run was cut short by a newer hotkey;
+                # the trace ends when the cue has finished playing
+                if pipeline_cancelled():
+                    trace.finish(cancelled=True)
+                else:
+                    play_ready_sound().on_done(lambda ding: finish_trace(trace, ding))
+
+    job = pipeline_scheduler.submit(name, wrapper)
+    if job:
+        job.on_cancel(lambda: get_speech_service().cancel())
 
 # ----------------------------------------------------------------
 # 4) Revised pipeline functions using wrapper
@@ -288,20 +788,11 @@ def pipeline():
         logging.info("Pipeline started: capturing screenshot...")
         
         # Capture screenshot
-        screenshot = pyautogui.screenshot()
-        
-        # Encode to base64
-        with BytesIO() as buf:
-            screenshot.save(buf, format="PNG")
-            image_data = buf.getvalue()
-        image_base64 = base64.b64encode(image_data).decode("utf-8")
+        screenshot = grab_screenshot()
 
-        # Send to LLM with default prompt
+        # Send to LLM with default prompt (or reuse the answer for the same screen)
         logging.info("Sending screenshot to LLM...")
-        llm_response = analyze_image_with_llm(image_base64)
-
-        # Speak result
-        speak_response(llm_response)
+        answer_screenshot(screenshot, model=choose_model(DEFAULT_SYSTEM_PROMPT))
 
     except Exception as e:
         logging.error(f"Pipeline failed: {str(e)}")
@@ -312,133 +803,164 @@ def pipeline_simple():
         logging.info("Simplified pipeline started...")
         
         # Capture screenshot (same as regular pipeline)
-        screenshot = pyautogui.screenshot()
-        with BytesIO() as buf:
-            screenshot.save(buf, format="PNG")
-            image_data = buf.getvalue()
-        image_base64 = base64.b64encode(image_data).decode("utf-8")
-
-        # Send to LLM with simple prompt and 4b model
-        llm_response = analyze_image_with_llm(
-            image_base64,
+        screenshot = grab_screenshot()
+
+        # Read the text locally when OCR is confident, otherwise ask the vision model
+        answer_screenshot(
+            screenshot,
             prompt=SIMPLE_SYSTEM_PROMPT,
-            model="gemma3_27b_40k:latest"
+            model=choose_model(SIMPLE_SYSTEM_PROMPT),
+            ocr=True,
+            dialogue=True,
+            new_only=True,
+            reader="F12"
         )
 
-        speak_response(llm_response)
-
     except Exception as e:
         logging.error(f"Simple pipeline failed: {str(e)}")
 
-def handle_obs_recording_on_resume():
-    import time
-    host, port = "localhost", 4455
-
-    # small buffer to let OBS & system stabilize after wake
-    logging.info("Waiting 10s for system/OBS to stabilize after wake")
-    time.sleep(10)
+# Persistent obs-websocket connection; recording state arrives as RecordStateChanged events
+obs = ObsController(host="localhost", port=4455, password="")
+obs_resume_lock = threading.Lock()
 
-    # 1) Try to connect
+def handle_obs_recording_on_resume():
+    # A second wake while the first is still being handled doesn't need another restart of the recording
+    if not obs_resume_lock.acquire(blocking=False):
+        logging.info("OBS resume handling already in progress")
+        return
     try:
-        client = ReqClient(host=host, port=port, password="", timeout=5)
-    except Exception as e:
-        logging.error(f"OBS connect failed: {e}")
-        logging.info("Launching OBS...")
-        try:
-            subprocess.Popen(r"C:\Program Files\obs-studio\bin\64bit\obs64.exe")
-            time.sleep(10)
-            client = ReqClient(host=host, port=port, password="", timeout=5)
-        except Exception as ex:
-            logging.error(f"OBS launch/connect failed: {ex}")
-            return
+        restart_obs_recording()
+    finally:
+        obs_resume_lock.release()
 
+def restart_obs_recording():
+    """Finalizes the recording that was running before sleep and starts a fresh one"""
+    # The connection from before sleep may be half-open, so start over; OBS itself may
+    # still be waking up (or not running), so retry with backoff and launch it if needed
+    if not obs.connect() and not obs.ensure_connected(timeout=30, launch=True):
+        return
     try:
-        # Check and stop any existing recording, then wait (with retries)
-        status = client.get_record_status()
-        if status.output_active:
-            logging.info("Stopping existing recording…")
-            client.stop_record()
-            logging.info("Waiting for OBS to finalize previous recording…")
-            max_wait, retries = 30, 3
-            for attempt in range(retries):
-                start = time.time()
-                while client.get_record_status().output_active and time.time() - start < max_wait:
-                    time.sleep(1)
-                if not client.get_record_status().output_active:
-                    logging.info("Previous recording finalized.")
-                    break
-                logging.warning(f"Still active after {max_wait}s, retrying stop_record (attempt {attempt+2}/{retries})…")
-                client.stop_record()
-            else:
-                logging.error("Failed to stop recording after multiple attempts.")
-
-        # 3) Start a fresh recording
-        logging.info("Starting new recording…")
-        client.start_record()
+        obs.restart_recording()
     except Exception as e:
         logging.error(f"OBS control error: {e}")
-    finally:
-        client.disconnect()
 
 def pipeline_simple_with_rephrase():
     """Text extraction + simplified rephrasing for kids"""
     try:
         logging.info("Pipeline (F10) started: extracting text...")
 
-        # Screenshot and encode
-        screenshot = pyautogui.screenshot()
-        with BytesIO() as buf:
-            screenshot.save(buf, format="PNG")
-            image_data = buf.getvalue()
-        image_base64 = base64.b64encode(image_data).decode("utf-8")
+        # Screenshot
+        screenshot = grab_screenshot()
 
-        # Step 1: Extract original text
-        original_text = analyze_image_with_llm(
-            image_base64,
+        # Step 1: Extract the text, reading out only lines that are new this session
+        new_text = answer_screenshot(
+            screenshot,
             prompt=SIMPLE_SYSTEM_PROMPT,
-            model="gemma3_27b_40k:latest"
+            model=choose_model(SIMPLE_SYSTEM_PROMPT),
+            ocr=True,
+            dialogue=True,
+            new_only=True,
+            reader="F10"
         )
 
-        speak_response(original_text)
-
-        # If no text was found, skip rephrasing
-        if "no text detected" in original_text.lower():
+        # If no new text was found (or a newer hotkey took over), skip rephrasing
+        if not new_text or "no text detected" in new_text.lower() or pipeline_cancelled():
             return
 
-        # Step 2: Rephrase if needed
+        # Step 2: Rephrase the new lines if needed
         logging.info("Requesting rephrased version for child...")
-        simplified_text = analyze_image_with_llm(
-            base64.b64encode(original_text.encode()).decode("utf-8"),  # Encode as if it's image input
+        follow_up_and_speak(
+            new_text,
             prompt=REPHRASE_FOR_KID_PROMPT,
-            model="gemma3_27b_40k:latest"
+            model=choose_model(REPHRASE_FOR_KID_PROMPT)
         )
 
-        speak_response(simplified_text)
-
     except Exception as e:
         logging.error(f"F10 pipeline failed: {str(e)}")
 
+def pipeline_combined():
+    """Text extraction + kid-friendly rephrase + word explanations from a single LLM request"""
+    try:
+        logging.info("Combined pipeline started: capturing screenshot...")
+
+        screenshot = grab_screenshot()
+        frame_hash = dialogue_hash(screenshot)
+        model = choose_model(COMBINED_SYSTEM_PROMPT)
+        extract_model = choose_model(SIMPLE_SYSTEM_PROMPT)
+        rephrase_model = choose_model(REPHRASE_FOR_KID_PROMPT)
+        read = start_dialogue_read(frame_hash, "F10")
+
+        cached = cached_response(frame_hash, COMBINED_SYSTEM_PROMPT, model)
+        tracing.set_value("cache_hit", cached is not None)
+        if cached is not None:
+            _, fields = speak_structured([cached], read)
+            finish_read(read, fields.get("original_text"))
+            return
+
+        # A pre-extracted (speculative) or locally OCR'd text can be spoken right away,
+        # with a quick text-only rephrase instead of a new vision request
+        if frame_watcher:
+            frame_watcher.note_lookup(frame_hash)
+        region, frame_hash = detect_dialogue(screenshot, frame_hash)
+        if read:
+            read.frame = frame_hash
+        extracted = cached_response(frame_hash, SIMPLE_SYSTEM_PROMPT, extract_model)
+        if extracted is None:
+            extracted = extract_text_fast(screenshot, region)
+            if extracted:
+                RESPONSE_CACHE.put(frame_hash, SIMPLE_SYSTEM_PROMPT, extract_model, extracted)
+        if extracted:
+            new_text = finish_read(read, speak_streaming([extracted], keep=dialogue_keep(read)))
+            if new_text and "no text detected" not in new_text.lower() and not pipeline_cancelled():
+                follow_up_and_speak(new_text, prompt=REPHRASE_FOR_KID_PROMPT, model=rephrase_model)
+            return
+
+        image_base64 = encode_screenshot(screenshot, region)
+        raw_text, fields = speak_structured(stream_image_with_llm(
+            image_base64,
+            prompt=COMBINED_SYSTEM_PROMPT,
+            model=model,
+            format=DIALOGUE_SCHEMA
+        ), read)
+
+        if fields and not pipeline_cancelled():
+            RESPONSE_CACHE.put(frame_hash, COMBINED_SYSTEM_PROMPT, model, raw_text)
+            original = fields.get("original_text")
+            if original:
+                finish_read(read, original)
+                # The exact text and its rephrasing serve later F12/F10/explain presses on this text
+                RESPONSE_CACHE.put(frame_hash, SIMPLE_SYSTEM_PROMPT, extract_model, original)
+                if fields.get("rephrased") and "no text detected" not in original.lower():
+                    dialogue_history.store_result((REPHRASE_FOR_KID_PROMPT, rephrase_model), original,
+                                                  fields["rephrased"])
+
+    except Exception as e:
+        logging.error(f"Combined pipeline failed: {str(e)}")
+
 def pipeline_explain_words():
     """Capture screenshot and explain tricky words simply for a child"""
     try:
         logging.info("Pipeline (~) started: capturing screenshot...")
 
-        # Screenshot and encode
-        screenshot = pyautogui.screenshot()
-        with BytesIO() as buf:
-            screenshot.save(buf, format="PNG")
-            image_data = buf.getvalue()
-        image_base64 = base64.b64encode(image_data).decode("utf-8")
+        # Screenshot
+        screenshot = grab_screenshot()
+        model = choose_model(EXPLAIN_WORDS_PROMPT)
+
+        # When the dialogue text is already known, explain it with a quick text-only request
+        # (or the explanation given earlier for the same text)
+        text = cached_response(dialogue_hash(screenshot), SIMPLE_SYSTEM_PROMPT, choose_model(SIMPLE_SYSTEM_PROMPT))
+        if text and "no text detected" not in text.lower():
+            follow_up_and_speak(text, prompt=EXPLAIN_WORDS_PROMPT, model=model)
+            return
 
         # Send to LLM with explain prompt
-        llm_response = analyze_image_with_llm(
-            image_base64,
+        answer_screenshot(
+            screenshot,
             prompt=EXPLAIN_WORDS_PROMPT,
-            model="gemma3_27b_40k:latest"
+            model=model,
+            dialogue=True
         )
 
-        speak_response(llm_response)
-
     except Exception as e:
         logging.error(f"Explain-words pipeline failed: {str(e)}")
 
@@ -447,16 +969,71 @@ def pipeline_explain_words():
 # ----------------------------------------------------------------
 # 6) Main entry point
 # ----------------------------------------------------------------
-def main():
-    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+def recover_from_resume():
+    """
+    Brings the program back after the machine wakes up, without restarting it.
+
+    Hotkeys are re-hooked first so they work again right away; the model
+    warmup, a fresh speech engine and the OBS recording restart all run in
+    the background.
+    """
+    global registered_hotkeys
+    start = time.time()
+    logging.info("System resume detected. Recovering in-process.")
+
+    # Whatever was generating or speaking went to sleep with the machine
+    pipeline_scheduler.cancel_all()
+
+    # Low-level keyboard hooks can be dropped across sleep, so install them again
+    keyboard.unhook_all()
+    registered_hotkeys = []
 
-    # Optional: Send one-time keep-alive when hotkeys are (re)registered
-    # threading.Thread(target=keep_alive_worker, name="KeepAlive", daemon=True).start()
+    # Pooled sockets to Ollama are stale after sleep, and screen handles may be after a display change
+    ollama_client.reset()
+    get_capture_backend(CAPTURE_BACKEND).close()
 
-    # Register hotkeys on startup
     register_hotkeys()
+    logging.info(f"Hotkeys re-registered {time.time() - start:.2f}s after resume")
 
+    threading.Thread(target=reset_speech_service, name="SpeechReset", daemon=True).start()
+    threading.Thread(target=handle_obs_recording_on_resume, name="OBSResume", daemon=True).start()
+
+# Libraries the first hotkey press needs, imported in the background once hotkeys work
+WARMUP_IMPORTS = ("requests", "PIL.Image", "numpy", "obsws_python")
+
+def warm_up():
+    """Loads the heavy subsystems after startup so hotkeys don't wait for them"""
+    start = time.time()
+    for name in WARMUP_IMPORTS:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logging.debug(f"Warm-up import of {name} failed: {e}")
+
+    # Pick (and import) the capture backend, and resolve the TTS voice, so the first press doesn't pay for either
+    get_capture_backend(CAPTURE_BACKEND)
+    get_speech_service()
+    # The caches are otherwise read on first use, i.e. by the first hotkey press
+    RESPONSE_CACHE.load()
+    dialogue_regions.load()
+    load_prebuilt_cache()
+
+    # Health/latency probes for the Ollama backends, model residency tracking and OBS
+    ollama_client.start_probing()
+    model_residency.start()
+    obs.start()
+
+    if FRAME_WATCHER_ENABLED:
+        start_frame_watcher()
+    logging.info(f"Background warm-up finished in {time.time() - start:.2f}s")
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+
+    # Hotkeys first; everything heavy loads behind them
+    register_hotkeys()
     logging.info("Ready! Press F9 (playful summary), F10 or ` (simple + rephrase), F12 (exact text only), or Pause (explain & learn).")
+    threading.Thread(target=warm_up, name="WarmUp", daemon=True).start()
     
     last_time = time.time()
     try:
@@ -466,15 +1043,26 @@ def main():
             current_time = time.time()
             # If more than 2 seconds have passed, it's likely the system resumed from sleep
             if current_time - last_time > 2:
-                logging.info("System resume detected. Handling OBS recording before restart.")
-                handle_obs_recording_on_resume()
-                logging.info("Waiting 15 seconds before restarting program.")
-                time.sleep(15)
-                restart_program()
-            last_time = current_time
+                if RESTART_ON_RESUME:
+                    logging.info("System resume detected. Handling OBS recording before restart.")
+                    handle_obs_recording_on_resume()
+                    logging.info("Waiting 15 seconds before restarting program.")
+                    time.sleep(15)
+                    restart_program()
+                recover_from_resume()
+            last_time = time.time()
     except KeyboardInterrupt:
         pass
     finally:
+        if frame_watcher:
+            frame_watcher.stop()
+            logging.info(f"Frame watcher stats: {frame_watcher.stats()}")
+        logging.info(f"Scheduler stats: {pipeline_scheduler.stats()}")
+        model_residency.stop()
+        logging.info(f"Model states: {model_residency.states()}")
+        ollama_client.close()
+        obs.disconnect()
+        logging.info("Latency summary:\n" + tracer.format_summary())
         keyboard.unhook_all()
         logging.info("Cleanup complete")
 
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for OBS's obs-websocket (protocol v5) server.
+
+Speaks just enough of the protocol for the OBS controller: Hello/Identify,
+GetVersion, GetRecordStatus, StartRecord and StopRecord, and RecordStateChanged
+events to clients subscribed to output events. Stopping a recording takes
+finalize_seconds before the STOPPED event, like OBS finishing the file.
+drop_clients() closes every connection to exercise reconnects.
+
+Usage:
+    python mock_obs.py --port 4455 --finalize-seconds 3
+"""
+import argparse
+import base64
+import hashlib
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# obs-websocket event subscription bit for output events (record/stream state)
+OUTPUTS_SUBSCRIPTION = 1 << 6
+
+STARTING = "OBS_WEBSOCKET_OUTPUT_STARTING"
+STARTED = "OBS_WEBSOCKET_OUTPUT_STARTED"
+STOPPING = "OBS_WEBSOCKET_OUTPUT_STOPPING"
+STOPPED = "OBS_WEBSOCKET_OUTPUT_STOPPED"
+MOCK_RECORDING_PATH = "/tmp/mock-recording.mkv"
+
+
+class MockObsHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.send_lock = threading.Lock()
+        self.subscriptions = 0
+        self.identified = False
+
+    def handle(self):
+        if not self._handshake():
+            return
+        self.server.add_client(self)
+        try:
+            self.send_message({"op": 0, "d": {"obsWebSocketVersion": "5.0.0-mock", "rpcVersion": 1}})
+            while True:
+                message = self._read_message()
+                if message is None:
+                    return
+                self._dispatch(json.loads(message))
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.server.remove_client(self)
+
+    def _dispatch(self, message):
+        op, data = message.get("op"), message.get("d", {})
+        if op == 1:
+            self.subscriptions = data.get("eventSubscriptions", 0)
+            self.identified = True
+            self.send_message({"op": 2, "d": {"negotiatedRpcVersion": 1}})
+        elif op == 6:
+            status, response = self.server.handle_request(data["requestType"], data.get("requestData") or {})
+            reply = {"requestType": data["requestType"], "requestId": data.get("requestId"), "requestStatus": status}
+            if response is not None:
+                reply["responseData"] = response
+            self.send_message({"op": 7, "d": reply})
+
+    def send_message(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        if len(data) < 126:
+            header = struct.pack("!BB", 0x81, len(data))
+        elif len(data) < 1 << 16:
+            header = struct.pack("!BBH", 0x81, 126, len(data))
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, len(data))
+        with self.send_lock:
+            self.request.sendall(header + data)
+
+    def _handshake(self):
+        request = b""
+        while b"\r\n\r\n" not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return False
+            request += chunk
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.request.sendall(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        return True
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("client went away")
+            data += chunk
+        return data
+
+    def _read_message(self):
+        """Reads one text message; None when the client closes the connection."""
+        while True:
+            first, second = self._recv_exact(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self._recv_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self._recv_exact(8))[0]
+            mask = self._recv_exact(4) if second & 0x80 else b"\0\0\0\0"
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self._recv_exact(length)))
+            if opcode == 0x8:
+                with self.send_lock:
+                    self.request.sendall(b"\x88\x00")
+                return None
+            if opcode == 0x9:
+                with self.send_lock:
+                    self.request.sendall(struct.pack("!BB", 0x8A, len(payload)) + payload)
+                continue
+            if opcode == 0x1:
+                return payload.decode("utf-8")
+
+
+class MockObsServer(socketserver.ThreadingTCPServer):
+    """Threaded mock obs-websocket server; use as a context manager or call start()/stop()."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, finalize_seconds=0.5, start_seconds=0.1, recording=False):
+        super().__init__((host, port), MockObsHandler)
+        self.finalize_seconds = finalize_seconds
+        self.start_seconds = start_seconds
+        self.recording = recording
+        self.requests = []
+        self._state_lock = threading.Lock()
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def add_client(self, handler):
+        with self._clients_lock:
+            self._clients.add(handler)
+
+    def remove_client(self, handler):
+        with self._clients_lock:
+            self._clients.discard(handler)
+
+    def drop_clients(self):
+        """Closes every client connection, as if OBS had restarted."""
+        with self._clients_lock:
+            clients = list(self._clients)
+        for handler in clients:
+            try:
+                handler.request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def emit_record_state(self, state):
+        event = {"op": 5, "d": {"eventType": "RecordStateChanged", "eventIntent": OUTPUTS_SUBSCRIPTION,
+                                "eventData": {"outputActive": state == STARTED, "outputState": state}}}
+        if state == STOPPED:
+            event["d"]["eventData"]["outputPath"] = MOCK_RECORDING_PATH
+        with self._clients_lock:
+            clients = [c for c in self._clients if c.identified and c.subscriptions & OUTPUTS_SUBSCRIPTION]
+        for handler in clients:
+            try:
+                handler.send_message(event)
+            except OSError:
+                pass
+
+    def handle_request(self, request_type, data):
+        """Returns (requestStatus, responseData) for a request."""
+        self.requests.append(request_type)
+        ok = {"result": True, "code": 100}
+        with self._state_lock:
+            if request_type == "GetVersion":
+                return ok, {"obsVersion": "30.0.0-mock", "obsWebSocketVersion": "5.0.0-mock", "rpcVersion": 1}
+            if request_type == "GetRecordStatus":
+                return ok, {"outputActive": self.recording, "outputPaused": False, "outputTimecode": "00:00:00.000",
+                            "outputDuration": 0, "outputBytes": 0}
+            if request_type == "StartRecord":
+                if self.recording:
+                    return {"result": False, "code": 500, "comment": "Recording is already active."}, None
+                self.recording = True
+                self._transition(STARTING, STARTED, self.start_seconds)
+                return ok, None
+            if request_type == "StopRecord":
+                if not self.recording:
+                    return {"result": False, "code": 501, "comment": "Recording is not active."}, None
+                self._transition(STOPPING, STOPPED, self.finalize_seconds, active_after=False)
+                return ok, {"outputPath": MOCK_RECORDING_PATH}
+        return {"result": False, "code": 204, "comment": f"Unknown request type {request_type}"}, None
+
+    def _transition(self, during, after, seconds, active_after=True):
+        def run():
+            self.emit_record_state(during)
+            time.sleep(seconds)
+            with self._state_lock:
+                self.recording = active_after
+            self.emit_record_state(after)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="MockObs", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.drop_clients()
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4455)
+    parser.add_argument("--finalize-seconds", type=float, default=2.0, help="Delay before a stopped recording is final")
+    parser.add_argument("--recording", action="store_true", help="Start with a recording in progress")
+    args = parser.parse_args()
+
+    server = MockObsServer(args.host, args.port, finalize_seconds=args.finalize_seconds, recording=args.recording)
+    print(f"Mock obs-websocket listening on ws://{args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Keeps the configured Ollama models resident and tracks which ones are loaded.
+
+Every request carries Ollama's keep_alive parameter, and a background thread
+polls /api/ps to learn which models are in memory and when they will be
+unloaded. While the child is playing (a hotkey was used recently), or around
+the hours play sessions usually start, models that are cold or about to expire
+are re-warmed with an empty generate request, which loads a model without
+producing any tokens. Pipelines can ask for the loaded/cold state and fall
+back to a smaller model that is already loaded instead of waiting on a cold
+load.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+LOADED = "loaded"
+LOADING = "loading"
+COLD = "cold"
+
+
+def parse_expires_at(value):
+    """Parses the expires_at timestamp from /api/ps into epoch seconds, or None."""
+    if not value:
+        return None
+    # Ollama reports nanoseconds; datetime only takes up to microseconds
+    value = re.sub(r"(\.\d{6})\d+", r"\1", value).replace("Z", "+00:00")
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class ResidencyManager:
+    """
+    Tracks and maintains which models are loaded on the Ollama server.
+
+    A new play session starts when a model is used after session_gap seconds
+    of quiet. Session start hours are counted in a 24-hour histogram (saved
+    to usage_path if given). Any hour with at least min_sessions starts is
+    treated as usual play time, and models are warmed ahead of it.
+    """
+
+    def __init__(self, client, models, keep_alive="30m", poll_interval=30.0, session_gap=20 * 60,
+                 rewarm_before=120.0, lead_time=10 * 60, min_sessions=3, usage_path=None):
+        self.client = client
+        self.models = list(models)
+        self.keep_alive = keep_alive
+        self.poll_interval = poll_interval
+        self.session_gap = session_gap
+        self.rewarm_before = rewarm_before
+        self.lead_time = lead_time
+        self.min_sessions = min_sessions
+        self.usage_path = usage_path
+        self.warmups = 0
+        self._expires = {}  # loaded model -> expiry epoch (None when the server didn't say)
+        self._loading = set()
+        self._polled = False
+        self._last_used = {}
+        self._session_hours = [0] * 24
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # The usage file is read on first use (or by start()), not when the manager is created
+        self._loaded = not usage_path
+
+    # ------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------
+    def state(self, model):
+        """LOADED, LOADING or COLD; assumed LOADED until the first poll has answered."""
+        with self._lock:
+            if model in self._loading:
+                return LOADING
+            if not self._polled or model in self._expires:
+                return LOADED
+            return COLD
+
+    def states(self):
+        return {model: self.state(model) for model in self.models}
+
+    def is_loaded(self, model):
+        return self.state(model) == LOADED
+
+    def pick(self, preferred, fallbacks=()):
+        """
+        Returns preferred if it is loaded, otherwise the first loaded fallback.
+
+        When falling back, preferred is warmed in the background so the next
+        press gets it. With no loaded fallback, preferred is returned and the
+        request waits for the load.
+        """
+        if self.is_loaded(preferred):
+            return preferred
+        for model in fallbacks:
+            if self.is_loaded(model):
+                logging.info(f"{preferred} is {self.state(preferred)}; answering with {model} meanwhile")
+                self.warm(preferred)
+                return model
+        return preferred
+
+    # ------------------------------------------------------------
+    # Usage
+    # ------------------------------------------------------------
+    def note_use(self, model, now=None):
+        """Records a request for model; starts a new play session after a quiet gap."""
+        now = now or time.time()
+        with self._lock:
+            self._ensure_loaded()
+            latest = max(self._last_used.values(), default=0)
+            self._last_used[model] = now
+            new_session = now - latest > self.session_gap
+            if new_session:
+                self._session_hours[datetime.fromtimestamp(now).hour] += 1
+            # The request itself loads the model; note it so pick() doesn't fall back needlessly
+            if self._polled and model not in self._expires:
+                self._expires[model] = None
+        if new_session:
+            logging.info("New play session started")
+            if self.usage_path:
+                self._save_usage()
+
+    def in_session(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            latest = max(self._last_used.values(), default=0)
+        return now - latest <= self.session_gap
+
+    def expecting_session(self, now=None):
+        """True during, or lead_time before, an hour when play sessions usually start."""
+        now = now or time.time()
+        hours = {datetime.fromtimestamp(now).hour, datetime.fromtimestamp(now + self.lead_time).hour}
+        with self._lock:
+            self._ensure_loaded()
+            return any(self._session_hours[hour] >= self.min_sessions for hour in hours)
+
+    # ------------------------------------------------------------
+    # Polling and warming
+    # ------------------------------------------------------------
+    def start(self):
+        """Reads the usage file and starts the background poll/re-warm thread."""
+        self.load()
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ModelResidency", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh(self):
+        """Polls /api/ps and updates which models are loaded. Returns False if the server didn't answer."""
+        try:
+            running = self.client.ps(timeout=5)
+        except Exception as e:
+            logging.debug(f"Model residency poll failed: {e}")
+            return False
+        loaded = {}
+        for entry in running:
+            name = entry.get("name") or entry.get("model")
+            loaded[name] = parse_expires_at(entry.get("expires_at"))
+        with self._lock:
+            unloaded = [m for m in self._expires if m not in loaded and m in self.models and m not in self._loading]
+            self._expires = loaded
+            self._polled = True
+        for model in unloaded:
+            logging.info(f"Model {model} was unloaded by the server")
+        return True
+
+    def warm(self, model, wait=False):
+        """Loads model with an empty generate request (in the background unless wait)."""
+        with self._lock:
+            if model in self._loading:
+                return
+            self._loading.add(model)
+        if wait:
+            self._warm(model)
+        else:
+            threading.Thread(target=self._warm, args=(model,), name=f"Warmup-{model}", daemon=True).start()
+
+    def _warm(self, model):
+        start = time.perf_counter()
+        try:
+            logging.info(f"Warming up model {model}")
+            self.client.generate(model, "", keep_alive=self.keep_alive, timeout=300)
+            with self._lock:
+                self._expires.setdefault(model, None)
+            self.warmups += 1
+            logging.info(f"Model {model} loaded in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logging.warning(f"Model warmup failed for {model}: {e}")
+        finally:
+            with self._lock:
+                self._loading.discard(model)
+
+    def needs_warmup(self, model, now=None):
+        """True for a model that is cold, or loaded but expiring within rewarm_before seconds."""
+        now = now or time.time()
+        with self._lock:
+            if model in self._loading or not self._polled:
+                return False
+            if model not in self._expires:
+                return True
+            expires = self._expires[model]
+        return expires is not None and expires - now < self.rewarm_before
+
+    def tick(self, now=None):
+        """One poll + re-warm round; run periodically by the background thread."""
+        now = now or time.time()
+        if not self.refresh():
+            return
+        if not (self.in_session(now) or self.expecting_session(now)):
+            return
+        with self._lock:
+            # Keep the models actually used this session, or the main model ahead of a usual session
+            wanted = [m for m in self.models if now - self._last_used.get(m, 0) <= self.session_gap]
+        for model in wanted or self.models[:1]:
+            if self.needs_warmup(model, now):
+                self.warm(model)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logging.warning(f"Model residency check failed: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def load(self):
+        """Reads the usage file now instead of on first use."""
+        with self._lock:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load_usage()
+
+    def _load_usage(self):
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as f:
+                hours = json.load(f).get("session_hours", [])
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable model usage file {self.usage_path}: {e}")
+            return
+        if len(hours) == 24:
+            self._session_hours = [int(count) for count in hours]
+
+    def _save_usage(self):
+        with self._lock:
+            stored = {"session_hours": list(self._session_hours)}
+        tmp_path = self.usage_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.usage_path)
+        except OSError as e:
+            logging.warning(f"Could not save model usage: {e}")
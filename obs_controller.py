@@ -0,0 +1,282 @@
+"""
+Event-driven OBS recording control over obs-websocket.
+
+ObsController keeps one persistent ReqClient for requests and an EventClient
+subscribed to output events. Recording state comes from RecordStateChanged
+events, so stopping and restarting a recording reacts as soon as OBS reports
+the transition instead of polling GetRecordStatus. Dropped connections are
+re-established with exponential backoff, by a background monitor and on
+demand before each operation.
+
+The client classes are injectable, and mock_obs.py serves the protocol
+locally for testing. obsws_python is imported on the first connect so it
+stays off the startup path.
+"""
+import logging
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+OBS_EXECUTABLE = r"C:\Program Files\obs-studio\bin\64bit\obs64.exe"
+
+# OBS reports outputActive false as soon as a stop begins; the file is only finalized at STOPPED
+RECORD_STOPPING = "OBS_WEBSOCKET_OUTPUT_STOPPING"
+RECORD_STOPPED = "OBS_WEBSOCKET_OUTPUT_STOPPED"
+
+_quiet_lock = threading.Lock()
+_quiet_depth = 0
+_quiet_saved_level = logging.NOTSET
+
+
+@contextmanager
+def _quiet_obsws():
+    """
+    Silences obsws_python's logging while connecting, then restores its level.
+    It logs a full traceback for every refused connection; connect attempts are reported here instead.
+    """
+    global _quiet_depth, _quiet_saved_level
+    logger = logging.getLogger("obsws_python")
+    with _quiet_lock:
+        if _quiet_depth == 0:
+            _quiet_saved_level = logger.level
+            logger.setLevel(logging.CRITICAL)
+        _quiet_depth += 1
+    try:
+        yield
+    finally:
+        with _quiet_lock:
+            _quiet_depth -= 1
+            if _quiet_depth == 0:
+                logger.setLevel(_quiet_saved_level)
+
+
+class ObsController:
+    """Persistent obs-websocket connection with record-state tracking."""
+
+    def __init__(self, host="localhost", port=4455, password="", timeout=5, backoff=1.0, max_backoff=30.0,
+                 check_interval=2.0, obs_executable=OBS_EXECUTABLE, req_client=None, event_client=None):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.obs_executable = obs_executable
+        self._req_client = req_client
+        self._event_client = event_client
+        self._req = None
+        self._events = None
+        self._record_active = None
+        self._record_state = None
+        # outputPath of the last recording OBS finalized
+        self.last_recording_path = None
+        self._lock = threading.RLock()
+        self._state_changed = threading.Condition()
+        self._stop = threading.Event()
+        self._monitor = None
+
+    # ------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------
+    @property
+    def connected(self):
+        with self._lock:
+            return self._req is not None and self._events is not None and self._events.worker.is_alive()
+
+    def connect(self):
+        """Opens the request and event connections. Returns False if OBS isn't reachable."""
+        from obsws_python import EventClient, ReqClient, Subs
+        with self._lock:
+            self._close_clients()
+            try:
+                kwargs = dict(host=self.host, port=self.port, password=self.password, timeout=self.timeout)
+                with _quiet_obsws():
+                    self._req = (self._req_client or ReqClient)(**kwargs)
+                    self._events = (self._event_client or EventClient)(subs=Subs.OUTPUTS, **kwargs)
+                    self._events.callback.register(self.on_record_state_changed)
+                    # Events only report changes, so read the current state once
+                    self._set_record_state(self._req.get_record_status().output_active, None)
+            except Exception as e:
+                logging.debug(f"OBS connect failed: {e}")
+                self._close_clients()
+                return False
+        logging.info(f"Connected to OBS at {self.host}:{self.port}")
+        return True
+
+    def ensure_connected(self, timeout=30.0, launch=False):
+        """
+        Connects if needed, retrying with exponential backoff for up to timeout seconds.
+
+        With launch=True, OBS is started if the first attempt fails.
+        """
+        if self.connected:
+            return True
+        deadline = time.time() + timeout
+        delay = self.backoff
+        launched = False
+        while True:
+            if self.connect():
+                return True
+            if launch and not launched:
+                launched = self.launch_obs()
+            remaining = deadline - time.time()
+            if remaining <= 0 or self._stop.is_set():
+                if timeout:
+                    logging.error(f"Could not connect to OBS within {timeout:g}s")
+                return False
+            self._stop.wait(min(delay, remaining))
+            delay = min(delay * 2, self.max_backoff)
+
+    def launch_obs(self):
+        logging.info("Launching OBS...")
+        try:
+            subprocess.Popen(self.obs_executable)
+            return True
+        except OSError as e:
+            logging.error(f"OBS launch failed: {e}")
+            return False
+
+    def start(self):
+        """Starts a background monitor that keeps the connection up (with backoff) once it has been made."""
+        if self._monitor and self._monitor.is_alive():
+            return self
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="OBSMonitor", daemon=True)
+        self._monitor.start()
+        return self
+
+    def _monitor_loop(self):
+        delay = self.backoff
+        while not self._stop.is_set():
+            if self.connected or self.connect():
+                delay = self.backoff
+                self._stop.wait(self.check_interval)
+            else:
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+    def disconnect(self):
+        self._stop.set()
+        with self._lock:
+            self._close_clients()
+
+    def _close_clients(self):
+        for client in (self._events, self._req):
+            if client is not None:
+                try:
+                    client.disconnect()
+                except Exception:
+                    pass
+        self._req = self._events = None
+
+    def _request(self, name, *args):
+        """Sends a request, reconnecting once if the connection has gone away."""
+        from obsws_python.error import OBSSDKTimeoutError
+        from websocket import WebSocketException
+        for attempt in range(2):
+            if not self.ensure_connected(timeout=self.timeout if attempt else 0):
+                raise ConnectionError("OBS is not connected")
+            with self._lock:
+                req = self._req
+            try:
+                return getattr(req, name)(*args)
+            except (OSError, WebSocketException, OBSSDKTimeoutError) as e:
+                # Request errors (e.g. "already recording") are raised as is; only lost connections are retried
+                logging.warning(f"OBS connection lost during {name}: {e}")
+                with self._lock:
+                    self._close_clients()
+        raise ConnectionError(f"OBS request {name} failed after reconnecting")
+
+    # ------------------------------------------------------------
+    # Record state
+    # ------------------------------------------------------------
+    def on_record_state_changed(self, data):
+        """EventClient callback (the name must match the event) for RecordStateChanged."""
+        logging.debug(f"OBS record state: {data.output_state}")
+        if data.output_state == RECORD_STOPPED:
+            self.last_recording_path = getattr(data, "output_path", None)
+        # Still counts as recording until OBS has finished writing the file
+        self._set_record_state(data.output_active or data.output_state == RECORD_STOPPING, data.output_state)
+
+    def _set_record_state(self, active, state):
+        with self._state_changed:
+            self._record_active = active
+            self._record_state = state
+            self._state_changed.notify_all()
+
+    @property
+    def record_active(self):
+        return self._record_active
+
+    @property
+    def record_state(self):
+        """Last RecordStateChanged outputState, e.g. OBS_WEBSOCKET_OUTPUT_STOPPING; None before any event."""
+        return self._record_state
+
+    def wait_for_record_state(self, active, timeout):
+        """Blocks until recording is (in)active; polls the status instead while events are unavailable."""
+        deadline = time.time() + timeout
+        while True:
+            with self._state_changed:
+                if self._record_active == active:
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                events_up = self.connected
+                self._state_changed.wait(remaining if events_up else min(1.0, remaining))
+            if not events_up:
+                try:
+                    self._set_record_state(self.get_record_status().output_active, None)
+                except Exception as e:
+                    logging.debug(f"OBS status poll failed: {e}")
+
+    # ------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------
+    def get_version(self):
+        return self._request("get_version")
+
+    def get_record_status(self):
+        return self._request("get_record_status")
+
+    def start_recording(self, timeout=10.0):
+        """Starts recording and waits until OBS reports it has started."""
+        if self._record_active:
+            return True
+        self._request("start_record")
+        started = self.wait_for_record_state(True, timeout)
+        if not started:
+            logging.warning(f"OBS recording did not start within {timeout:.0f}s")
+        return started
+
+    def stop_recording(self, timeout=30.0, retries=3):
+        """Stops recording and waits until OBS has finalized the file, retrying the stop if it hangs."""
+        if self._record_active is False:
+            return True
+        for attempt in range(retries):
+            logging.info("Waiting for OBS to finalize the recording...")
+            try:
+                self._request("stop_record")
+            except ConnectionError:
+                raise
+            except Exception as e:
+                # e.g. OBS is already stopping it
+                logging.warning(f"OBS stop_record failed: {e}")
+            if self.wait_for_record_state(False, timeout):
+                logging.info("Previous recording finalized.")
+                return True
+            logging.warning(f"Still recording after {timeout:.0f}s (attempt {attempt + 1}/{retries})")
+        logging.error("Failed to stop recording after multiple attempts.")
+        return False
+
+    def restart_recording(self):
+        """Finalizes any recording in progress and starts a fresh one."""
+        if self._record_active:
+            logging.info("Stopping existing recording...")
+            if not self.stop_recording():
+                return False
+        logging.info("Starting new recording...")
+        return self.start_recording()
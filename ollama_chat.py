@@ -1,44 +1,250 @@
-import requests
+#!/usr/bin/env python3
+"""
+Batch screenshot processing against Ollama.
+
+Runs the app's prompts over a directory (or glob) of screenshots with
+bounded concurrency, preparing each request the way the hotkeys do (capture
+settings, dialogue cropping, messages, model). One JSON line per screenshot
+and prompt is appended to the output file as soon as it finishes.
+Screenshot/prompt/model combinations already in the output file are
+skipped, so an interrupted run picks up where it stopped; failed ones are
+tried again (--redo runs everything again).
+
+Prompts:
+  default   F9, playful description of the whole screen
+  simple    F12, exact dialogue text
+  explain   \\, tricky words explained
+  rephrase  F10, the exact text followed by a text-only kid-friendly rephrase
+
+With --cache, answers are also written to a response cache file. Saved as
+prebuilt_cache.json next to the app, it lets the app answer those screens
+instantly, which pre-builds the cache for a game. The closing report
+(throughput, per-image latency and per-stage p50/p95) doubles as a load
+test for the backend.
+
+Usage:
+    python ollama_chat.py screenshots/ --prompt simple --prompt rephrase
+    python ollama_chat.py "shots/**/*.png" --concurrency 4 --output results.jsonl
+    python ollama_chat.py screenshots/ --prompt simple --cache prebuilt_cache.json
+    python ollama_chat.py screenshots/ --url http://a:11434 --url http://b:11434 --concurrency 8
+"""
+import argparse
+import glob
 import json
-import base64
+import logging
+import os
+import statistics
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image
+
+import tracing
+import game_helper_buddy as app
+from model_residency import ResidencyManager
+from ollama_client import OLLAMA_BASE_URL, OllamaClient
+from ollama_router import OllamaRouter
+from response_cache import ResponseCache
+from roi import RegionMemory
+from tracing import Tracer, trace_context
 
-# Ensure UTF-8 output on Windows
-sys.stdout.reconfigure(encoding='utf-8')
-
-# Ollama server URL
-OLLAMA_URL = "http://192.168.50.250:30068/api/chat"
-
-# Path to your image
-IMAGE_PATH = "C:/test/Screenshot-LLM-TTS/debug_screenshot_1741941837.png"
-
-# Convert image to Base64
-with open(IMAGE_PATH, "rb") as image_file:
-    base64_image = base64.b64encode(image_file.read()).decode("utf-8")
-
-# Define the request payload with an image
-payload = {
-    "model": "gemma3:27b-it-q8_0",
-    "messages": [
-        {
-            "role": "user", 
-            "content": "Describe this image.",
-            "images": [base64_image]
-        }
-    ]
+PROMPTS = {
+    "default": app.DEFAULT_SYSTEM_PROMPT,
+    "simple": app.SIMPLE_SYSTEM_PROMPT,
+    "explain": app.EXPLAIN_WORDS_PROMPT,
+    "rephrase": app.REPHRASE_FOR_KID_PROMPT,
 }
+# Prompts the app sends with only the dialogue box (dialogue=True); F9 sends the whole screen
+DIALOGUE_PROMPTS = ("simple", "explain", "rephrase")
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+# Save the --cache file every this many answers, so an interrupted run keeps most of them
+CACHE_SAVE_EVERY = 20
+
+
+def find_images(patterns, recursive=False):
+    """Expands directories and globs into a sorted list of absolute image paths."""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walk = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            for root, _, names in walk:
+                found.update(os.path.join(root, name) for name in names if name.lower().endswith(IMAGE_EXTENSIONS))
+        elif os.path.isfile(pattern):
+            found.add(pattern)
+        else:
+            found.update(path for path in glob.glob(pattern, recursive=True)
+                         if path.lower().endswith(IMAGE_EXTENSIONS))
+    return sorted(os.path.abspath(path) for path in found)
+
+def load_done(output_path):
+    """(file, prompt, model) keys that already have a successful result in the output file."""
+    done = set()
+    try:
+        with open(output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by an interrupted run
+                    continue
+                if record.get("ok"):
+                    done.add((record["file"], record["prompt"], record["model"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+def is_answer(text):
+    return bool(text) and app.LLM_ERROR_RESPONSE not in text
 
-# Send request with streaming enabled
-response = requests.post(OLLAMA_URL, json=payload, stream=True)
 
-# Process the streamed JSON response line by line
-for line in response.iter_lines():
-    if line:
+class BatchRunner:
+    """Processes (image, prompt) jobs; safe to call from several worker threads."""
+
+    def __init__(self, client, model, tracer, timeout=120, crop=True):
+        self.client = client
+        self.model = model
+        self.tracer = tracer
+        self.timeout = timeout
+        self.crop = crop
+        # One shared memory, like one game: the last detected box is the fallback when detection fails
+        self.regions = RegionMemory(path=None)
+
+    def region_for(self, image, prompt_name):
+        if app.CAPTURE_SETTINGS.crop or not self.crop or prompt_name not in DIALOGUE_PROMPTS:
+            return app.CAPTURE_SETTINGS.crop
+        return self.regions.region_for(image, "batch")
+
+    def process(self, path, prompt_name):
+        """Runs one prompt on one screenshot and returns its result record."""
+        trace = self.tracer.start(prompt_name)
+        record = {"file": path, "prompt": prompt_name, "model": self.model}
         try:
-            data = json.loads(line.decode("utf-8"))
-            if "message" in data:
-                print(data["message"]["content"], end="", flush=True)
-        except json.JSONDecodeError:
-            pass  # Ignore incomplete JSON fragments
+            with trace_context(trace):
+                with tracing.span("load"):
+                    with Image.open(path) as image:
+                        screenshot = image.convert("RGB")
+                region = self.region_for(screenshot, prompt_name)
+                # Like the app: dialogue prompts are matched on the dialogue box only
+                frame_hash = app.screenshot_hash(screenshot, region)
+                image_base64 = app.encode_screenshot(screenshot, region)
+                # Rephrasing works on the extracted text, like F10
+                prompt = app.SIMPLE_SYSTEM_PROMPT if prompt_name == "rephrase" else PROMPTS[prompt_name]
+                text = "".join(app.stream_image_with_llm(
+                    image_base64, prompt=prompt, model=self.model, timeout=self.timeout, client=self.client
+                ))
+                if prompt_name == "rephrase":
+                    record["original_text"] = text
+                    if is_answer(text) and "no text detected" not in text.lower():
+                        text = "".join(app.stream_text_with_llm(
+                            text, prompt=app.REPHRASE_FOR_KID_PROMPT, model=self.model, timeout=self.timeout,
+                            client=self.client
+                        ))
+            record.update(hash=f"{frame_hash:x}", region=region, text=text, ok=is_answer(text))
+        except Exception as e:
+            record.update(ok=False, error=str(e))
+        trace.finish(cancelled=not record["ok"])
+        record["latency"] = round(trace.spans["total"], 3)
+        record["spans"] = {name: round(seconds, 4) for name, seconds in trace.spans.items()}
+        record["values"] = trace.values
+        return record
+
+
+def print_report(records, elapsed, tracer, skipped):
+    ok = [r for r in records if r["ok"]]
+    print(f"\nProcessed {len(records)} job(s) in {elapsed:.1f}s: {len(ok)} ok, {len(records) - len(ok)} failed, "
+          f"{skipped} skipped (already done)")
+    if not records:
+        return
+    print(f"Throughput: {len(records) / elapsed:.2f} jobs/s")
+    if ok:
+        latencies = sorted(r["latency"] for r in ok)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"Latency per image: p50 {statistics.median(latencies):.2f}s  p95 {p95:.2f}s  max {latencies[-1]:.2f}s")
+        rates = [r["values"]["tokens_per_sec"] for r in ok if r["values"].get("tokens_per_sec")]
+        if rates:
+            print(f"Generation: {statistics.mean(rates):.1f} tokens/s on average")
+    print("\nPer-stage latency (successful jobs):")
+    print(tracer.format_summary())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Screenshot files, directories or globs")
+    parser.add_argument("--prompt", action="append", choices=sorted(PROMPTS),
+                        help="Prompt to run (repeatable; default: simple)")
+    parser.add_argument("--model", default=app.MODEL)
+    parser.add_argument("--url", action="append", help=f"Ollama server (repeatable; default: {OLLAMA_BASE_URL})")
+    parser.add_argument("--concurrency", type=int, default=2, help="Requests in flight at once")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--redo", action="store_true", help="Process files that already have a result")
+    parser.add_argument("--recursive", action="store_true", help="Include subdirectories of directory paths")
+    parser.add_argument("--no-crop", action="store_true", help="Send whole screenshots instead of the dialogue box")
+    parser.add_argument("--cache", help="Also write answers to this response cache file (e.g. prebuilt_cache.json)")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout (s)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    # Ensure UTF-8 output on Windows
+    sys.stdout.reconfigure(encoding='utf-8')
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='[%(asctime)s] %(levelname)s: %(message)s')
+
+    prompts = args.prompt or ["simple"]
+    images = find_images(args.paths, args.recursive)
+    if not images:
+        raise SystemExit(f"No screenshots found in {' '.join(args.paths)}")
+    done = set() if args.redo else load_done(args.output)
+    jobs = [(path, prompt) for path in images for prompt in prompts if (path, prompt, args.model) not in done]
+    skipped = len(images) * len(prompts) - len(jobs)
+    print(f"{len(images)} screenshot(s) x {len(prompts)} prompt(s): {len(jobs)} to run, {skipped} already done")
+
+    urls = args.url or [OLLAMA_BASE_URL]
+    if len(urls) == 1:
+        client = OllamaClient(urls[0], timeout=args.timeout, pool_size=max(4, args.concurrency))
+    else:
+        client = OllamaRouter(urls, timeout=args.timeout).start_probing()
+    # Batch runs shouldn't count as play sessions in the app's model usage history
+    app.model_residency = ResidencyManager(client, [args.model])
+    cache = None
+    if args.cache:
+        cache = ResponseCache(max_entries=100000, ttl=None, max_distance=app.RESPONSE_CACHE.max_distance,
+                              path=args.cache, autosave=False)
+
+    tracer = Tracer(history=max(1, len(jobs)))
+    runner = BatchRunner(client, args.model, tracer, timeout=args.timeout, crop=not args.no_crop)
+    records = []
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        with open(args.output, "a", encoding="utf-8") as output:
+            futures = [executor.submit(runner.process, path, prompt) for path, prompt in jobs]
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                status = "ok  " if record["ok"] else "FAIL"
+                print(f"[{len(records)}/{len(jobs)}] {status} {record['latency']:6.2f}s  {record['prompt']:<8} "
+                      f"{os.path.basename(record['file'])}", flush=True)
+                if cache is not None and record["ok"]:
+                    prompt = app.SIMPLE_SYSTEM_PROMPT if record["prompt"] == "rephrase" else PROMPTS[record["prompt"]]
+                    answer = record.get("original_text", record["text"])
+                    cache.put(int(record["hash"], 16), prompt, args.model, answer)
+                    if len(records) % CACHE_SAVE_EVERY == 0:
+                        cache.save()
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished results are saved, run again to resume.")
+        executor.shutdown(wait=False, cancel_futures=True)
+    else:
+        executor.shutdown()
+    finally:
+        if cache is not None:
+            cache.save()
+        client.close()
+
+    print_report(records, time.perf_counter() - start, tracer, skipped)
 
-print()  # Print a newline at the end
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""
+Pooled HTTP client for the Ollama API.
+
+One OllamaClient holds a requests.Session with keep-alive connections to a
+single configured server, so hotkeys, warmup and keep-alive pings all reuse
+the same warm TCP connection. Streaming calls return a ChunkStream over the
+NDJSON chunks, which sends the request when iteration starts. Closing it
+(from any thread) aborts the connection, whether the request is still being
+sent, waiting for its first token or streaming.
+
+Request bodies that carry images (capture.EncodedImage) are sent as a
+JsonBody: the JSON around the images is serialized up front, and each image
+is base64-encoded chunk by chunk while the body is written to the socket.
+Only the encoded image bytes stay in memory, instead of base64, str and
+serialized JSON copies of them.
+
+requests is imported when the first session is created rather than at import
+time, so it doesn't slow down program startup.
+"""
+import json
+import logging
+import re
+import socket
+import threading
+import time
+import uuid
+
+OLLAMA_BASE_URL = "http://192.168.50.250:11434"
+
+# Statuses worth retrying: the server is loading a model or temporarily overloaded
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+# The ChunkStream whose request is being sent on this thread, for the connection to attach to
+_sending = threading.local()
+
+
+class JsonBody:
+    """
+    A JSON request body that streams its images.
+
+    Values with an iter_base64() method are serialized as JSON strings whose
+    content is produced while the body is iterated; everything else goes
+    through json.dumps. The total length is known up front, so requests sends
+    it with a Content-Length (not chunked), and the body can be iterated again
+    if a request is retried.
+
+    upload_seconds is the time from the first to the last chunk handed to the
+    connection, i.e. the upload of the body (of the last attempt).
+    """
+
+    def __init__(self, payload):
+        marker = f"__streamed_{uuid.uuid4().hex}_"
+        streamed = []
+
+        def placeholder(value):
+            if not hasattr(value, "iter_base64"):
+                raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+            streamed.append(value)
+            return f"{marker}{len(streamed) - 1}"
+
+        text = json.dumps(payload, default=placeholder)
+        # Alternating JSON text and placeholder indexes
+        pieces = re.split(f'"{marker}(\\d+)"', text)
+        self._parts = [piece.encode("utf-8") if i % 2 == 0 else streamed[int(piece)]
+                       for i, piece in enumerate(pieces)]
+        self.upload_seconds = None
+
+    def __len__(self):
+        return sum(len(part) if isinstance(part, bytes) else len(part) + 2 for part in self._parts)
+
+    def __iter__(self):
+        # The connection asks for the next chunk once it has sent the previous one
+        start = time.perf_counter()
+        for part in self._parts:
+            if isinstance(part, bytes):
+                if part:
+                    yield part
+            else:
+                yield b'"'
+                yield from part.iter_base64()
+                yield b'"'
+        self.upload_seconds = time.perf_counter() - start
+
+    @property
+    def streaming(self):
+        """True when at least one value is streamed."""
+        return len(self._parts) > 1
+
+
+def buffered_payload(payload):
+    """The payload with streamed values replaced by their full strings (for stream_body=False)."""
+    if isinstance(payload, dict):
+        return {key: buffered_payload(value) for key, value in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return [buffered_payload(value) for value in payload]
+    if hasattr(payload, "iter_base64"):
+        return str(payload)
+    return payload
+
+
+class ChunkStream:
+    """
+    Iterator over the NDJSON chunks of a streaming response.
+
+    The request is sent when iteration starts. close() may be called from
+    another thread at any point to abort it: before the request is sent, while
+    it waits for the first token (Ollama sends the response headers with it)
+    or mid-generation. The reading thread then simply stops iterating.
+    """
+
+    def __init__(self, send, body=None):
+        # send(stream) sends the request and returns the streaming response
+        self._send = send
+        self._body = body
+        self.response = None
+        self.closed = False
+        # The last chunk (done=True) carries Ollama's timing and token counts
+        self.final = None
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def upload_seconds(self):
+        """Time to upload a streamed request body (JsonBody); None for a body sent in one piece."""
+        return getattr(self._body, "upload_seconds", None)
+
+    def __iter__(self):
+        try:
+            if self.closed:
+                return
+            _sending.stream = self
+            try:
+                self.response = self._send(self)
+            finally:
+                _sending.stream = None
+            for line in self.response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                if chunk.get("done"):
+                    self.final = chunk
+                yield chunk
+        except Exception:
+            if not self.closed:
+                raise
+        finally:
+            with self._lock:
+                # The connection goes back to the pool and may carry another request after this
+                self._connection = None
+            # A fully read response goes back to the connection pool
+            if self.response is not None:
+                self.response.close()
+
+    def text(self):
+        """Yields only the generated text of each chunk (chat or generate)."""
+        for chunk in self:
+            content = chunk.get("message", {}).get("content", "") or chunk.get("response", "")
+            if content:
+                yield content
+
+    def close(self):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            connection = self._connection
+            # Closing the response alone doesn't wake a thread blocked in recv(); shutting
+            # the socket down does, and the reader then sees the stream end
+            if connection is not None:
+                _shutdown(connection)
+        if self.response is not None:
+            self.response.close()
+
+    def _attach(self, connection):
+        """Called by the connection sending this stream's request, before and after it connects."""
+        with self._lock:
+            self._connection = connection
+            if self.closed:
+                _shutdown(connection)
+
+
+def _shutdown(connection):
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+_adapter_class = None
+
+def _cancellable_adapter_class():
+    """
+    A requests HTTPAdapter whose connections attach to the ChunkStream sending on
+    their thread, so that ChunkStream.close() can shut their socket down.
+    """
+    global _adapter_class
+    if _adapter_class is not None:
+        return _adapter_class
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class Attaching:
+        def connect(self):
+            super().connect()
+            self._attach()
+
+        def request(self, *args, **kwargs):
+            self._attach()
+            return super().request(*args, **kwargs)
+
+        def _attach(self):
+            stream = getattr(_sending, "stream", None)
+            if stream is not None:
+                stream._attach(self)
+
+    class AttachingHTTPConnection(Attaching, HTTPConnection):
+        pass
+
+    class AttachingHTTPSConnection(Attaching, HTTPSConnection):
+        pass
+
+    class Pool(HTTPConnectionPool):
+        ConnectionCls = AttachingHTTPConnection
+
+    class HTTPSPool(HTTPSConnectionPool):
+        ConnectionCls = AttachingHTTPSConnection
+
+    class CancellableAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {"http": Pool, "https": HTTPSPool}
+
+    _adapter_class = CancellableAdapter
+    return _adapter_class
+
+
+class OllamaClient:
+    """Reusable Ollama client with connection pooling, per-call timeouts and retry with backoff."""
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, timeout=60, connect_timeout=5, retries=2, backoff=0.5,
+                 pool_size=4, stream_body=True):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        # Stream images into request bodies (JsonBody); False builds the whole JSON body in memory first
+        self.stream_body = stream_body
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"OllamaClient({self.base_url!r})"
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._new_session()
+            return self._session
+
+    def _new_session(self):
+        import requests
+        session = requests.Session()
+        adapter = _cancellable_adapter_class()(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def reset(self):
+        """Drops every pooled connection, e.g. after the machine has slept and the sockets went stale."""
+        with self._session_lock:
+            old, self._session = self._session, None
+        if old is not None:
+            old.close()
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def chat(self, model, messages, stream=False, timeout=None, **extra):
+        """
+        POST /api/chat. Extra keyword arguments (format, options, keep_alive, ...)
+        are added to the request body.
+
+        Returns the response dict, or a ChunkStream of chunk dicts when stream=True
+        (the request is sent when it is iterated).
+        """
+        payload = {"model": model, "messages": messages, "stream": stream, **extra}
+        return self._call("/api/chat", payload, stream, timeout)
+
+    def generate(self, model, prompt, stream=False, timeout=None, **extra):
+        """POST /api/generate. Returns the response dict, or a ChunkStream of chunk dicts when stream=True."""
+        payload = {"model": model, "prompt": prompt, "stream": stream, **extra}
+        return self._call("/api/generate", payload, stream, timeout)
+
+    def ps(self, timeout=10):
+        """GET /api/ps: the models currently loaded on the server."""
+        response = self._request("GET", "/api/ps", {}, stream=False, timeout=timeout)
+        return response.json().get("models", [])
+
+    def stream_chat_text(self, model, messages, timeout=None, **extra):
+        """Streams a chat reply as plain text chunks."""
+        return self.chat(model, messages, stream=True, timeout=timeout, **extra).text()
+
+    # ------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------
+    def _call(self, path, payload, stream, timeout):
+        body = self._body(payload)
+        if stream:
+            send = lambda pending: self._request("POST", path, body, stream=True, timeout=timeout, pending=pending)
+            return ChunkStream(send, body.get("data"))
+        response = self._request("POST", path, body, stream=stream, timeout=timeout)
+        try:
+            return response.json()
+        finally:
+            response.close()
+
+    def _request(self, method, path, body, stream, timeout, pending=None):
+        """
+        Sends a request with the body keyword arguments from _body(), retrying
+        connection failures and retryable statuses with exponential backoff.
+        Only the request itself is retried, never a stream that has already started,
+        nor one whose pending ChunkStream was closed.
+        """
+        import requests
+        url = self.base_url + path
+        timeouts = (self.connect_timeout, timeout or self.timeout)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, stream=stream, timeout=timeouts, **body)
+                if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                    response.close()
+                    raise requests.exceptions.HTTPError(f"{response.status_code} from {url}", response=response)
+                response.raise_for_status()
+                return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as e:
+                status = e.response.status_code if e.response is not None else None
+                retryable = status is None or status in RETRY_STATUSES
+                if not retryable or attempt >= self.retries or (pending is not None and pending.closed):
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                attempt += 1
+                logging.warning(f"Ollama {path} failed ({e}); retry {attempt}/{self.retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _body(self, payload):
+        """requests keyword arguments for the request body."""
+        if payload is None:
+            return {}
+        if self.stream_body:
+            body = JsonBody(payload)
+            if body.streaming:
+                return {"data": body, "headers": {"Content-Type": "application/json"}}
+        return {"json": buffered_payload(payload)}
+
@@ -0,0 +1,345 @@
+"""
+Routing across several Ollama servers with health checks, failover and hedging.
+
+OllamaRouter has the same chat/generate/ps interface as OllamaClient, so it
+can stand in for it anywhere. A background thread probes every backend's
+/api/ps and tracks health and latency. Requests go to the healthy backend
+with the fewest in-flight requests (ties broken by observed time to first
+token), or purely by lowest time to first token.
+
+Streaming chats are hedged: if no token has arrived within hedge_after
+seconds, the same request is sent to the next-best backend, the first one to
+produce a token wins and the other stream is closed. A backend that fails
+before its first token is failed over to the next one.
+"""
+import logging
+import queue
+import threading
+import time
+
+from ollama_client import OllamaClient
+
+# Weight of the newest sample in the latency moving averages
+EWMA_ALPHA = 0.3
+
+
+class Backend:
+    """One Ollama server plus its health and latency bookkeeping."""
+
+    def __init__(self, url, client):
+        self.url = url
+        self.client = client
+        self.healthy = True
+        self.probe_latency = None
+        self.ttft = None
+        self.inflight = 0
+        self.failures = 0
+        self.loaded_models = []
+
+    def __repr__(self):
+        return f"Backend({self.url!r}, healthy={self.healthy}, inflight={self.inflight})"
+
+    def observe_ttft(self, seconds):
+        self.ttft = seconds if self.ttft is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.ttft
+
+    def observe_probe(self, seconds):
+        self.probe_latency = seconds if self.probe_latency is None else \
+            EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.probe_latency
+
+
+class OllamaRouter:
+    """Drop-in replacement for OllamaClient that spreads requests over several servers."""
+
+    def __init__(self, urls, strategy="least_loaded", hedge_after=3.0, probe_interval=15.0, probe_timeout=2.0,
+                 timeout=60, client_factory=None):
+        if not urls:
+            raise ValueError("OllamaRouter needs at least one backend URL")
+        if strategy not in ("least_loaded", "lowest_ttft"):
+            raise ValueError(f"Unknown routing strategy: {strategy!r}")
+        if client_factory is None:
+            # Failover is handled here, so with several backends the clients don't retry on their own;
+            # a single backend has nothing to fail over to and keeps the client's retry with backoff
+            retries = {"retries": 0} if len(urls) > 1 else {}
+            client_factory = lambda url: OllamaClient(url, timeout=timeout, **retries)
+        self.backends = [Backend(url, client_factory(url)) for url in urls]
+        self.strategy = strategy
+        self.hedge_after = hedge_after
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._prober = None
+
+    def __repr__(self):
+        return f"OllamaRouter({[b.url for b in self.backends]!r})"
+
+    @property
+    def base_url(self):
+        return self.ranked()[0].url
+
+    # ------------------------------------------------------------
+    # Health probes
+    # ------------------------------------------------------------
+    def start_probing(self):
+        """Starts the background health/latency probe thread."""
+        if self._prober and self._prober.is_alive():
+            return self
+        self._stop.clear()
+        self._prober = threading.Thread(target=self._probe_loop, name="OllamaProbe", daemon=True)
+        self._prober.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for backend in self.backends:
+            backend.client.close()
+
+    def close(self):
+        self.stop()
+
+    def reset(self):
+        """Drops pooled connections and forgets failures, e.g. after the machine has slept."""
+        with self._lock:
+            for backend in self.backends:
+                backend.client.reset()
+                backend.healthy = True
+                backend.failures = 0
+
+    def probe(self, backend):
+        start = time.perf_counter()
+        try:
+            models = backend.client.ps(timeout=self.probe_timeout)
+        except Exception as e:
+            if backend.healthy:
+                logging.warning(f"Ollama backend {backend.url} is unhealthy: {e}")
+            backend.healthy = False
+            return False
+        backend.observe_probe(time.perf_counter() - start)
+        backend.loaded_models = [m.get("name") or m.get("model") for m in models]
+        if not backend.healthy:
+            logging.info(f"Ollama backend {backend.url} is healthy again")
+        backend.healthy = True
+        backend.failures = 0
+        return True
+
+    def probe_all(self):
+        for backend in self.backends:
+            self.probe(backend)
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+
+    # ------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------
+    def ranked(self):
+        """Backends best-first: healthy before unhealthy, then by the routing strategy."""
+        def ttft(backend):
+            if backend.ttft is not None:
+                return backend.ttft
+            return backend.probe_latency if backend.probe_latency is not None else float("inf")
+
+        with self._lock:
+            if self.strategy == "least_loaded":
+                key = lambda b: (not b.healthy, b.inflight, ttft(b))
+            else:
+                key = lambda b: (not b.healthy, ttft(b), b.inflight)
+            return sorted(self.backends, key=key)
+
+    def _mark_failed(self, backend, error):
+        with self._lock:
+            backend.failures += 1
+            backend.healthy = False
+        logging.warning(f"Ollama backend {backend.url} failed: {error}")
+
+    def _call(self, method, *args, **kwargs):
+        """Runs a non-streaming call on the best backend, failing over to the others."""
+        last_error = None
+        for backend in self.ranked():
+            with self._lock:
+                backend.inflight += 1
+            try:
+                return getattr(backend.client, method)(*args, **kwargs)
+            except Exception as e:
+                last_error = e
+                self._mark_failed(backend, e)
+            finally:
+                with self._lock:
+                    backend.inflight -= 1
+        raise last_error
+
+    # ------------------------------------------------------------
+    # OllamaClient interface
+    # ------------------------------------------------------------
+    def chat(self, model, messages, stream=False, timeout=None, **extra):
+        if not stream:
+            return self._call("chat", model, messages, stream=False, timeout=timeout, **extra)
+        return HedgedStream(self, "chat", (model, messages), dict(timeout=timeout, **extra))
+
+    def generate(self, model, prompt, stream=False, timeout=None, **extra):
+        if not stream:
+            return self._call("generate", model, prompt, stream=False, timeout=timeout, **extra)
+        return HedgedStream(self, "generate", (model, prompt), dict(timeout=timeout, **extra))
+
+    def ps(self, timeout=10):
+        return self._call("ps", timeout=timeout)
+
+    def stream_chat_text(self, model, messages, timeout=None, **extra):
+        return self.chat(model, messages, stream=True, timeout=timeout, **extra).text()
+
+
+_DONE = object()
+
+
+class _Attempt:
+    """One backend's try at a streamed request, pumped into a shared queue by its own thread."""
+
+    def __init__(self, router, backend, method, args, kwargs, chunks):
+        self.router = router
+        self.backend = backend
+        self.stream = None
+        self.cancelled = False
+        self.started = time.perf_counter()
+        self._chunks = chunks
+        self._thread = threading.Thread(target=self._run, args=(method, args, kwargs),
+                                        name=f"OllamaAttempt-{backend.url}", daemon=True)
+        self._thread.start()
+
+    def _run(self, method, args, kwargs):
+        router = self.router
+        with router._lock:
+            self.backend.inflight += 1
+        try:
+            self.stream = getattr(self.backend.client, method)(*args, stream=True, **kwargs)
+            if self.cancelled:
+                self.stream.close()
+            for chunk in self.stream:
+                self._chunks.put((self, chunk))
+            self._chunks.put((self, _DONE))
+        except Exception as e:
+            if not self.cancelled:
+                self._chunks.put((self, e))
+        finally:
+            with router._lock:
+                self.backend.inflight -= 1
+
+    def cancel(self):
+        self.cancelled = True
+        # The client's ChunkStream exists before its request is sent, so closing it also aborts
+        # an attempt that is still uploading or waiting for its first token
+        if self.stream is not None:
+            self.stream.close()
+
+
+class HedgedStream:
+    """
+    ChunkStream-compatible iterator that hedges and fails over across backends.
+
+    Iteration yields the chunks of whichever backend produced the first token;
+    close() aborts every attempt.
+    """
+
+    def __init__(self, router, method, args, kwargs):
+        self.router = router
+        self.final = None
+        self.closed = False
+        self.backend = None
+        self._method = method
+        self._args = args
+        self._kwargs = kwargs
+        self._chunks = queue.Queue()
+        self._attempts = []
+        self._candidates = router.ranked()
+        self._can_hedge = bool(router.hedge_after)
+        self._launch_next()
+
+    def _launch_next(self):
+        """Starts the request on the next untried backend. Returns False when none are left."""
+        while self._candidates:
+            backend = self._candidates.pop(0)
+            # The first attempt goes out even if every backend looks unhealthy
+            if backend.healthy or not self._attempts:
+                self._attempts.append(_Attempt(self.router, backend, self._method, self._args, self._kwargs,
+                                               self._chunks))
+                return True
+        return False
+
+    def _hedge_timeout(self):
+        """Seconds left before hedging on another backend, or None if hedging isn't possible."""
+        if not self._can_hedge:
+            return None
+        return max(0.0, self.router.hedge_after - (time.perf_counter() - self._attempts[-1].started))
+
+    def __iter__(self):
+        winner = None
+        live = len(self._attempts)
+        while True:
+            try:
+                attempt, item = self._chunks.get(timeout=None if winner else self._hedge_timeout())
+            except queue.Empty:
+                # No token yet: hedge on the next backend and keep waiting on both
+                if self._launch_next():
+                    live += 1
+                    logging.info(f"No token after {self.router.hedge_after:.1f}s; "
+                                 f"hedging on {self._attempts[-1].backend.url}")
+                else:
+                    self._can_hedge = False
+                continue
+
+            if attempt is None or self.closed:
+                # close() was called, possibly from another thread
+                return
+            if winner is not None and attempt is not winner:
+                continue
+
+            if isinstance(item, Exception):
+                if winner is not None:
+                    raise item
+                # Failed before its first token: fail over while other backends remain
+                self.router._mark_failed(attempt.backend, item)
+                live -= 1
+                if live == 0:
+                    if not self._launch_next():
+                        raise item
+                    live += 1
+                continue
+
+            if winner is None:
+                winner = attempt
+                self.backend = attempt.backend
+                attempt.backend.observe_ttft(time.perf_counter() - attempt.started)
+                self._cancel_others(winner)
+            if item is _DONE:
+                return
+            if item.get("done"):
+                self.final = item
+            yield item
+
+    def _cancel_others(self, winner):
+        for attempt in self._attempts:
+            if attempt is not winner:
+                attempt.cancel()
+
+    @property
+    def upload_seconds(self):
+        """The winning backend's request body upload time, once a token has arrived."""
+        for attempt in self._attempts:
+            if attempt.backend is self.backend and attempt.stream is not None:
+                return attempt.stream.upload_seconds
+        return None
+
+    def text(self):
+        for chunk in self:
+            content = chunk.get("message", {}).get("content", "") or chunk.get("response", "")
+            if content:
+                yield content
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for attempt in self._attempts:
+            attempt.cancel()
+        self._chunks.put((None, None))
@@ -0,0 +1,109 @@
+"""
+Generation profiles: per-request output caps, sampling and model choice.
+
+Each kind of request (F9 narration, F12 extraction, rephrasing, ...) gets a
+GenerationProfile. Its Ollama options cap the reply server-side (num_predict,
+stop sequences), and a StreamLimit ends the stream client-side as soon as
+the profile's end condition is met: a phrase that is a complete answer by
+itself ("No text detected."), a character budget reached at the end of a
+sentence, or the closing brace of a JSON reply. Closing the stream early also
+stops the server generating.
+
+Changing num_ctx between requests makes Ollama reload the model, so profiles
+that share a model should agree on it (None keeps the model's own setting).
+"""
+from dataclasses import dataclass
+
+from speech import sentence_end
+from structured_output import JsonFieldScanner
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """Limits and model for one kind of request."""
+    name: str = "default"
+    # Ollama options; None leaves the server/model default
+    num_predict: int = None
+    num_ctx: int = None
+    temperature: float = None
+    stop: tuple = ()
+    # Read timeout for the request (s)
+    timeout: float = 60
+    # Model to use instead of the app's MODEL
+    model: str = None
+    # Client-side end conditions
+    end_on: tuple = ()
+    max_chars: int = None
+    json_object: bool = False
+
+    def options(self):
+        """The Ollama `options` for this profile, always in the same key order."""
+        options = {}
+        if self.num_predict is not None:
+            options["num_predict"] = self.num_predict
+        if self.num_ctx is not None:
+            options["num_ctx"] = self.num_ctx
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        if self.stop:
+            options["stop"] = list(self.stop)
+        return options
+
+    def limit(self):
+        """A StreamLimit for one reply, or None when the profile has no client-side end condition."""
+        if self.end_on or self.max_chars or self.json_object:
+            return StreamLimit(self)
+        return None
+
+    def describe(self):
+        parts = [self.name] + [f"{key}={value}" for key, value in self.options().items()]
+        return " ".join(parts)
+
+
+class StreamLimit:
+    """
+    Watches a streamed reply for a profile's end condition.
+
+    feed() returns the part of the chunk to pass on and whether the reply is
+    complete. Once an end phrase or the character budget is reached, the rest
+    of the current sentence is still let through so speech doesn't stop
+    mid-word.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.text = ""
+        self.reason = None
+        self._end_phrases = [phrase.lower() for phrase in profile.end_on]
+        self._finish_from = None
+        self._json = JsonFieldScanner() if profile.json_object else None
+
+    def feed(self, chunk):
+        start = len(self.text)
+        self.text += chunk
+        if self._json is not None:
+            self._json.feed(chunk)
+            if self._json.complete:
+                self.reason = "json"
+                return chunk[:self._json.end - start], True
+            return chunk, False
+
+        if self._finish_from is None:
+            lowered = self.text.lower()
+            for phrase in self._end_phrases:
+                found = lowered.find(phrase)
+                if found >= 0:
+                    self.reason = "end_on"
+                    self._finish_from = found + len(phrase)
+                    break
+            else:
+                if self.profile.max_chars and len(self.text) >= self.profile.max_chars:
+                    self.reason = "max_chars"
+                    # The sentence that crossed the budget is finished, the next one isn't started
+                    self._finish_from = self.profile.max_chars
+
+        if self._finish_from is not None:
+            end = sentence_end(self.text, max(self._finish_from - 1, 0))
+            if end:
+                return chunk[:max(0, end.end() - start)], True
+        return chunk, False
@@ -0,0 +1,185 @@
+"""
+Response cache keyed on a perceptual hash of the captured frame.
+
+Pressing a hotkey again on the same dialogue box produces a near-identical
+screenshot; its difference hash lands within a few bits of the previous one,
+so the earlier LLM answer can be spoken immediately instead of paying for
+another vision round trip. Text hotkeys hash only the dialogue box, so
+animations elsewhere on screen don't count as a new frame; full-screen
+lookups (FRAME_MAX_DISTANCE) need an identical hash. Entries are evicted
+LRU and by age, and can be persisted to a JSON file so they survive a
+program restart.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Brightness step (0-255) a thumbnail pixel needs over its neighbour to set a bit; smaller steps
+# are flat areas, where sensor/render noise would otherwise flip bits at random
+DHASH_MARGIN = 4
+# Bits two dialogue-box hashes of the same text may differ by. On 1080p frames capture noise flips
+# none in the flat box and a new line of 30px text flips about 75, but a line of the small default
+# font flips only 7-11: lower it for games with small text
+MAX_DISTANCE = 12
+# The same for full-screen hashes (F9). There the dialogue box is a small part of the hash and a new
+# line of small text flips as few as 2 bits, no more than noise elsewhere on screen, so only an
+# identical hash is the same screen
+FRAME_MAX_DISTANCE = 0
+
+
+def dhash(image, hash_size=64, margin=DHASH_MARGIN):
+    """
+    Difference hash of an image as an int of hash_size * hash_size bits.
+
+    Each bit records whether a pixel is brighter than its right-hand neighbour
+    by more than margin in a (hash_size + 1) x hash_size grayscale thumbnail.
+    The default grid is much finer than the usual 8x8 so that a new line of
+    text in an otherwise unchanged dialogue box still flips enough bits to
+    count as a different frame.
+    """
+    from PIL import Image
+    thumb = image.resize((hash_size + 1, hash_size), Image.BOX).convert("L")
+    pixels = thumb.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1] + margin)
+    return value
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM responses, matched by frame hash within max_distance bits.
+
+    The prompt and model must match exactly; only the frame match is fuzzy.
+    """
+
+    def __init__(self, max_entries=256, ttl=3600, max_distance=MAX_DISTANCE, path=None, autosave=True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.path = path
+        self.autosave = autosave
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # The file is read on first use (or by load()), not when the cache is created
+        self._loaded = not path
+
+    @staticmethod
+    def _context_key(prompt, model):
+        return hashlib.sha1(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, frame_hash, prompt, model, max_distance=None):
+        """Returns the cached response for a near-identical frame, or None; max_distance overrides the cache's."""
+        if max_distance is None:
+            max_distance = self.max_distance
+        context = self._context_key(prompt, model)
+        now = time.time()
+        with self._lock:
+            self._ensure_loaded()
+            self._expire(now)
+            best_key, best_distance = None, None
+            if max_distance == 0:
+                # Exact matches need no scan
+                if (frame_hash, context) in self._entries:
+                    best_key, best_distance = (frame_hash, context), 0
+            else:
+                for key in self._entries:
+                    if key[1] != context:
+                        continue
+                    distance = hamming_distance(key[0], frame_hash)
+                    if distance <= max_distance and (best_distance is None or distance < best_distance):
+                        best_key, best_distance = key, distance
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            logging.info(f"Response cache hit (distance {best_distance})")
+            return self._entries[best_key]["response"]
+
+    def put(self, frame_hash, prompt, model, response):
+        """Stores a response for the frame and persists the cache if it has a path."""
+        key = (frame_hash, self._context_key(prompt, model))
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[key] = {"response": response, "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self.path and self.autosave:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._loaded = True
+            self._entries.clear()
+            if self.path and self.autosave:
+                self._save()
+
+    def save(self):
+        """Writes the cache to its path; only needed with autosave=False."""
+        with self._lock:
+            if self.path:
+                self._ensure_loaded()
+                self._save()
+
+    def load(self):
+        """Reads the cache file now instead of on first use."""
+        with self._lock:
+            self._ensure_loaded()
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load()
+
+    def _expire(self, now):
+        if not self.ttl:
+            return
+        expired = [key for key, entry in self._entries.items() if now - entry["created"] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+        for item in stored:
+            key = (int(item["hash"], 16), item["context"])
+            self._entries[key] = {"response": item["response"], "created": item["created"]}
+        self._expire(time.time())
+        logging.info(f"Loaded {len(self._entries)} cached responses from {self.path}")
+
+    def _save(self):
+        stored = [
+            {"hash": f"{key[0]:x}", "context": key[1], "response": entry["response"], "created": entry["created"]}
+            for key, entry in self._entries.items()
+        ]
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save response cache: {e}")
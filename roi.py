@@ -0,0 +1,261 @@
+"""
+Dialogue-region detection for cropping captures before inference.
+
+The vision model's prompt-processing time grows with the number of image
+tokens, and the text we care about is usually inside one dialogue box or
+speech bubble. detect_text_region() finds it with cheap CPU heuristics on
+a small grayscale copy of the frame, using NumPy:
+
+  1. strong horizontal/vertical edges (text strokes are high contrast),
+  2. edge density per 8x8 cell, weighted by how flat the cell's background
+     is (text sits on a plain box, game art is textured),
+  3. connected components of text-like cells; the one with the highest
+     total score, weighted by how densely it fills its bounding box, becomes
+     the crop box, with a margin.
+
+RegionMemory remembers the detected box per game (keyed on the window
+title) as fractions of the frame. A detection that mostly overlaps the
+remembered box keeps the remembered one, so crops (and the perceptual hash
+of the box) don't jitter with the background from press to press. A box
+can be pinned, in which case detection is skipped for that game.
+
+NumPy and Pillow are imported on first detection, keeping them off the
+startup path.
+"""
+import json
+import logging
+import os
+import threading
+
+import tracing
+
+WORK_WIDTH = 640
+CELL = 8
+# A detected box overlapping the remembered one by at least this IoU is the same box
+SAME_BOX_IOU = 0.7
+
+
+def _cell_view(array, cell):
+    rows, cols = array.shape[0] // cell, array.shape[1] // cell
+    trimmed = array[:rows * cell, :cols * cell]
+    return trimmed.reshape(rows, cell, cols, cell).swapaxes(1, 2).reshape(rows, cols, cell * cell)
+
+def box_iou(a, b):
+    """Intersection over union of two (left, top, right, bottom) boxes."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    return intersection / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection)
+
+def text_cell_scores(gray, edge_threshold=48, flat_tolerance=16):
+    """Per-cell text likelihood (0-1) for a 2-D uint8 grayscale array."""
+    import numpy as np
+    pixels = gray.astype(np.int16)
+    edges = np.zeros(pixels.shape, dtype=bool)
+    edges[:, 1:] |= np.abs(np.diff(pixels, axis=1)) > edge_threshold
+    edges[1:, :] |= np.abs(np.diff(pixels, axis=0)) > edge_threshold
+    density = _cell_view(edges, CELL).mean(axis=2)
+
+    # Text on a dialogue box: most of the cell is close to one background shade
+    cells = _cell_view(pixels, CELL)
+    background = np.median(cells, axis=2)[..., None]
+    flatness = (np.abs(cells - background) <= flat_tolerance).mean(axis=2)
+
+    # Strokes cover a moderate share of a cell; solid edges and noise fall outside it
+    text_like = (density >= 0.06) & (density <= 0.6)
+    return np.where(text_like, density * flatness, 0.0)
+
+def connected_components(mask):
+    """Labels 4-connected True cells; returns a list of (row, col) index arrays."""
+    import numpy as np
+    labels = np.zeros(mask.shape, dtype=np.int32)
+    components = []
+    rows, cols = mask.shape
+    for start in zip(*np.nonzero(mask)):
+        if labels[start]:
+            continue
+        label = len(components) + 1
+        labels[start] = label
+        stack, members = [start], []
+        while stack:
+            r, c = stack.pop()
+            members.append((r, c))
+            for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                if 0 <= nr < rows and 0 <= nc < cols and mask[nr, nc] and not labels[nr, nc]:
+                    labels[nr, nc] = label
+                    stack.append((nr, nc))
+        components.append(np.array(members))
+    return components
+
+def detect_text_region(image, min_score=0.1, min_cells=8, margin_cells=1, max_fraction=0.85):
+    """
+    Returns the (left, top, right, bottom) box around the most text-like area, or None.
+
+    None means no convincing text region was found, or it covers most of the
+    frame anyway; send the whole frame then.
+    """
+    import numpy as np
+    from PIL import Image
+    scale = WORK_WIDTH / image.width
+    small = image.convert("L").resize((WORK_WIDTH, max(CELL, round(image.height * scale))), Image.BOX)
+    scores = text_cell_scores(np.asarray(small))
+
+    # Bridge the gaps between words and lines before grouping cells
+    mask = scores >= min_score
+    bridged = mask.copy()
+    bridged[:, 1:] |= mask[:, :-1]
+    bridged[:, :-1] |= mask[:, 1:]
+    bridged[1:, :] |= mask[:-1, :]
+
+    best, best_score = None, 0.0
+    for members in connected_components(bridged):
+        if len(members) < min_cells:
+            continue
+        # Dense blocks (text lines, a box outline) beat scattered texture of the same total score
+        height, width = np.ptp(members, axis=0) + 1
+        score = scores[members[:, 0], members[:, 1]].sum() * np.sqrt(len(members) / (height * width))
+        if score > best_score:
+            best, best_score = members, score
+    if best is None:
+        return None
+
+    top, left = best.min(axis=0) - margin_cells
+    bottom, right = best.max(axis=0) + 1 + margin_cells
+    cell_size = CELL / scale
+    box = (
+        max(0, int(left * cell_size)),
+        max(0, int(top * cell_size)),
+        min(image.width, int(right * cell_size)),
+        min(image.height, int(bottom * cell_size)),
+    )
+    if (box[2] - box[0]) * (box[3] - box[1]) > max_fraction * image.width * image.height:
+        return None
+    return box
+
+
+class RegionMemory:
+    """
+    Per-game dialogue regions, stored as fractions of the frame size.
+
+    region_for() returns a pinned box as is. Otherwise it detects the region
+    on the current frame and remembers it, falling back to the last
+    remembered box when detection finds nothing.
+    """
+
+    def __init__(self, path=None, detect=detect_text_region, same_box_iou=SAME_BOX_IOU):
+        self.path = path
+        self.detect = detect
+        self.same_box_iou = same_box_iou
+        self._regions = {}
+        self._last = {}
+        self._lock = threading.Lock()
+        # The file is read on first use (or by load()), not when the memory is created
+        self._loaded = not path
+
+    def load(self):
+        """Reads the stored regions now instead of on first use."""
+        with self._lock:
+            self._ensure_loaded()
+
+    def region_for(self, image, game="default"):
+        with tracing.span("roi"):
+            with self._lock:
+                self._ensure_loaded()
+                stored = self._regions.get(game)
+            if stored and stored.get("pinned"):
+                box = self._to_pixels(stored["box"], image.size)
+            else:
+                box = self.detect(image)
+                remembered = self._to_pixels(stored["box"], image.size) if stored else None
+                if box and remembered and box_iou(box, remembered) >= self.same_box_iou:
+                    box = remembered
+                elif box:
+                    self._remember(game, self._to_fractions(box, image.size), pinned=False)
+                elif stored:
+                    box = remembered
+        if box:
+            with self._lock:
+                self._last[game] = self._to_fractions(box, image.size)
+            tracing.set_value("roi_fraction", round((box[2] - box[0]) * (box[3] - box[1]) / (image.width * image.height), 3))
+        return box
+
+    def stored_region(self, size, game="default"):
+        """The pinned or last remembered box for this game in pixels of a size-d frame, without detecting."""
+        with self._lock:
+            self._ensure_loaded()
+            stored = self._regions.get(game)
+        return self._to_pixels(stored["box"], size) if stored else None
+
+    def pin(self, game="default", box=None, size=None):
+        """Pins box (pixels of a size-d frame), or the last region used for this game."""
+        fractions = self._to_fractions(box, size) if box else self._last.get(game)
+        if not fractions:
+            logging.info(f"No dialogue region to pin for {game!r} yet")
+            return False
+        self._remember(game, fractions, pinned=True)
+        logging.info(f"Pinned dialogue region for {game!r}: {fractions}")
+        return True
+
+    def unpin(self, game="default"):
+        with self._lock:
+            self._ensure_loaded()
+            stored = self._regions.get(game)
+            if not stored or not stored.get("pinned"):
+                return False
+            stored["pinned"] = False
+            if self.path:
+                self._save()
+        logging.info(f"Unpinned dialogue region for {game!r}")
+        return True
+
+    def is_pinned(self, game="default"):
+        with self._lock:
+            self._ensure_loaded()
+            return bool(self._regions.get(game, {}).get("pinned"))
+
+    def _remember(self, game, fractions, pinned):
+        with self._lock:
+            self._ensure_loaded()
+            stored = self._regions.get(game)
+            if stored and stored.get("pinned") and not pinned:
+                return
+            changed = not stored or stored["box"] != fractions or stored.get("pinned") != pinned
+            self._regions[game] = {"box": fractions, "pinned": pinned}
+            if changed and self.path:
+                self._save()
+
+    @staticmethod
+    def _to_fractions(box, size):
+        width, height = size
+        return [round(box[0] / width, 4), round(box[1] / height, 4), round(box[2] / width, 4), round(box[3] / height, 4)]
+
+    @staticmethod
+    def _to_pixels(fractions, size):
+        width, height = size
+        return (round(fractions[0] * width), round(fractions[1] * height),
+                round(fractions[2] * width), round(fractions[3] * height))
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._loaded = True
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._regions = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable dialogue regions {self.path}: {e}")
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._regions, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Could not save dialogue regions: {e}")
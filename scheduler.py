@@ -0,0 +1,186 @@
+"""
+Preemptive job scheduler for hotkey pipelines.
+
+The newest hotkey press wins: submitting a job cancels whatever is running
+(its cancel callbacks close the LLM stream and stop speech) and replaces any
+job still waiting to start. Jobs run one at a time on a single worker thread.
+
+Coalescing rules:
+  * The same hotkey pressed again within repeat_window seconds of the running
+    or pending job for that hotkey is dropped, so key bounce or an impatient
+    double-press doesn't throw away an answer that is already on its way.
+  * Any other press (a different hotkey, or the same one after the window)
+    cancels the running job and replaces the pending one.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current_job():
+    """The Job running on the calling thread, or None outside the scheduler."""
+    return getattr(_local, "job", None)
+
+
+@contextmanager
+def job_context(job):
+    """Makes job the current job on this thread, for work that runs outside the scheduler."""
+    previous = current_job()
+    _local.job = job
+    try:
+        yield job
+    finally:
+        _local.job = previous
+
+
+class Job:
+    """One scheduled pipeline run plus its cancellation state and timings."""
+
+    def __init__(self, name, func=None):
+        self.name = name
+        self.func = func
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancelled = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def queue_wait(self):
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    def on_cancel(self, callback):
+        """Registers a callback run (once) when the job is cancelled; runs immediately if it already was."""
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback)
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self._cancelled.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def release(self):
+        """Drops the cancel callbacks of a finished job, and with them the responses (and request bodies) they hold."""
+        with self._lock:
+            self._callbacks = []
+
+    def _run_callback(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            logging.debug(f"Cancel callback for {self.name} failed: {e}")
+
+
+class JobScheduler:
+    """Runs submitted jobs one at a time, newest press first."""
+
+    def __init__(self, repeat_window=1.0, on_finish=None, history=200):
+        self.repeat_window = repeat_window
+        self.on_finish = on_finish
+        self._cond = threading.Condition()
+        self._current = None
+        self._pending = None
+        self._waits = deque(maxlen=history)
+        self.counts = {"submitted": 0, "coalesced": 0, "preempted": 0, "superseded": 0, "completed": 0}
+        # The worker thread starts with the first job
+        self._thread = None
+
+    def submit(self, name, func):
+        """Schedules func under the given hotkey name. Returns the Job, or None if it was coalesced."""
+        now = time.time()
+        with self._cond:
+            self.counts["submitted"] += 1
+            for active in (self._current, self._pending):
+                if active and not active.cancelled and active.name == name \
+                        and now - active.submitted_at < self.repeat_window:
+                    self.counts["coalesced"] += 1
+                    logging.info(f"Ignoring repeated {name} press")
+                    return None
+
+            job = Job(name, func)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="JobScheduler", daemon=True)
+                self._thread.start()
+            if self._pending:
+                self.counts["superseded"] += 1
+                self._pending.cancel()
+            self._pending = job
+            running = self._current
+            self._cond.notify()
+
+        if running and not running.cancelled:
+            self.counts["preempted"] += 1
+            logging.info(f"{name} pressed; cancelling running {running.name}")
+            running.cancel()
+        return job
+
+    def cancel_all(self):
+        """Cancels the running and pending jobs."""
+        with self._cond:
+            jobs = [job for job in (self._current, self._pending) if job]
+            self._pending = None
+        for job in jobs:
+            job.cancel()
+
+    def is_busy(self):
+        with self._cond:
+            return self._current is not None or self._pending is not None
+
+    def stats(self):
+        """Queue-wait percentiles (seconds) and job counters."""
+        waits = sorted(self._waits)
+        summary = dict(self.counts)
+        if waits:
+            summary["wait_p50"] = waits[len(waits) // 2]
+            summary["wait_p95"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+            summary["wait_max"] = waits[-1]
+        return summary
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                job, self._pending = self._pending, None
+                self._current = job
+
+            job.started_at = time.time()
+            self._waits.append(job.queue_wait)
+            logging.info(f"Job {job.name} started after {job.queue_wait * 1000:.0f}ms in queue")
+
+            _local.job = job
+            try:
+                job.func()
+            except Exception as e:
+                logging.error(f"Job {job.name} failed: {e}")
+            finally:
+                _local.job = None
+                job.finished_at = time.time()
+                with self._cond:
+                    self._current = None
+                    if not job.cancelled:
+                        self.counts["completed"] += 1
+                if self.on_finish:
+                    try:
+                        self.on_finish(job)
+                    except Exception as e:
+                        logging.debug(f"on_finish for {job.name} failed: {e}")
+                job.release()
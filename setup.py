@@ -11,9 +11,16 @@ setup(
         'pyttsx3==2.90',
         'requests==2.31.0',
         'Pillow==10.2.0',
+        'numpy',
         'comtypes',
-        'pyautogui'
+        'pyautogui',
+        'obsws-python',
+        'websocket-client'
     ],
+    extras_require={
+        'capture': ['mss'],
+        'ocr': ['pytesseract']
+    },
     entry_points={
         'console_scripts': [
             'game_helper_buddy = game_helper_buddy:main'
@@ -0,0 +1,627 @@
+"""
+Long-lived text-to-speech service.
+
+A single worker thread owns an initialized TTS engine (voice already resolved)
+and plays queued utterances in priority order, so each sentence is spoken
+without paying for engine construction. Engines are pluggable: pyttsx3 on
+Windows, espeak on Linux, or a fake engine that only records what was said.
+
+With an AudioCache, fixed phrases (the ready cue, error lines) and phrases
+that keep coming back are rendered to WAV once and then played straight
+from memory instead of being synthesized again.
+
+iter_sentences() regroups streamed text into the sentences that are spoken
+one utterance at a time.
+"""
+import io
+import itertools
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import OrderedDict
+
+from audio_cache import clip_key
+
+# Lower numbers are spoken first; equal priorities keep their queue order
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# Voice name substrings to prefer, in order (commonly Zira on Windows)
+PREFERRED_VOICES = ("zira", "female")
+
+# A sentence ends at . ! ? (optionally closed by a quote/bracket) followed by whitespace, or at a newline;
+# the period of an abbreviation or initial ("Mr. Smith", "J. R. R. Tolkien") doesn't count
+SENTENCE_END_RE = re.compile(r'[.!?\u2026]+["\')\]]*\s+|\n+')
+CLAUSE_END_RE = re.compile(r'[,;:]\s+')
+# Long sentences are also cut at a clause break once this many characters are buffered
+MIN_CLAUSE_CHARS = 60
+# Words whose period doesn't end a sentence
+ABBREVIATIONS = frozenset({"mr", "mrs", "ms", "dr", "prof", "st", "mt", "jr", "sr", "lt", "sgt", "capt", "vs",
+                           "e.g", "i.e"})
+WORD_BEFORE_RE = re.compile(r"[\w.]+$")
+# A capital letter is only an initial next to another one: on its own it is more often a
+# button or a grade ("Press A. Then jump!") than a name. Until the next word has streamed in
+# it may still be one
+NEXT_INITIAL_RE = re.compile(r"\s*(?:[A-Z](?:\.|$)|$)")
+PREVIOUS_INITIAL_RE = re.compile(r"(?<![\w.])[A-Z]\.\s*[A-Z]$")
+
+
+def is_abbreviation(text, index):
+    """True if the period at text[index] ends an abbreviation or an initial rather than a sentence."""
+    if text[index] != ".":
+        return False
+    word = WORD_BEFORE_RE.search(text, 0, index)
+    if not word:
+        return False
+    word = word.group()
+    if word.lower() in ABBREVIATIONS:
+        return True
+    if len(word) == 1 and word.isupper():
+        return bool(NEXT_INITIAL_RE.match(text, index + 1) or PREVIOUS_INITIAL_RE.search(text, 0, index))
+    return False
+
+def sentence_end(text, pos=0):
+    """The first SENTENCE_END_RE match at or after pos that isn't the period of an abbreviation, or None."""
+    for match in SENTENCE_END_RE.finditer(text, pos):
+        if not is_abbreviation(text, match.start()):
+            return match
+    return None
+
+def iter_sentences(chunks, min_clause_chars=MIN_CLAUSE_CHARS):
+    """
+    Regroups streamed text chunks into sentences (or long clauses) that can be spoken on their own.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            match = sentence_end(buffer)
+            if not match and len(buffer) > min_clause_chars:
+                match = CLAUSE_END_RE.search(buffer, min_clause_chars)
+            if not match:
+                break
+            sentence = buffer[:match.end()].strip()
+            buffer = buffer[match.end():]
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class Utterance:
+    """A queued piece of text plus the bookkeeping needed to wait on or cancel it."""
+
+    def __init__(self, text, priority=PRIORITY_NORMAL, rate=None, cache=False, render_only=False):
+        self.text = text
+        self.priority = priority
+        self.rate = rate
+        self.cache = cache
+        self.render_only = render_only
+        self.from_cache = False
+        self.cancelled = False
+        self.done = threading.Event()
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def wait(self, timeout=None):
+        """Blocks until the utterance has been played, skipped or cancelled."""
+        return self.done.wait(timeout)
+
+    def on_done(self, callback):
+        """Calls callback(utterance) once it has finished; immediately if it already has."""
+        with self._lock:
+            if not self.done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def finish(self):
+        with self._lock:
+            if self.finished_at is None:
+                self.finished_at = time.time()
+            self.done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                logging.debug(f"Utterance callback failed: {e}")
+
+
+# ----------------------------------------------------------------
+# 1) Engine backends
+# ----------------------------------------------------------------
+class WavPlayer:
+    """Plays WAV bytes from memory: winsound on Windows, paplay or aplay elsewhere."""
+
+    def __init__(self):
+        self._command = None
+        self._process = None
+        self._lock = threading.Lock()
+        if sys.platform != "win32":
+            for name, args in (("paplay", []), ("aplay", ["-q", "-"])):
+                executable = shutil.which(name)
+                if executable:
+                    self._command = [executable] + args
+                    break
+
+    @property
+    def available(self):
+        return sys.platform == "win32" or self._command is not None
+
+    def play(self, data):
+        """Plays the clip and blocks until it has finished; False if there is no way to play it."""
+        if sys.platform == "win32":
+            import winsound
+            winsound.PlaySound(data, winsound.SND_MEMORY | winsound.SND_NODEFAULT)
+            return True
+        if not self._command:
+            return False
+        with self._lock:
+            self._process = subprocess.Popen(
+                self._command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            process = self._process
+        try:
+            process.communicate(data)
+        except OSError:
+            # The player was stopped mid-clip
+            pass
+        return True
+
+    def stop(self):
+        if sys.platform == "win32":
+            import winsound
+            winsound.PlaySound(None, 0)
+            return
+        with self._lock:
+            if self._process and self._process.poll() is None:
+                self._process.terminate()
+
+
+class SpeechEngine:
+    """
+    Interface for TTS backends.
+
+    open(), say(), render(), play() and close() are only called from the speech
+    worker thread; stop() may be called from any thread to interrupt the
+    current utterance.
+    """
+
+    player = None
+
+    @property
+    def voice_id(self):
+        """Identifies the voice in audio cache keys, so a voice change doesn't replay old clips."""
+        return type(self).__name__
+
+    def open(self):
+        pass
+
+    def say(self, text, rate=None):
+        raise NotImplementedError
+
+    def render(self, text, rate=None):
+        """Synthesizes text to WAV bytes; None if this engine can't render to a buffer."""
+        return None
+
+    @property
+    def can_play(self):
+        """True if rendered clips can be played on this machine."""
+        if self.player is None:
+            self.player = WavPlayer()
+        return self.player.available
+
+    def play(self, data):
+        """Plays a rendered clip and blocks until it has finished; False if it can't be played."""
+        return self.can_play and self.player.play(data)
+
+    def stop(self):
+        self.stop_playback()
+
+    def stop_playback(self):
+        if self.player is not None:
+            self.player.stop()
+
+    def close(self):
+        pass
+
+
+def _render_to_file(render):
+    """Calls render(path) with a temporary .wav path and returns the file's bytes (None if empty)."""
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        render(path)
+        with open(path, "rb") as f:
+            return f.read() or None
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class Pyttsx3Engine(SpeechEngine):
+    """pyttsx3 backend with thread-local COM initialization on Windows."""
+
+    def __init__(self, rate=200, volume=1.0, preferred_voices=PREFERRED_VOICES):
+        self.rate = rate
+        self.volume = volume
+        self.preferred_voices = preferred_voices
+        self._engine = None
+        self._comtypes = None
+        self._current_rate = None
+        self._voice_id = None
+        self._stop_requested = threading.Event()
+
+    @property
+    def voice_id(self):
+        return f"pyttsx3:{self._voice_id}:{self.volume}"
+
+    def open(self):
+        import pyttsx3
+        try:
+            import comtypes
+            comtypes.CoInitialize()
+            self._comtypes = comtypes
+        except ImportError:
+            self._comtypes = None
+
+        self._engine = pyttsx3.init()
+        self._engine.setProperty('volume', self.volume)
+        self._set_rate(self.rate)
+
+        voice = self._find_voice()
+        if voice:
+            self._engine.setProperty('voice', voice.id)
+            self._voice_id = voice.id
+            logging.info(f"TTS voice: {voice.name}")
+
+        # pyttsx3 only honours stop() from inside its own callbacks
+        self._engine.connect('started-word', self._on_word)
+
+    def _find_voice(self):
+        voices = self._engine.getProperty('voices')
+        for wanted in self.preferred_voices:
+            for v in voices:
+                if wanted in v.name.lower():
+                    return v
+        return None
+
+    def _set_rate(self, rate):
+        if rate != self._current_rate:
+            self._engine.setProperty('rate', rate)
+            self._current_rate = rate
+
+    def _on_word(self, name, location, length):
+        if self._stop_requested.is_set():
+            self._engine.stop()
+
+    def say(self, text, rate=None):
+        self._stop_requested.clear()
+        self._set_rate(rate or self.rate)
+        self._engine.say(text)
+        self._engine.runAndWait()
+
+    def render(self, text, rate=None):
+        self._set_rate(rate or self.rate)
+
+        def save(path):
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+
+        return _render_to_file(save)
+
+    def stop(self):
+        self._stop_requested.set()
+        self.stop_playback()
+
+    def close(self):
+        self._engine = None
+        if self._comtypes:
+            try:
+                self._comtypes.CoUninitialize()
+            except Exception:
+                pass
+
+
+class EspeakEngine(SpeechEngine):
+    """espeak / espeak-ng backend driven through a subprocess per utterance."""
+
+    def __init__(self, rate=200, voice="en+f3", executable=None):
+        self.rate = rate
+        self.voice = voice
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+        self._process = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        if not self.executable:
+            raise RuntimeError("espeak is not installed")
+
+    def say(self, text, rate=None):
+        with self._lock:
+            self._process = subprocess.Popen(
+                [self.executable, "-s", str(rate or self.rate), "-v", self.voice],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            process = self._process
+        process.communicate(text.encode("utf-8"))
+
+    @property
+    def voice_id(self):
+        return f"espeak:{self.voice}"
+
+    def render(self, text, rate=None):
+        def save(path):
+            subprocess.run(
+                [self.executable, "-s", str(rate or self.rate), "-v", self.voice, "-w", path],
+                input=text.encode("utf-8"), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+            )
+
+        return _render_to_file(save)
+
+    def stop(self):
+        with self._lock:
+            if self._process and self._process.poll() is None:
+                self._process.terminate()
+        self.stop_playback()
+
+
+class FakeEngine(SpeechEngine):
+    """
+    Records utterances instead of speaking them; seconds_per_char simulates playback time
+    and latency the synthesis delay before audio starts (which rendered clips don't pay).
+    """
+
+    SAMPLE_RATE = 8000
+    can_play = True
+
+    def __init__(self, seconds_per_char=0.0, latency=0.0):
+        self.seconds_per_char = seconds_per_char
+        self.latency = latency
+        self.spoken = []
+        self._rendered = {}
+        self._stop_requested = threading.Event()
+
+    def say(self, text, rate=None):
+        self._stop_requested.clear()
+        self.spoken.append(text)
+        self._stop_requested.wait(self.latency + len(text) * self.seconds_per_char)
+
+    def render(self, text, rate=None):
+        """A silent clip as long as saying the text would take."""
+        time.sleep(self.latency)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as clip:
+            clip.setnchannels(1)
+            clip.setsampwidth(2)
+            clip.setframerate(self.SAMPLE_RATE)
+            clip.writeframes(b"\0\0" * int(len(text) * self.seconds_per_char * self.SAMPLE_RATE))
+        data = buffer.getvalue()
+        self._rendered[data] = text
+        return data
+
+    def play(self, data):
+        self._stop_requested.clear()
+        self.spoken.append(self._rendered.get(data, "<clip>"))
+        with wave.open(io.BytesIO(data), "rb") as clip:
+            duration = clip.getnframes() / clip.getframerate()
+        self._stop_requested.wait(duration)
+        return True
+
+    def stop(self):
+        self._stop_requested.set()
+
+
+ENGINES = {
+    "pyttsx3": Pyttsx3Engine,
+    "espeak": EspeakEngine,
+    "fake": FakeEngine,
+}
+
+def create_engine(backend="pyttsx3", **kwargs):
+    """Builds a speech engine by backend name ("pyttsx3", "espeak" or "fake")."""
+    try:
+        engine_class = ENGINES[backend]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {backend!r}")
+    return engine_class(**kwargs)
+
+
+# ----------------------------------------------------------------
+# 2) Speech service
+# ----------------------------------------------------------------
+class SpeechService:
+    """
+    Plays utterances one at a time on a dedicated thread that owns the engine.
+
+    The engine is built by engine_factory inside the worker thread, because
+    COM-based engines must be used from the thread that created them.
+
+    With an audio_cache, utterances whose clip is cached play from memory.
+    Clips are rendered for utterances queued with cache=True, by prerender(),
+    and for any text spoken cache_repeats_after times.
+    """
+
+    def __init__(self, engine_factory, audio_cache=None, cache_repeats_after=3):
+        self._engine_factory = engine_factory
+        self._audio_cache = audio_cache
+        self._cache_repeats_after = cache_repeats_after
+        self._repeats = OrderedDict()
+        self._engine = None
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._current = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="SpeechService", daemon=True)
+
+    def start(self):
+        """Starts the worker and waits until the engine is initialized."""
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def say(self, text, priority=PRIORITY_NORMAL, rate=None, cache=False):
+        """
+        Queues text to be spoken and returns its Utterance without waiting.
+        With cache=True the text is rendered into the audio cache (once) and played from there.
+        """
+        utterance = Utterance(text, priority=priority, rate=rate, cache=cache)
+        self._queue.put((priority, next(self._counter), utterance))
+        return utterance
+
+    def prerender(self, texts, rate=None):
+        """Renders clips for fixed phrases in the background, ahead of their first use."""
+        if self._audio_cache is None:
+            return []
+        utterances = [Utterance(text, priority=PRIORITY_LOW, rate=rate, cache=True, render_only=True) for text in texts]
+        for utterance in utterances:
+            self._queue.put((PRIORITY_LOW, next(self._counter), utterance))
+        return utterances
+
+    def flush(self):
+        """Drops every queued utterance that has not started playing yet."""
+        kept = []
+        dropped = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            utterance = item[2]
+            if utterance is None or utterance.render_only:
+                kept.append(item)
+                continue
+            utterance.cancelled = True
+            utterance.finish()
+            dropped += 1
+        for item in kept:
+            self._queue.put(item)
+        if dropped:
+            logging.debug(f"Flushed {dropped} queued utterance(s)")
+        return dropped
+
+    def cancel(self):
+        """Drops queued utterances and interrupts the one currently being spoken."""
+        self.flush()
+        with self._lock:
+            current = self._current
+            if current:
+                current.cancelled = True
+        if current and self._engine:
+            self._engine.stop()
+
+    def is_speaking(self):
+        with self._lock:
+            return self._current is not None
+
+    def shutdown(self, timeout=5):
+        """Cancels pending speech and stops the worker thread."""
+        self.cancel()
+        self._queue.put((-1, next(self._counter), None))
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _open_engine(self):
+        try:
+            engine = self._engine_factory()
+            engine.open()
+            return engine
+        except Exception as e:
+            logging.error(f"Speech engine failed to start: {e}")
+            return None
+
+    def _run(self):
+        self._engine = self._open_engine()
+        self._ready.set()
+
+        while True:
+            _, _, utterance = self._queue.get()
+            if utterance is None:
+                break
+            if utterance.cancelled:
+                utterance.finish()
+                continue
+
+            # Retry a failed engine on the next utterance rather than going mute for good
+            if self._engine is None:
+                self._engine = self._open_engine()
+
+            if utterance.render_only:
+                try:
+                    if self._engine:
+                        self._clip_for(utterance)
+                except Exception as e:
+                    logging.warning(f"Pre-rendering {utterance.text!r} failed: {e}")
+                utterance.finish()
+                continue
+
+            with self._lock:
+                self._current = utterance
+            utterance.started_at = time.time()
+            try:
+                if self._engine and not utterance.cancelled:
+                    self._speak(utterance)
+            except Exception as e:
+                logging.error(f"Error during speech synthesis: {e}")
+            finally:
+                with self._lock:
+                    self._current = None
+                utterance.finish()
+
+        if self._engine:
+            self._engine.close()
+
+    def _speak(self, utterance):
+        clip = self._clip_for(utterance)
+        if clip is not None and not utterance.cancelled:
+            logging.info(f"Speaking response (cached audio): {utterance.text}")
+            utterance.from_cache = True
+            if self._engine.play(clip):
+                return
+            utterance.from_cache = False
+        if not utterance.cancelled:
+            logging.info(f"Speaking response: {utterance.text}")
+            self._engine.say(utterance.text, rate=utterance.rate)
+
+    def _clip_for(self, utterance):
+        """Cached clip for the utterance, rendering it first if it should be cached; None to speak it live."""
+        if self._audio_cache is None or not self._engine.can_play:
+            return None
+        key = clip_key(utterance.text, utterance.rate, self._engine.voice_id)
+        clip = self._audio_cache.get(key)
+        if clip is not None or not (utterance.cache or self._repeated(utterance.text)):
+            return clip
+        start = time.perf_counter()
+        clip = self._engine.render(utterance.text, rate=utterance.rate)
+        if clip:
+            self._audio_cache.put(key, clip)
+            logging.debug(f"Rendered {utterance.text!r} in {(time.perf_counter() - start) * 1000:.0f}ms")
+        return clip
+
+    def _repeated(self, text, max_tracked=512):
+        """Counts the text; True once it has come up often enough to be worth caching."""
+        if not self._cache_repeats_after:
+            return False
+        count = self._repeats.pop(text, 0) + 1
+        self._repeats[text] = count
+        while len(self._repeats) > max_tracked:
+            self._repeats.popitem(last=False)
+        return count >= self._cache_repeats_after
@@ -0,0 +1,119 @@
+"""
+Structured (JSON) replies for the combined extract + rephrase + explain mode.
+
+DIALOGUE_SCHEMA is passed as Ollama's `format` option so one vision request
+returns every field. iter_json_fields() parses the reply while it streams and
+yields each top-level field as soon as its value is complete, so the first
+field can be spoken while the model is still writing the later ones.
+"""
+import json
+
+DIALOGUE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "original_text": {"type": "string"},
+        "rephrased": {"type": "string"},
+        "hard_words": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "word": {"type": "string"},
+                    "meaning": {"type": "string"},
+                },
+                "required": ["word", "meaning"],
+            },
+        },
+    },
+    # Field order matters: the model writes them in this order, so the original text streams first
+    "required": ["original_text", "rephrased", "hard_words"],
+}
+
+
+class JsonFieldScanner:
+    """
+    Incremental scanner for a streamed JSON object.
+
+    feed() takes the next chunk of text and returns the (key, value) pairs of
+    top-level fields that completed within it. Nested values are returned once
+    their closing bracket arrives. complete turns True when the object's
+    closing brace arrives, with end the index just past it.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._state = "key"
+        self._key = None
+        self._value_start = None
+        self.complete = False
+        self.end = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        fields = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._state == "key":
+                        self._key = json.loads(buf[self._string_start:i + 1])
+                        self._state = "colon"
+                    elif self._depth == 1 and self._state == "value" and self._value_start == self._string_start:
+                        self._emit(fields, buf[self._value_start:i + 1])
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._state == "value" and self._value_start is None:
+                    self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and self._state == "value" and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1 and self._state == "value" and self._value_start is not None:
+                    # A bare scalar (number/true/false/null) ends at the closing brace
+                    self._emit(fields, buf[self._value_start:i])
+                self._depth -= 1
+                if self._depth == 1 and self._state == "value" and self._value_start is not None:
+                    self._emit(fields, buf[self._value_start:i + 1])
+                elif self._depth == 0 and not self.complete:
+                    self.complete = True
+                    self.end = i + 1
+            elif self._depth == 1:
+                if c == ":" and self._state == "colon":
+                    self._state = "value"
+                    self._value_start = None
+                elif c == "," and self._state == "value" and self._value_start is not None:
+                    self._emit(fields, buf[self._value_start:i])
+                elif self._state == "value" and self._value_start is None and not c.isspace():
+                    self._value_start = i
+        self._pos = len(buf)
+        return fields
+
+    def _emit(self, fields, raw):
+        try:
+            fields.append((self._key, json.loads(raw)))
+        except json.JSONDecodeError:
+            pass
+        self._state = "key"
+        self._value_start = None
+
+
+def iter_json_fields(chunks):
+    """Yields (key, value) for each top-level field of a streamed JSON object as soon as it completes."""
+    scanner = JsonFieldScanner()
+    for chunk in chunks:
+        yield from scanner.feed(chunk)
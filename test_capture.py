@@ -0,0 +1,31 @@
+"""
+Frames as PIL stand-ins: run with `python -m pytest test_capture.py`.
+"""
+import numpy as np
+from PIL import Image
+
+from capture import Frame
+
+
+def bgra_frame(image):
+    """A Frame holding image as an mss grab would: a raw BGRA buffer."""
+    return Frame(bytearray(image.convert("RGBA").tobytes("raw", "BGRA")), image.size, "BGRA")
+
+def sample_image():
+    image = Image.linear_gradient("L").resize((64, 48))
+    return Image.merge("RGB", (image, image.rotate(90), Image.new("L", image.size, 90)))
+
+def test_asarray_is_rgb_before_and_after_image_is_used():
+    image = sample_image()
+    frame = bgra_frame(image)
+    before = np.asarray(frame).copy()
+    frame.image
+    after = np.asarray(frame)
+    assert before.shape == after.shape == (48, 64, 3)
+    assert np.array_equal(before, after)
+    assert np.array_equal(before, np.asarray(image))
+
+def test_crop_matches_the_converted_image():
+    image = sample_image()
+    box = (5, 7, 40, 30)
+    assert bgra_frame(image).crop(box).tobytes() == image.crop(box).tobytes()
@@ -0,0 +1,63 @@
+"""
+Cancelling streamed requests: run with `python -m pytest test_ollama_client.py`.
+"""
+import threading
+import time
+
+from fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from ollama_client import OllamaClient
+from ollama_router import OllamaRouter
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def read_in_thread(stream):
+    """Starts reading stream's text on another thread; returns the thread and the list it fills."""
+    chunks = []
+    thread = threading.Thread(target=lambda: chunks.extend(stream.text()), daemon=True)
+    thread.start()
+    return thread, chunks
+
+def test_close_before_first_token_aborts_the_request():
+    with FakeOllamaServer(FakeOllamaConfig(ttft=5.0)) as server:
+        stream = OllamaClient(server.url).chat("model", MESSAGES, stream=True)
+        thread, chunks = read_in_thread(stream)
+        time.sleep(0.3)
+        start = time.perf_counter()
+        stream.close()
+        thread.join(2)
+        assert not thread.is_alive()
+        assert time.perf_counter() - start < 1
+        assert chunks == []
+
+def test_close_before_sending_skips_the_request():
+    with FakeOllamaServer(FakeOllamaConfig(ttft=0.0)) as server:
+        stream = OllamaClient(server.url).chat("model", MESSAGES, stream=True)
+        stream.close()
+        assert list(stream.text()) == []
+        assert server.requests == []
+
+def test_client_is_reusable_after_an_aborted_request():
+    with FakeOllamaServer(FakeOllamaConfig(ttft=5.0, tokens_per_sec=1000)) as server:
+        client = OllamaClient(server.url)
+        stream = client.chat("model", MESSAGES, stream=True)
+        thread, _ = read_in_thread(stream)
+        time.sleep(0.3)
+        stream.close()
+        thread.join(2)
+        server.config.ttft = 0.0
+        assert "".join(client.chat("model", MESSAGES, stream=True).text())
+
+def test_router_close_before_first_token_aborts_the_request():
+    with FakeOllamaServer(FakeOllamaConfig(ttft=5.0)) as server:
+        router = OllamaRouter([server.url], hedge_after=0)
+        stream = router.chat("model", MESSAGES, stream=True)
+        thread, chunks = read_in_thread(stream)
+        time.sleep(0.3)
+        stream.close()
+        thread.join(2)
+        assert not thread.is_alive()
+        assert chunks == []
+        # The attempt's own request is aborted too, not just left to finish in the background
+        time.sleep(0.3)
+        assert router.backends[0].inflight == 0
@@ -0,0 +1,43 @@
+"""
+Response cache matching: run with `python -m pytest test_response_cache.py`.
+"""
+from PIL import ImageDraw
+
+import game_helper_buddy as app
+from bench_capture import synthetic_screenshot
+from response_cache import ResponseCache, dhash
+
+
+def with_dialogue_line(screenshot, text, line):
+    """A copy of a synthetic_screenshot() with one more line of text in its dialogue box."""
+    frame = screenshot.copy()
+    width, height = frame.size
+    ImageDraw.Draw(frame).text((width // 10 + 30, height * 2 // 3 + 30 + line * 30), text, fill=(0, 0, 0))
+    return frame
+
+def answer_f9(monkeypatch, screenshot):
+    """Runs the F9 lookup on screenshot; returns the spoken answer and whether the model was asked."""
+    asked = []
+    monkeypatch.setattr(app, "speak_streaming", lambda texts, keep=None: "".join(texts))
+    monkeypatch.setattr(app, "ask_and_speak", lambda image, prompt, model, keep=None: asked.append(prompt) or "new")
+    return app.answer_screenshot(screenshot), bool(asked)
+
+def test_f9_misses_on_a_new_dialogue_line(monkeypatch):
+    monkeypatch.setattr(app, "RESPONSE_CACHE", ResponseCache())
+    monkeypatch.setattr(app, "prebuilt_cache", None)
+    screenshot = synthetic_screenshot((1920, 1080))
+    changed = with_dialogue_line(screenshot, "Hero: Take this sword.", 4)
+    # Within the dialogue-box tolerance on the full screen, so only an exact match tells them apart
+    assert 0 < (dhash(screenshot) ^ dhash(changed)).bit_count() <= app.RESPONSE_CACHE.max_distance
+
+    app.RESPONSE_CACHE.put(dhash(screenshot), app.DEFAULT_SYSTEM_PROMPT, "gemma3_27b_40k:latest", "old")
+    assert answer_f9(monkeypatch, screenshot) == ("old", False)
+    assert answer_f9(monkeypatch, changed) == ("new", True)
+
+def test_exact_lookup_skips_other_prompts():
+    cache = ResponseCache()
+    cache.put(0b1011, "prompt", "model", "answer")
+    assert cache.get(0b1011, "prompt", "model", max_distance=0) == "answer"
+    assert cache.get(0b1011, "other", "model", max_distance=0) is None
+    assert cache.get(0b1010, "prompt", "model", max_distance=0) is None
+    assert cache.get(0b1010, "prompt", "model") == "answer"
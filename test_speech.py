@@ -0,0 +1,41 @@
+"""
+Sentence splitting for streamed speech: run with `python -m pytest test_speech.py`.
+"""
+import pytest
+
+from profiles import GenerationProfile
+from speech import iter_sentences
+
+
+@pytest.mark.parametrize("text, sentences", [
+    ("Press A. Then jump!", ["Press A.", "Then jump!"]),
+    ("Hold B. Release it to throw.", ["Hold B.", "Release it to throw."]),
+    ("Press X. Y opens the map.", ["Press X.", "Y opens the map."]),
+    ("You got an A. Well done!", ["You got an A.", "Well done!"]),
+    ("Press START. Then pick a save.", ["Press START.", "Then pick a save."]),
+    ("Mr. Smith is here. Talk to Dr. Oak.", ["Mr. Smith is here.", "Talk to Dr. Oak."]),
+    ("Read J. R. R. Tolkien's book. Then rest.", ["Read J. R. R. Tolkien's book.", "Then rest."]),
+    ("Use a potion, e.g. the red one. Go!", ["Use a potion, e.g. the red one.", "Go!"]),
+    ("It costs 2.5 coins. Buy it?", ["It costs 2.5 coins.", "Buy it?"]),
+])
+def test_iter_sentences(text, sentences):
+    assert list(iter_sentences([text])) == sentences
+    # Streamed one character at a time, the split must not depend on where chunks end
+    assert list(iter_sentences(list(text))) == sentences
+
+def test_button_prompt_is_spoken_once_the_next_word_starts():
+    received = []
+
+    def chunks():
+        for chunk in ["Press A. ", "Then", " jump!"]:
+            received.append(chunk)
+            yield chunk
+
+    sentences = iter_sentences(chunks())
+    assert next(sentences) == "Press A."
+    assert received == ["Press A. ", "Then"]
+
+def test_stream_limit_ends_after_the_sentence_over_budget():
+    limit = GenerationProfile(max_chars=10).limit()
+    assert limit.feed("Press A. Then jump over ") == ("Press A. Then jump over ", False)
+    assert limit.feed("the wall. And more.") == ("the wall. ", True)
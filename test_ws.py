@@ -1,32 +1,62 @@
 #!/usr/bin/env python3
+"""
+Manual check of the OBS connection: connects, prints the version and record
+status, records for 5 seconds and stops once OBS has finalized the file.
+
+Usage:
+    python test_ws.py            # against OBS on localhost:4455
+    python test_ws.py --mock     # against a local mock obs-websocket server
+"""
+import argparse
 import time
-from obsws_python import ReqClient
+
+from obs_controller import ObsController
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mock", action="store_true", help="Run against mock_obs.MockObsServer instead of OBS")
+    args = parser.parse_args()
+
+    server = None
+    port = 4455
+    if args.mock:
+        from mock_obs import MockObsServer
+        server = MockObsServer(finalize_seconds=1.0).start()
+        port = server.port
+
     # adjust host/port/password if needed
-    client = ReqClient(host="localhost", port=4455, password="", timeout=5)
+    controller = ObsController(host="127.0.0.1" if args.mock else "localhost", port=port, password="", timeout=5)
     try:
+        if not controller.ensure_connected(timeout=10):
+            print("ERROR: could not connect to OBS")
+            return
+
         # 1) Check connection by fetching version
-        version = client.get_version()
+        version = controller.get_version()
         print(f"Connected to OBS v{version.obs_version} (ws v{version.obs_web_socket_version})")
 
         # 2) Query current recording status
-        status = client.get_record_status()
-        print(f"Recording active? {status.output_active}")
+        print(f"Recording active? {controller.record_active}")
 
         # 3) Start a 5-second recording
         print("→ Starting recording…")
-        client.start_record()
+        start = time.time()
+        started = controller.start_recording()
+        print(f"Recording started: {started} ({time.time() - start:.2f}s)")
         time.sleep(5)
 
-        # 4) Stop recording
+        # 4) Stop recording and wait for OBS to finish the file
         print("→ Stopping recording…")
-        client.stop_record()
+        start = time.time()
+        stopped = controller.stop_recording()
+        print(f"Recording finalized: {stopped} ({time.time() - start:.2f}s) -> {controller.last_recording_path}")
         print("Done.")
     except Exception as e:
         print(f"ERROR: {e}")
     finally:
-        client.disconnect()
+        controller.disconnect()
+        if server:
+            server.stop()
 
 if __name__ == "__main__":
     main()
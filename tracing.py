@@ -0,0 +1,220 @@
+"""
+Stage-level latency tracing for pipeline runs.
+
+Each hotkey press gets a Trace. Pipeline code records stage durations into
+the trace bound to the current thread (span(), record(), set_value() are
+no-ops when there is none), and the finished trace is appended as one JSON
+line to a rotating file and folded into an in-process p50/p95 summary per
+hotkey and stage.
+
+Stages recorded by the app:
+  hotkey_wait      press -> pipeline start (scheduler queue)
+  capture          screenshot grab
+  roi              dialogue box detection
+  encode           image resize/encode (base64 is done chunk by chunk during the upload)
+  upload           streamed request body sent, first to last chunk, including the base64 of the images
+  ttft             request sent -> first generated token
+  generation       request sent -> last token
+  prompt_eval, load    server-side timings reported by Ollama
+  tts_first_audio  press -> first utterance starts playing
+  playback         first utterance starts -> last utterance ends
+  ready_sound      "(ding!)" queued -> finished
+  total            press -> trace finished
+Values (not durations): tokens_per_sec, payload_bytes, cache_hit.
+
+Run `python tracing.py [traces.jsonl]` to summarize a trace file.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+_local = threading.local()
+
+
+class Trace:
+    """Timings for one pipeline run."""
+
+    def __init__(self, tracer, hotkey):
+        self.tracer = tracer
+        self.hotkey = hotkey
+        self.start_time = time.time()
+        self.spans = {}
+        self.values = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds, accumulate=True):
+        """Adds a stage duration; repeated stages are summed unless accumulate is False (first one wins)."""
+        with self._lock:
+            if name in self.spans:
+                if accumulate:
+                    self.spans[name] += seconds
+            else:
+                self.spans[name] = seconds
+
+    def set_value(self, name, value):
+        with self._lock:
+            self.values[name] = value
+
+    def finish(self, cancelled=False):
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+            self.spans["total"] = self.elapsed()
+        self.tracer.export(self, cancelled)
+
+    def to_dict(self, cancelled=False):
+        return {
+            "hotkey": self.hotkey,
+            "start": self.start_time,
+            "cancelled": cancelled,
+            "spans": {name: round(seconds, 4) for name, seconds in self.spans.items()},
+            "values": self.values,
+        }
+
+
+class Tracer:
+    """Creates traces, writes finished ones to a rotating JSONL file and keeps per-stage percentiles."""
+
+    def __init__(self, path=None, max_bytes=5 * 1024 * 1024, backup_count=3, history=500):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._history = history
+        self._samples = defaultdict(lambda: defaultdict(lambda: deque(maxlen=self._history)))
+        self._lock = threading.Lock()
+        self._writer = None
+
+    def start(self, hotkey):
+        return Trace(self, hotkey)
+
+    def export(self, trace, cancelled=False):
+        record = trace.to_dict(cancelled)
+        if not cancelled:
+            with self._lock:
+                for name, seconds in trace.spans.items():
+                    self._samples[trace.hotkey][name].append(seconds)
+        if self.path:
+            self._get_writer().info(json.dumps(record))
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in trace.spans.items())
+        logging.info(f"Trace {trace.hotkey}{' (cancelled)' if cancelled else ''}: {stages}")
+
+    def _get_writer(self):
+        """The trace file logger, opened with the first finished trace."""
+        with self._lock:
+            if self._writer is None:
+                # A private logger gives us size-based rotation for free
+                writer = logging.getLogger(f"{__name__}.export.{id(self)}")
+                writer.propagate = False
+                writer.setLevel(logging.INFO)
+                handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                              encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                writer.addHandler(handler)
+                self._writer = writer
+            return self._writer
+
+    def summary(self):
+        """{hotkey: {stage: {"n", "p50", "p95"}}} over the recent history."""
+        with self._lock:
+            return {
+                hotkey: {stage: percentiles(samples) for stage, samples in stages.items()}
+                for hotkey, stages in self._samples.items()
+            }
+
+    def format_summary(self):
+        return format_summary(self.summary())
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+def format_summary(summary):
+    lines = []
+    for hotkey, stages in summary.items():
+        lines.append(f"{hotkey}:")
+        for stage, stats in sorted(stages.items(), key=lambda item: item[1]["p50"]):
+            lines.append(f"  {stage:<16} n={stats['n']:<4} p50={stats['p50'] * 1000:8.0f}ms  "
+                         f"p95={stats['p95'] * 1000:8.0f}ms")
+    return "\n".join(lines)
+
+def summarize_file(path):
+    """Builds the same summary as Tracer.summary() from a JSONL trace file."""
+    samples = defaultdict(lambda: defaultdict(list))
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("cancelled"):
+                continue
+            for name, seconds in record["spans"].items():
+                samples[record["hotkey"]][name].append(seconds)
+    return {hotkey: {stage: percentiles(values) for stage, values in stages.items()}
+            for hotkey, stages in samples.items()}
+
+
+# ----------------------------------------------------------------
+# Current-thread helpers
+# ----------------------------------------------------------------
+def current_trace():
+    return getattr(_local, "trace", None)
+
+@contextmanager
+def trace_context(trace):
+    """Binds trace to the current thread for the duration of the block."""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+@contextmanager
+def span(name):
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+def record(name, seconds, accumulate=True):
+    trace = current_trace()
+    if trace is not None:
+        trace.record(name, seconds, accumulate=accumulate)
+
+def set_value(name, value):
+    trace = current_trace()
+    if trace is not None:
+        trace.set_value(name, value)
+
+
+if __name__ == "__main__":
+    trace_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   "traces.jsonl")
+    print(format_summary(summarize_file(trace_path)))